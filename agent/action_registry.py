@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Action registry: maps task descriptions to the actions `agent_runner.process_task` runs.
+
+Each action registers one or more keywords: a verb such as `summarize`, or a prefix such as
+`db_query:`. It can also register a parser for its arguments. Descriptions are matched as before:
+case-insensitively, anywhere in the text. One Aho-Corasick scan (`matching.AhoCorasick`) finds
+every keyword present, and the action with the lowest `priority` wins. Each description is parsed
+once into an `ActionSpec`, which is cached, so the scheduler's classification and the dispatch share
+the work.
+
+    @register_action('resize', 'resize:', parser=parse_params, priority=60)
+    def resize(task, spec):
+        ...
+        return 'completed'
+
+The spec's `argument` is the text after the keyword. For a verb, it is the text after the next `:`
+(None when there is none). The parser turns the argument into `params`. An action's `kind` (its
+name by default) labels it for the scheduler's pools and limits and for the
+`agent_action_duration_seconds` metric, so a new action is timed with no extra code.
+
+Third-party actions live in modules listed in `actions.plugins` in agent_config.json, or in
+AGENT_ACTION_PLUGINS (comma-separated). They are imported on first use, in every process that
+dispatches tasks.
+"""
+import collections
+import importlib
+import itertools
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from .config_provider import ConfigProvider
+from .matching import AhoCorasick
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRIORITY = 100
+PARSE_CACHE_SIZE = 4096
+UNMATCHED_KIND = 'sample'
+UNMATCHED_STATUS = 'in-progress'
+
+config_provider = ConfigProvider()
+
+
+@dataclass(frozen=True)
+class ActionSpec:
+    """A parsed description: the action to run and its arguments. Shared through the cache; do not mutate."""
+    action: Optional[str]
+    kind: str
+    keyword: Optional[str] = None
+    argument: Optional[str] = None
+    params: Mapping[str, str] = field(default_factory=dict)
+
+
+Handler = Callable[..., str]
+Parser = Callable[[Optional[str]], Mapping[str, str]]
+
+UNMATCHED = ActionSpec(action=None, kind=UNMATCHED_KIND)
+
+
+@dataclass(frozen=True)
+class Action:
+    name: str
+    keywords: tuple
+    handler: Handler
+    parser: Optional[Parser]
+    kind: str
+    priority: int
+    order: int
+
+
+def parse_params(argument: Optional[str]) -> Dict[str, str]:
+    """`key=value;key=value` pairs; keys and values are stripped and entries without `=` ignored."""
+    params = {}
+    for part in (argument or '').split(';'):
+        if '=' in part:
+            key, value = part.split('=', 1)
+            params[key.strip()] = value.strip()
+    return params
+
+
+class ActionRegistry:
+    def __init__(self, plugins: Optional[Callable[[], List[str]]] = None):
+        self._actions: Dict[str, Action] = {}
+        self._by_keyword: Dict[str, Action] = {}
+        # (matcher, keyword -> action) snapshot, rebuilt after registrations
+        self._compiled_state: Optional[Tuple[AhoCorasick, Dict[str, Action]]] = None
+        self._order = itertools.count()
+        self._lock = threading.RLock()
+        self._plugins = plugins
+        self._plugins_loaded = plugins is None
+        # description -> spec, least recently used first
+        self._specs: 'collections.OrderedDict[str, ActionSpec]' = collections.OrderedDict()
+
+    def register(self, name: str, keywords: Union[str, Iterable[str]], handler: Handler,
+                 parser: Optional[Parser] = None, kind: Optional[str] = None,
+                 priority: int = DEFAULT_PRIORITY, replace: bool = False) -> Action:
+        """Route descriptions containing any of `keywords` to `handler(task, spec)`."""
+        keywords = (keywords,) if isinstance(keywords, str) else tuple(keywords)
+        keywords = tuple(k.lower() for k in keywords)
+        if not keywords or not all(keywords):
+            raise ValueError(f'Action {name!r} needs at least one non-empty keyword')
+        with self._lock:
+            if name in self._actions and not replace:
+                raise ValueError(f'Action {name!r} is already registered')
+            previous = self._actions.pop(name, None)
+            taken = {k: self._by_keyword[k].name for k in keywords
+                     if k in self._by_keyword and self._by_keyword[k] is not previous}
+            if taken:
+                if previous is not None:
+                    self._actions[name] = previous
+                raise ValueError(f'Keywords already registered: {taken}')
+            if previous is not None:
+                for k in previous.keywords:
+                    self._by_keyword.pop(k, None)
+            action = Action(name=name, keywords=keywords, handler=handler, parser=parser, kind=kind or name,
+                            priority=priority, order=next(self._order))
+            self._actions[name] = action
+            self._by_keyword.update({k: action for k in keywords})
+            self._compiled_state = None
+            self._specs.clear()
+        return action
+
+    def unregister(self, name: str):
+        with self._lock:
+            action = self._actions.pop(name, None)
+            if action is not None:
+                for k in action.keywords:
+                    self._by_keyword.pop(k, None)
+                self._compiled_state = None
+                self._specs.clear()
+
+    def actions(self) -> List[Action]:
+        """Registered actions in dispatch priority order."""
+        return sorted(self._actions.values(), key=lambda a: (a.priority, a.order))
+
+    def _load_plugins(self):
+        # Flag first: plugin modules register actions, which re-enters this registry
+        self._plugins_loaded = True
+        for module in self._plugins():
+            try:
+                importlib.import_module(module)
+                logger.info('Loaded action plugin %s', module)
+            except Exception:
+                logger.exception('Could not load action plugin %s', module)
+
+    def _compiled(self) -> Tuple[AhoCorasick, Dict[str, Action]]:
+        with self._lock:
+            if not self._plugins_loaded:
+                self._load_plugins()
+            if self._compiled_state is None:
+                self._compiled_state = (AhoCorasick(self._by_keyword), dict(self._by_keyword))
+            return self._compiled_state
+
+    def _parse(self, description: str) -> ActionSpec:
+        lowered = description.lower()
+        matcher, by_keyword = self._compiled()
+        hits = [by_keyword[k] for k in matcher.find_all(lowered)]
+        if not hits:
+            return UNMATCHED
+        action = min(hits, key=lambda a: (a.priority, a.order))
+        keyword = next(k for k in action.keywords if k in lowered)
+        # Located in the original text (lower() may change its length) so the argument keeps its case
+        match = re.search(re.escape(keyword), description, re.IGNORECASE)
+        rest = description[match.end():] if match else ''
+        if not keyword.endswith(':'):
+            rest = rest.split(':', 1)[1] if ':' in rest else None
+        argument = rest.strip() if rest is not None else None
+        params = action.parser(argument) if action.parser is not None else {}
+        return ActionSpec(action=action.name, kind=action.kind, keyword=keyword, argument=argument,
+                          params=params)
+
+    def parse(self, description: Optional[str]) -> ActionSpec:
+        """The (cached) spec for `description`; `UNMATCHED` when no keyword occurs."""
+        if not description:
+            return UNMATCHED
+        with self._lock:
+            spec = self._specs.get(description)
+            if spec is not None:
+                self._specs.move_to_end(description)
+                return spec
+            spec = self._parse(description)
+            self._specs[description] = spec
+            if len(self._specs) > PARSE_CACHE_SIZE:
+                self._specs.popitem(last=False)
+            return spec
+
+    def dispatch(self, task, spec: Optional[ActionSpec] = None) -> str:
+        """Run the action for `task` and return its new status (`in-progress` when nothing matches)."""
+        spec = spec or self.parse(task.description)
+        action = self._actions.get(spec.action) if spec.action else None
+        if action is None:
+            return UNMATCHED_STATUS
+        return action.handler(task, spec)
+
+
+def configured_plugins() -> List[str]:
+    """Plugin module names from AGENT_ACTION_PLUGINS, else the config's `actions.plugins`."""
+    env = os.environ.get('AGENT_ACTION_PLUGINS')
+    if env is not None:
+        return [m.strip() for m in env.split(',') if m.strip()]
+    try:
+        section = config_provider.config().get('actions') or {}
+    except Exception:
+        section = {}
+    return list(section.get('plugins') or [])
+
+
+registry = ActionRegistry(plugins=configured_plugins)
+
+
+def register_action(name: str, keywords: Union[str, Iterable[str]], parser: Optional[Parser] = None,
+                    kind: Optional[str] = None, priority: int = DEFAULT_PRIORITY, replace: bool = False):
+    """Decorator registering `handler(task, spec) -> status` in the default registry."""
+    def decorator(handler: Handler) -> Handler:
+        registry.register(name, keywords, handler, parser=parser, kind=kind, priority=priority, replace=replace)
+        return handler
+    return decorator
+
+
+def parse_action(description: Optional[str]) -> ActionSpec:
+    return registry.parse(description)
+
+
+def dispatch(task, spec: Optional[ActionSpec] = None) -> str:
+    return registry.dispatch(task, spec)
@@ -2,65 +2,46 @@
 """
 High-level actions the agent can perform. These are safe operations designed to be idempotent and auditable.
 """
+import csv
 import os
 import json
 import sqlite3
 import time
 import logging
-import tempfile
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 import pandas as pd
 
+from . import s3_export
+from . import tasks as agent_tasks
+from .db_pool import get_pool, is_read_only_query
+from .result_cache import get_result_cache, materialize, temp_path_for
+from .writers import atomic_path, write_records
 from .vault_client import get_credential
 from .executor import run_safe_command
+from .metrics_server import instrument, record_bytes
 
 logger = logging.getLogger(__name__)
 RESOURCES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'resources'))
 EXPORTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'exports'))
 
-def export_dataframe_to_s3(df: pd.DataFrame, export_name: str, bucket: Optional[str] = None, prefix: Optional[str] = None) -> Optional[str]:
-    """Export to S3 using boto3 if credentials are present, else fallback to local stub.
-    Returns the path/URL of the export.
+@instrument('actions.export_dataframe_to_s3')
+def export_dataframe_to_s3(df: pd.DataFrame, export_name: str, bucket: Optional[str] = None, prefix: Optional[str] = None,
+                           fmt: str = 'csv', compression: Optional[str] = None) -> Optional[str]:
+    """Export to S3 using boto3 if a bucket is configured, else fallback to local stub.
+
+    The DataFrame is encoded in chunks (CSV or Parquet, optionally gzip/zstd compressed) and streamed
+    through a parallel multipart upload; see `s3_export`. Returns the path/URL of the export.
     """
+    bucket = bucket or os.environ.get('S3_BUCKET')
+    if not bucket:
+        return export_dataframe_to_s3_stub(df, export_name)
     try:
-        import boto3
-        # Attempt to dynamically obtain AWS credentials from Vault
-        from .vault_client import get_aws_credentials
-        aws_creds = get_aws_credentials(os.environ.get('VAULT_SECRETS_PATH', 'secret/data/myapp'))
-        session_params = {}
-        if aws_creds:
-            session_params = aws_creds
-        # Else boto3 uses environment or instance credentials
-        s3 = boto3.client('s3', **session_params)
-        # Attempt to fetch AWS creds from Vault
-        from .vault_client import get_aws_credentials
-        aws_creds = get_aws_credentials(os.environ.get('VAULT_SECRETS_PATH', 'secret/data/myapp'))
-        session_params = {}
-        if aws_creds:
-            session_params = aws_creds
-        elif os.environ.get('AWS_ACCESS_KEY_ID'):
-            session_params = {}
-        s3 = boto3.client('s3', **session_params)
-        # Try to source AWS credentials from Vault if available
-        from .vault_client import VaultClient
-        client = VaultClient()
-        aws_key = client.get_secret_value(os.environ.get('VAULT_SECRETS_PATH', 'secret/data/myapp'), 'aws_access_key')
-        aws_secret = client.get_secret_value(os.environ.get('VAULT_SECRETS_PATH', 'secret/data/myapp'), 'aws_secret_key')
-        session_params = {}
-        if aws_key and aws_secret:
-            session_params['aws_access_key_id'] = aws_key
-            session_params['aws_secret_access_key'] = aws_secret
-        s3 = boto3.client('s3', **session_params)
-        local_tmp = os.path.join(tempfile.gettempdir(), f'{export_name}.csv')
-        df.to_csv(local_tmp, index=False)
-        if not bucket:
-            bucket = os.environ.get('S3_BUCKET')
-        key = f"{(prefix + '/') if prefix else ''}{export_name}.csv"
-        s3.upload_file(local_tmp, bucket, key)
-        return f's3://{bucket}/{key}'
+        key = s3_export.object_key(export_name, prefix, fmt, compression)
+        return s3_export.upload_dataframe(df, bucket, key, fmt=fmt, compression=compression)
     except Exception:
+        logger.exception('S3 export of %s failed; writing a local stub instead', export_name)
         return export_dataframe_to_s3_stub(df, export_name)
 
 os.makedirs(EXPORTS_DIR, exist_ok=True)
@@ -70,42 +51,186 @@ os.makedirs(EXPORTS_DIR, exist_ok=True)
 class DBQueryResult:
     columns: List[str]
     rows: List[List]
+    # Streaming form (see db_query_iter): remaining rows arrive lazily in fetchmany batches
+    batches: Optional[Iterator[List[tuple]]] = None
 
+    def iter_batches(self) -> Iterator[List[tuple]]:
+        if self.rows:
+            yield self.rows
+        if self.batches is not None:
+            yield from self.batches
 
-def db_query(query: str, db_path: Optional[str] = None) -> DBQueryResult:
+    def __iter__(self) -> Iterator[tuple]:
+        for batch in self.iter_batches():
+            yield from batch
+
+
+@dataclass
+class ExportStats:
+    path: str
+    rows: int
+    bytes: int
+
+
+DEFAULT_FETCH_ROWS = 5000
+
+
+def _resolve_db_path(db_path: Optional[str]) -> str:
     # Use a local SQLite DB for demonstration; in production, use connection details from Vault
-    if not db_path:
-        db_path = os.path.join(RESOURCES_DIR, 'sample.db')
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    cur.execute(query)
-    cols = [d[0] for d in cur.description] if cur.description else []
-    rows = cur.fetchall()
-    conn.close()
+    return db_path or os.path.join(RESOURCES_DIR, 'sample.db')
+
+
+@instrument('actions.db_query')
+def db_query(query: str, db_path: Optional[str] = None) -> DBQueryResult:
+    db_path = _resolve_db_path(db_path)
+    read_only = is_read_only_query(query)
+    conn = get_pool(db_path).connection(read_only=read_only)
+    cur = conn.execute(query)
+    try:
+        cols = [d[0] for d in cur.description] if cur.description else []
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+        if not read_only:
+            # Like the former connect/close per query, changes made through db_query are not committed
+            conn.rollback()
     return DBQueryResult(columns=cols, rows=rows)
 
 
+def db_query_iter(query: str, db_path: Optional[str] = None, batch_size: int = DEFAULT_FETCH_ROWS) -> DBQueryResult:
+    """Run `query` and return a streaming DBQueryResult whose rows are fetched `batch_size` at a time.
+
+    The cursor stays open until the batches are exhausted; consume them on the calling thread.
+    """
+    db_path = _resolve_db_path(db_path)
+    read_only = is_read_only_query(query)
+    conn = get_pool(db_path).connection(read_only=read_only)
+    cur = conn.execute(query)
+    cols = [d[0] for d in cur.description] if cur.description else []
+
+    def batches():
+        try:
+            while True:
+                batch = cur.fetchmany(batch_size)
+                if not batch:
+                    return
+                yield batch
+        finally:
+            cur.close()
+            if not read_only:
+                conn.rollback()
+
+    return DBQueryResult(columns=cols, rows=[], batches=batches())
+
+
+def _write_csv_batches(path: str, result: DBQueryResult) -> int:
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(result.columns)
+        for batch in result.iter_batches():
+            writer.writerows(batch)
+            count += len(batch)
+    return count
+
+
+def _write_parquet_batches(path: str, result: DBQueryResult) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError('Parquet export requires pyarrow') from e
+    count = 0
+    writer = None
+    try:
+        for batch in result.iter_batches():
+            columns = list(zip(*batch))
+            table = pa.table({name: list(values) for name, values in zip(result.columns, columns)})
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+            count += len(batch)
+        if writer is None:
+            writer = pq.ParquetWriter(path, pa.schema([(name, pa.null()) for name in result.columns]))
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+@instrument('actions.export_query')
+def export_query(query: str, out_path: str, db_path: Optional[str] = None, fmt: Optional[str] = None,
+                 batch_size: int = DEFAULT_FETCH_ROWS) -> ExportStats:
+    """Stream the results of `query` to a CSV or Parquet file without materializing them.
+
+    Rows are fetched and written `batch_size` at a time, so memory is bounded by the batch size. The
+    file is written under a temporary name and renamed into place when complete.
+    """
+    fmt = (fmt or os.path.splitext(out_path)[1].lstrip('.') or 'csv').lower()
+    writers = {'csv': _write_csv_batches, 'parquet': _write_parquet_batches}
+    if fmt not in writers:
+        raise ValueError(f'Unsupported export format: {fmt}')
+    result = db_query_iter(query, db_path, batch_size)
+    tmp = temp_path_for(out_path)
+    try:
+        rows = writers[fmt](tmp, result)
+        os.replace(tmp, out_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    stats = ExportStats(path=out_path, rows=rows, bytes=os.path.getsize(out_path))
+    record_bytes('written', stats.bytes)
+    logger.info('Exported %d rows (%d bytes) to %s', stats.rows, stats.bytes, out_path)
+    return stats
+
+
+_sample_db_ready: Optional[str] = None
+
+
 def ensure_sample_db():
+    global _sample_db_ready
+    # Checked once per process; callers invoke this before every DB_QUERY task
+    if _sample_db_ready:
+        return _sample_db_ready
     db_path = os.path.join(RESOURCES_DIR, 'sample.db')
-    if os.path.exists(db_path):
-        return db_path
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    cur.execute('CREATE TABLE sample (id INTEGER PRIMARY KEY, value INTEGER, note TEXT)')
-    cur.executemany('INSERT INTO sample (id, value, note) VALUES (?, ?, ?)', [(i, i*10, f'Row {i}') for i in range(1, 11)])
-    conn.commit()
-    conn.close()
+    if not os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        cur = conn.cursor()
+        cur.execute('CREATE TABLE sample (id INTEGER PRIMARY KEY, value INTEGER, note TEXT)')
+        cur.executemany('INSERT INTO sample (id, value, note) VALUES (?, ?, ?)', [(i, i*10, f'Row {i}') for i in range(1, 11)])
+        conn.commit()
+        conn.close()
+    _sample_db_ready = db_path
     return db_path
 
 
 def export_dataframe_to_s3_stub(df: pd.DataFrame, export_name: str) -> str:
     # For safety, a 'stub' implementation writes to local 'exports' instead of real S3.
     path = os.path.join(EXPORTS_DIR, f'{export_name}.csv')
-    df.to_csv(path, index=False)
+    # Replace rather than rewrite: the destination may be a hard link to a cached export
+    with atomic_path(path) as tmp_path:
+        df.to_csv(tmp_path, index=False)
+    record_bytes('written', os.path.getsize(path))
     logger.info('Exported dataframe to local exports folder as a S3 stub: %s', path)
     return path
 
 
+@instrument('actions.export_file_stub')
+def export_file_stub(source_path: str, export_name: str) -> str:
+    """Export a spreadsheet to exports/<export_name>.csv, reusing the cached export of identical content."""
+    path = os.path.join(EXPORTS_DIR, f'{export_name}.csv')
+
+    def produce(tmp_path: str):
+        pd.read_excel(source_path).to_csv(tmp_path, index=False)
+        record_bytes('read', os.path.getsize(source_path))
+        record_bytes('written', os.path.getsize(tmp_path))
+
+    hit = materialize(source_path, 'export_csv', {}, path, produce)
+    logger.info('Exported %s to local exports folder as a S3 stub: %s (cached=%s)', source_path, path, hit)
+    return path
+
+
+@instrument('actions.send_email_stub', outcome=lambda sent: 'ok' if sent else 'failed')
 def send_email_stub(to: str, subject: str, body: str) -> bool:
     # Do not send real emails from sample code. Instead, write to export file for auditing.
     safe_to = to.replace('@', '_').replace('/', '_') if to else 'unknown'
@@ -116,22 +241,29 @@ def send_email_stub(to: str, subject: str, body: str) -> bool:
     return True
 
 
+@instrument('actions.run_command_action', outcome=lambda out: out.get('status'))
 def run_command_action(command: str) -> dict:
     # Validate and run command via the executor
     return run_safe_command(command)
 
 
-def summarize_data(file_name: str, output_name: Optional[str] = None) -> List[dict]:
+@instrument('actions.summarize_data')
+def summarize_data(file_name: str, output_name: Optional[str] = None, extended: bool = False) -> List[dict]:
     path = os.path.join(RESOURCES_DIR, file_name)
     if not os.path.exists(path):
         raise FileNotFoundError(path)
-    df = pd.read_excel(path)
-    numeric_columns = df.select_dtypes(include=['number']).columns
-    results = []
-    for col in numeric_columns:
-        column_data = df[col].dropna()
-        results.append({'column': col, 'mean': float(column_data.mean()), 'sum': float(column_data.sum()), 'count': int(len(column_data))})
+    # Results are cached on the file's content; a repeated request skips reading the file entirely
+    cache = get_result_cache()
+    key = cache.key(path, 'summarize_results', {'extended': extended}) if cache else None
+    results = cache.load_value(key) if cache else None
+    if results is None:
+        # Streams the file in row chunks so memory stays flat for large inputs
+        results = [r.as_dict() for r in agent_tasks.summarize_data(path, extended=extended)]
+        record_bytes('read', os.path.getsize(path))
+        if cache:
+            cache.store_value(key, results)
     if output_name:
         out_path = os.path.join(EXPORTS_DIR, output_name)
-        pd.DataFrame(results).to_excel(out_path, index=False)
+        write_records(out_path, results)
+        record_bytes('written', os.path.getsize(out_path))
     return results
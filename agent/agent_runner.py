@@ -6,22 +6,31 @@ This is a minimal, safe harness to show the agent how to interact with local res
 Usage:
   python agent_runner.py --process-tasks
   python agent_runner.py --watch
+  python agent_runner.py --serve --workers 4
+
+--process-tasks and --watch import the tasks file into the task store before each run (disable with
+"sync_excel": false) and write the results next to it.
+
+With --serve the runner becomes a long-lived worker pool that leases tasks straight from the MCP
+server (see agent/lease_client.py) instead of reading the spreadsheet.
 
 """
 
 import argparse
 import json
 import logging
+import multiprocessing
 import os
-import time
-from dataclasses import dataclass
-from datetime import datetime
-from typing import List
+import socket
+import threading
+from typing import Callable, Dict, List
 
+import numpy as np
 import pandas as pd
+import requests
 
 # Make sure relative imports work even when invoked as a script
-if __package__ is None:
+if not __package__:
     import sys
     sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
     __package__ = 'agent'
@@ -30,172 +39,398 @@ from . import tasks as agent_tasks
 from . import actions as agent_actions
 from . import executor as agent_executor
 from . import logging_config
-from .metrics_server import start_metrics, TASK_COUNTER, TASK_ERRORS
+from . import writers
+from .scheduler import SchedulerConfig, TaskScheduler
+from .fingerprints import FingerprintStore, fingerprint_path, task_fingerprint
+from .lease_client import LeaseClient
+from .action_registry import dispatch as dispatch_action, parse_action, parse_params, register_action
+from .task_store import TASK_COLUMNS, TaskStore, open_task_store
+from .task_sources import open_task_source, task_source_for, write_updated
+from .task_table import Task, TaskTable, TaskView
+from .watcher import open_watcher
+from .metrics_server import instrument, start_metrics, track_backlog, TASK_COUNTER, TASK_ERRORS
+from .output_capture import abbreviate
 from .vault_client import VaultClient
 
 CONFIG_PATH = os.getenv("AGENT_CONFIG_PATH") or os.path.join(os.path.dirname(__file__), "agent_config.json")
 
 
-@dataclass
-class Task:
-    task_id: str
-    description: str
-    status: str
-    due_date: datetime | None = None
-
-
 def load_config(path: str = CONFIG_PATH) -> dict:
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
-def read_tasks(file_path: str) -> List[Task]:
-    df = pd.read_excel(file_path)
-    tasks: List[Task] = []
-    for _, row in df.iterrows():
+def task_from_record(record: dict) -> Task:
+    due = record.get("due_date")
+    try:
+        due = pd.to_datetime(due) if due else None
+    except Exception:
         due = None
-        if not pd.isna(row.get("due_date")):
-            try:
-                due = pd.to_datetime(row["due_date"]) if not pd.isna(row["due_date"]) else None
-            except Exception:
-                due = None
-
-        tasks.append(
-            Task(
-                task_id=str(row.get("task_id")),
-                description=str(row.get("description")),
-                status=str(row.get("status")) if not pd.isna(row.get("status")) else "pending",
-                due_date=due,
-            )
-        )
-    return tasks
-
-
-def process_task(task: Task) -> str:
+    return Task(
+        task_id=str(record.get("task_id")),
+        description=str(record.get("description")),
+        status=record.get("status") or "pending",
+        due_date=due,
+    )
+
+
+def read_tasks(source: str | TaskStore, engine: str | None = None) -> TaskTable:
+    """Read tasks from a task store, or directly from a tasks file (xlsx, csv, parquet or sqlite).
+
+    `engine` selects the Excel reader (see `task_store.read_excel`).
     """
-    Mock processing logic. Replace with actual task execution steps the agent must perform.
-    For security, the harness runs only safe, local actions.
+    if isinstance(source, TaskStore):
+        df = pd.DataFrame(source.list_tasks(), columns=TASK_COLUMNS)
+    else:
+        df = task_source_for(source, engine=engine).read()
+    return TaskTable.from_frame(df)
+
+
+def action_type(task: Task | TaskView) -> str:
+    """Classify a task by the action `process_task` will run for it; used to pick a pool and limit."""
+    return parse_action(task.description).kind
+
+
+@instrument(action_type, outcome=str)
+def process_task(task: Task | TaskView) -> str:
+    """
+    Run the action registered for the task's description (see `action_registry` and the built-in
+    actions below). For security, the harness runs only safe, local actions.
 
     Returns updated status.
     """
-    # Evaluate more specific actions before the general 'sample' matcher
-    desc = task.description.lower() if task.description else ""
-    # If the task indicates summarize, run a sample summarize
-    if "summarize" in desc:
-        try:
-            logging.info('Starting summarize action for %s', task.task_id)
-            # Look up the sample data path relative to the config; the runner manages the file paths
-            # This is a safe demonstration; in a real agent, validate the paths carefully
-            data_path = os.path.join(os.path.dirname(__file__), "..", "resources", "sample_data.xlsx")
-            data_path = os.path.abspath(data_path)
-            results = agent_tasks.summarize_data(data_path)
-            out_path = os.path.join(os.path.dirname(__file__), "..", "resources", "summary.xlsx")
-            agent_tasks.write_summary(out_path, results)
-            logging.info('Wrote summary to %s', out_path)
-            return "completed"
-        except Exception as e:
-            logging.exception('Summarize failed for %s: %s', task.task_id, e)
-            return "failed"
-    # Extended actions: db_query, export, s3_export, email, run_command
     try:
-        if "db_query:" in desc:
-            query = task.description.split(':', 1)[1].strip()
-            db_path = agent_actions.ensure_sample_db()
-            res = agent_actions.db_query(query, db_path)
-            df = pd.DataFrame(res.rows, columns=res.columns)
-            outdir = os.path.join(os.path.dirname(__file__), "..", "exports")
-            os.makedirs(outdir, exist_ok=True)
-            outpath = os.path.join(outdir, f"db_query_{task.task_id}.csv")
-            df.to_csv(outpath, index=False)
-            return "completed"
-        if "export_parquet" in desc or "export_csv" in desc:
-            file_name = 'sample_data.xlsx'
-            df = pd.read_excel(os.path.join(os.path.dirname(__file__), '..', 'resources', file_name))
-            outpath = agent_actions.export_dataframe_to_s3_stub(df, f'export_{task.task_id}')
-            return "completed"
-        if "send_email" in desc:
-            parts = task.description.split(':', 1)[1]
-            params = dict([p.split('=') for p in parts.split(';') if '=' in p])
-            to = params.get('to')
-            subject = params.get('subject', 'No Subject')
-            body = params.get('body', '')
-            # Validate email action via policy
-            out = agent_actions.send_email_stub(to, subject, body)
-            return 'completed' if out else 'failed'
-        if "run_command:" in desc:
-            cmd = task.description.split(':', 1)[1].strip()
-            out = agent_executor.run_safe_command(cmd)
-            logging.info('Command output: %s', out)
-            return 'completed' if out.get('status') == 'ok' else 'failed'
+        return dispatch_action(task)
     except Exception as e:
         logging.exception('Failed to process task %s: %s', task.task_id, e)
         return 'failed'
 
-    # Safe sample action: mark the task as completed if description contains 'sample'
-    if "sample" in desc:
-        return "completed"
-
-    return 'in-progress'
 
+# Built-in actions, in the order the original substring chain tested them: more specific actions
+# before the general 'sample' matcher
 
-def write_tasks(file_path: str, tasks: List[Task]):
-    df = pd.DataFrame(
-        [{
-            "task_id": t.task_id,
-            "description": t.description,
-            "status": t.status,
-            "due_date": t.due_date,
-        } for t in tasks]
-    )
+@register_action("summarize", "summarize", priority=10)
+def summarize_action(task, spec) -> str:
+    try:
+        logging.info('Starting summarize action for %s', task.task_id)
+        # Look up the sample data path relative to the config; the runner manages the file paths
+        # This is a safe demonstration; in a real agent, validate the paths carefully
+        data_path = os.path.join(os.path.dirname(__file__), "..", "resources", "sample_data.xlsx")
+        data_path = os.path.abspath(data_path)
+        out_path = os.path.join(os.path.dirname(__file__), "..", "resources", "summary.xlsx")
+        agent_tasks.summarize_to_file(data_path, os.path.abspath(out_path))
+        logging.info('Wrote summary to %s', out_path)
+        return "completed"
+    except Exception as e:
+        logging.exception('Summarize failed for %s: %s', task.task_id, e)
+        return "failed"
+
+
+@register_action("db_query", "db_query:", priority=20)
+def db_query_action(task, spec) -> str:
+    db_path = agent_actions.ensure_sample_db()
+    outdir = os.path.join(os.path.dirname(__file__), "..", "exports")
+    os.makedirs(outdir, exist_ok=True)
+    outpath = os.path.join(outdir, f"db_query_{task.task_id}.csv")
+    # Rows stream from the cursor to the CSV in batches instead of being held in memory
+    agent_actions.export_query(spec.argument, outpath, db_path)
+    return "completed"
+
+
+@register_action("export", ["export_parquet", "export_csv"], priority=30)
+def export_action(task, spec) -> str:
+    file_name = 'sample_data.xlsx'
+    source = os.path.join(os.path.dirname(__file__), '..', 'resources', file_name)
+    agent_actions.export_file_stub(os.path.abspath(source), f'export_{task.task_id}')
+    return "completed"
+
+
+@register_action("send_email", "send_email", parser=parse_params, priority=40)
+def send_email_action(task, spec) -> str:
+    if spec.argument is None:
+        raise ValueError(f'send_email needs parameters: {task.description!r}')
+    # Validate email action via policy
+    out = agent_actions.send_email_stub(spec.params.get('to'), spec.params.get('subject', 'No Subject'),
+                                        spec.params.get('body', ''))
+    return 'completed' if out else 'failed'
+
+
+@register_action("run_command", "run_command:", priority=50)
+def run_command_action(task, spec) -> str:
+    spill = f'task_{task.task_id}' if os.getenv('AGENT_OUTPUT_SPILL') else None
+    out = agent_executor.run_safe_command(spec.argument, spill=spill)
+    # Log a bounded excerpt; the full output is only kept in the spill files
+    logging.info('Command output for %s: status=%s returncode=%s bytes=%s truncated=%s files=%s '
+                 'stdout=%r stderr=%r', task.task_id, out.get('status'), out.get('returncode'),
+                 out.get('output_bytes'), out.get('truncated'), out.get('output_files'),
+                 abbreviate(out.get('stdout')), abbreviate(out.get('stderr')))
+    return 'completed' if out.get('status') == 'ok' else 'failed'
+
+
+# Safe sample action: mark the task as completed if description contains 'sample'
+@register_action("sample", "sample", priority=1000)
+def sample_action(task, spec) -> str:
+    return "completed"
+
+
+def write_tasks(file_path: str, tasks: TaskTable | List[Task], fmt: str | None = None) -> str:
+    """Write the tasks next to `file_path` as `<name>.updated.<ext>` (xlsx, csv or parquet).
+
+    The format defaults to that of `file_path` (xlsx for other sources). Rows are streamed and the
+    file is renamed into place when complete (see `writers`).
+    """
+    if not isinstance(tasks, TaskTable):
+        tasks = TaskTable.from_tasks(tasks)
+    if fmt is None:
+        fmt = writers.FORMATS.get(os.path.splitext(file_path)[1].lower(), "xlsx")
     # Save to a new file to avoid accidental overwrite
-    # Use a valid extension for excel so pandas can determine engine
-    if file_path.lower().endswith('.xlsx'):
-        backup_path = file_path.replace('.xlsx', '.updated.xlsx')
-    else:
-        backup_path = file_path + '.updated.xlsx'
-    df.to_excel(backup_path, index=False)
+    backup_path = write_updated(file_path, tasks, fmt)
     logging.info("Wrote updated tasks to %s", backup_path)
+    return backup_path
 
 
-def process_tasks_file(config):
-    tasks_path = os.path.join(config["data_dir"], config["tasks_file"])
-    logging.info("Reading tasks from %s", tasks_path)
-    tasks = read_tasks(tasks_path)
+def _record_outcome(status: str):
+    try:
+        TASK_COUNTER.inc()
+        if status == 'failed':
+            TASK_ERRORS.inc()
+    except Exception:
+        pass
 
-    for t in tasks:
-        new_status = process_task(t)
-        try:
-            TASK_COUNTER.inc()
-            if new_status == 'failed':
-                TASK_ERRORS.inc()
-        except Exception:
-            pass
-        logging.info("Task %s: %s -> %s", t.task_id, t.status, new_status)
-        t.status = new_status
 
-    write_tasks(tasks_path, tasks)
+def process_tasks_file(config, incremental: bool | None = None):
+    """Process the tasks in the task store and write the results to the configured tasks file.
 
+    Tasks are taken with a lease (`claim`/`ack`) like the `--serve` workers take them, so a task leased to
+    a worker is never run here as well. Tasks in `task_source.statuses` (default: pending) are claimed.
+    The tasks file is imported into the store first unless `sync_excel` is set to false (for a store fed
+    only through the MCP server).
 
-def run_watch(config):
+    In incremental mode rows whose description and status match the fingerprint of an earlier completed
+    run are kept `completed` instead of being dispatched again. Failed rows put back to pending are retried.
+    """
+    if incremental is None:
+        incremental = bool(config.get("incremental", False))
     tasks_path = os.path.join(config["data_dir"], config["tasks_file"])
-    logging.info("Watching tasks file: %s", tasks_path)
-    last_mod = None
-    while True:
+    store = open_task_store(config)
+    source = open_task_source(config)
+    statuses_filter = (config.get("task_source") or {}).get("statuses")
+    if config.get("sync_excel", True) and source.exists():
+        logging.info("Syncing tasks from %s (%s)", tasks_path, source.format)
+        store.import_source(source, statuses=statuses_filter)
+
+    worker_id = f"runner-{socket.gethostname()}-{os.getpid()}"
+    lease_seconds = float((config.get("serve") or {}).get("lease_seconds", 300))
+    claimed = store.claim(worker_id, limit=max(store.count(), 1), lease_seconds=lease_seconds,
+                          statuses=statuses_filter or ("pending",))
+    tasks = TaskTable.from_frame(pd.DataFrame(claimed, columns=TASK_COLUMNS))
+    try:
+        changed = _run_claimed(config, tasks, tasks_path, incremental, store, worker_id, lease_seconds)
+    except BaseException:
+        store.release(worker_id, list(tasks.task_id))
+        raise
+    written = source.write_back(read_tasks(store), changed, fmt=config.get("output_format"))
+    logging.info("Wrote updated tasks to %s", written)
+
+
+def _run_claimed(config, tasks: TaskTable, tasks_path: str, incremental: bool, store: TaskStore,
+                 worker_id: str, lease_seconds: float) -> Dict[str, str]:
+    """Dispatch the claimed `tasks` and ack their statuses; returns the statuses that were recorded."""
+    pending = tasks.views(np.arange(len(tasks)))
+    fingerprints = {}
+    fingerprints_store = FingerprintStore(fingerprint_path(tasks_path)) if incremental else None
+    if fingerprints_store is not None:
+        candidates, pending = pending, []
+        for t in candidates:
+            fp = task_fingerprint(t.description, t.status)
+            # Only a completed run stands in for this one; anything else may succeed when retried
+            if fingerprints_store.previous_result(t.task_id, fp) == "completed":
+                t.status = "completed"
+            else:
+                fingerprints[t.task_id] = fp
+                pending.append(t)
+        logging.info("Incremental mode: dispatching %d of %d tasks", len(pending), len(tasks))
+
+    # Tasks run concurrently; statuses come back in sheet order so the written sheet is unchanged
+    log_file = os.getenv("AGENT_LOG_FILE") or config.get("log_file")
+    scheduler = TaskScheduler(
+        SchedulerConfig.from_config(config),
+        initializer=logging_config.configure_logging,
+        initargs=(log_file, config.get('log_level', 'INFO')),
+    )
+    with _LeaseKeeper(store.extend_lease, worker_id, list(tasks.task_id), lease_seconds):
+        statuses = scheduler.run(process_task, pending, classify=action_type, on_error=lambda t, e: 'failed',
+                                 outcome=str)
+
+    for t, new_status in zip(pending, statuses):
+        _record_outcome(new_status)
+        logging.info("Task %s: %s -> %s", t.task_id, t.status, new_status)
+        if fingerprints_store is not None:
+            fingerprints_store.record(t.task_id, fingerprints[t.task_id], new_status)
+    tasks.update_statuses([t.index for t in pending], statuses)
+
+    # Every claimed task is acked, including those skipped above, which keep their status
+    results = dict(zip(tasks.task_id, tasks.statuses))
+    acked = store.ack(worker_id, results)
+    if len(acked) < len(results):
+        logging.warning("Leases lost before ack (tasks were redelivered): %s", sorted(set(results) - set(acked)))
+    if fingerprints_store is not None:
+        fingerprints_store.retain(t["task_id"] for t in store.list_tasks())
+        fingerprints_store.save()
+    return {task_id: results[task_id] for task_id in acked}
+
+
+def run_watch(config, stop: threading.Event | None = None):
+    """Process the tasks file on startup and again whenever it changes, until `stop` is set."""
+    tasks_path = os.path.join(config["data_dir"], config["tasks_file"])
+    watch_cfg = config.get("watch") or {}
+    watcher = open_watcher(
+        tasks_path,
+        backend=watch_cfg.get("backend", "auto"),
+        debounce=float(watch_cfg.get("debounce_ms", 50)) / 1000.0,
+        poll_interval=float(watch_cfg.get("poll_interval", 5)),
+    )
+    logging.info("Watching tasks file: %s (%s)", tasks_path, type(watcher).__name__)
+    incremental = config.get("incremental", True)
+
+    def _process():
         try:
-            mod = os.path.getmtime(tasks_path)
-            if last_mod is None or mod > last_mod:
-                logging.info("Detected change. Processing tasks...")
-                process_tasks_file(config)
-                last_mod = mod
+            process_tasks_file(config, incremental=incremental)
         except Exception as e:
             logging.error("Error monitoring tasks: %s", e)
-        time.sleep(5)
+
+    try:
+        if os.path.exists(tasks_path):
+            _process()
+        for _ in watcher.changes(stop):
+            logging.info("Detected change. Processing tasks...")
+            _process()
+    finally:
+        watcher.close()
+
+
+class _LeaseKeeper:
+    """Extends the leases of in-flight tasks every third of the lease period while they run.
+
+    `extend(worker_id, task_ids, lease_seconds)` is `LeaseClient.extend` or `TaskStore.extend_lease`.
+    """
+
+    def __init__(self, extend: Callable[[str, List[str], float], object], worker_id: str, task_ids: List[str],
+                 lease_seconds: float):
+        self._extend = extend
+        self._worker_id = worker_id
+        self._task_ids = task_ids
+        self._lease_seconds = lease_seconds
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f'lease-{worker_id}')
+
+    def _run(self):
+        while not self._done.wait(self._lease_seconds / 3):
+            try:
+                self._extend(self._worker_id, self._task_ids, self._lease_seconds)
+            except Exception as e:
+                logging.warning('Could not extend leases for %s: %s', self._task_ids, e)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+        return False
+
+
+def run_worker(config, worker_id: str, stop: threading.Event | None = None, client: LeaseClient | None = None):
+    """Lease tasks from the MCP server, process them and ack their statuses until `stop` is set.
+
+    If the worker dies mid-task its leases expire after `serve.lease_seconds` and the server hands the
+    tasks to another worker.
+    """
+    serve_cfg = config.get("serve") or {}
+    lease_seconds = float(serve_cfg.get("lease_seconds", 300))
+    max_tasks = int(serve_cfg.get("max_tasks", 1))
+    wait = float(serve_cfg.get("poll_wait", 20))
+    retry_delay = float(serve_cfg.get("retry_delay", 2))
+    stop = stop or threading.Event()
+    client = client or LeaseClient.from_config(config)
+    logging.info("Worker %s leasing tasks from %s", worker_id, client.base_url)
+    try:
+        while not stop.is_set():
+            try:
+                records = client.lease(worker_id, max_tasks=max_tasks, lease_seconds=lease_seconds, wait=wait)
+            except requests.RequestException as e:
+                logging.warning("Lease request failed: %s", e)
+                stop.wait(retry_delay)
+                continue
+            if not records:
+                continue
+            statuses: Dict[str, str] = {}
+            with _LeaseKeeper(client.extend, worker_id, [r["task_id"] for r in records], lease_seconds):
+                for record in records:
+                    task = task_from_record(record)
+                    try:
+                        new_status = process_task(task)
+                    except Exception as e:
+                        logging.exception("Failed to process task %s: %s", task.task_id, e)
+                        new_status = "failed"
+                    _record_outcome(new_status)
+                    logging.info("Task %s: %s -> %s", task.task_id, task.status, new_status)
+                    statuses[task.task_id] = new_status
+            while True:
+                try:
+                    client.ack(worker_id, statuses)
+                    break
+                except requests.RequestException as e:
+                    # If the lease expires meanwhile the task is redelivered and the late ack reports it lost
+                    logging.warning("Ack failed for %s: %s", list(statuses), e)
+                    if stop.wait(retry_delay):
+                        break
+    finally:
+        client.close()
+
+
+def _worker_process(config, worker_id: str):
+    log_file = os.getenv("AGENT_LOG_FILE") or config.get("log_file")
+    logging_config.configure_logging(log_file, level=config.get('log_level', 'INFO'))
+    try:
+        run_worker(config, worker_id)
+    except KeyboardInterrupt:
+        pass
+
+
+def serve(config, workers: int | None = None):
+    """Run `workers` lease/ack worker processes (or one in-process worker) until interrupted."""
+    workers = workers or int((config.get("serve") or {}).get("workers", 1))
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    if workers <= 1:
+        run_worker(config, f"{prefix}-0")
+        return
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_worker_process, args=(config, f"{prefix}-{i}"), name=f"agent-worker-{i}")
+             for i in range(workers)]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.join()
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--process-tasks", action="store_true")
     parser.add_argument("--watch", action="store_true")
+    parser.add_argument("--incremental", action="store_true", help="Only process new or changed tasks")
+    parser.add_argument("--sync-excel", choices=["import", "export"],
+                        help="Import the tasks sheet into the task store, or export the store to the sheet")
+    parser.add_argument("--serve", action="store_true", help="Lease tasks from the MCP server until interrupted")
+    parser.add_argument("--workers", type=int, help="Worker processes for --serve (default serve.workers)")
+    parser.add_argument("--server-url", help="MCP server URL for --serve (default from api_host/api_port)")
     args = parser.parse_args()
 
     cfg = load_config()
@@ -206,6 +441,7 @@ def main():
 
     # Start metrics server for monitoring
     start_metrics(cfg.get('metrics_port', 8000))
+    track_backlog(lambda: open_task_store(cfg).count('pending'))
     # Vault: optional fetch of secret keys for configuration (do not log secret values)
     try:
         vault_cfg = cfg.get('vault') or {}
@@ -217,12 +453,26 @@ def main():
     except Exception:
         logging.info('Vault not configured or unreachable; using environment fallbacks')
 
-    if args.process_tasks:
+    if args.incremental:
+        cfg["incremental"] = True
+
+    if args.sync_excel:
+        store = open_task_store(cfg)
+        tasks_path = os.path.join(cfg["data_dir"], cfg["tasks_file"])
+        if args.sync_excel == "import":
+            store.import_source(open_task_source(cfg))
+        else:
+            store.export_excel(tasks_path)
+    elif args.process_tasks:
         process_tasks_file(cfg)
     elif args.watch:
         run_watch(cfg)
+    elif args.serve:
+        if args.server_url:
+            cfg.setdefault("serve", {})["server_url"] = args.server_url
+        serve(cfg, args.workers)
     else:
-        print("No action specified. Use --process-tasks or --watch")
+        print("No action specified. Use --process-tasks, --watch, --serve or --sync-excel")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Config and API-token provider for the MCP server.
+
+The agent config is parsed once and kept in memory. It is reloaded when `AGENT_CONFIG_PATH` points
+to a different file, when the file's mtime or size changes (checked at most once per
+`check_interval` seconds), or after `invalidate()`, which the server calls on SIGHUP.
+
+Accepted tokens, in order of precedence:
+- `AGENT_API_TOKEN` (several tokens may be given comma-separated)
+- `api_token` and/or an `api_tokens` list in the config
+- `agent_api_token` at the config's Vault `secrets_path` (comma-separated), looked up once and then
+  re-checked every `VAULT_TOKEN_REFRESH` seconds
+
+Several tokens can be active at once so a new token can be rolled out before the old one is removed.
+Presented tokens are compared in constant time. With no token configured every request is accepted.
+
+Async servers call `refresh()` off the event loop (file and Vault I/O may block) and read with
+`refresh=False`, which only returns the snapshot published by the last `refresh()`.
+"""
+import hmac
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, FrozenSet, Optional, Tuple
+
+from .vault_client import VaultClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'agent_config.json')
+CONFIG_CHECK_INTERVAL = 1.0
+VAULT_TOKEN_REFRESH = 60.0
+
+
+def parse_tokens(value) -> FrozenSet[bytes]:
+    """Token set from a comma-separated string or a list of strings; blanks are dropped."""
+    if not value:
+        return frozenset()
+    items = value.split(',') if isinstance(value, str) else value
+    return frozenset(str(t).strip().encode('utf-8') for t in items if str(t).strip())
+
+
+@dataclass
+class _Snapshot:
+    path: str
+    signature: Optional[Tuple[int, int]]
+    config: dict
+    tokens: FrozenSet[bytes]
+    vault_tokens: FrozenSet[bytes] = frozenset()
+    vault_checked_at: Optional[float] = None
+
+
+class ConfigProvider:
+    def __init__(self, default_path: str = DEFAULT_CONFIG_PATH, check_interval: float = CONFIG_CHECK_INTERVAL,
+                 clock: Callable[[], float] = time.monotonic):
+        self.default_path = default_path
+        self.check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+        # Set by refresh() once its Vault tokens are resolved; read by the refresh=False accessors
+        self._published: Optional[_Snapshot] = None
+        self._next_check = 0.0
+        self._stale = False
+        self._env_raw: Optional[str] = None
+        self._env_tokens: FrozenSet[bytes] = frozenset()
+
+    def path(self) -> str:
+        return os.getenv('AGENT_CONFIG_PATH') or self.default_path
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self, path: str) -> _Snapshot:
+        signature = self._signature(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        tokens = parse_tokens(config.get('api_token')) | parse_tokens(config.get('api_tokens'))
+        logger.info('Loaded config from %s', path)
+        return _Snapshot(path=path, signature=signature, config=config, tokens=tokens)
+
+    def _current(self) -> _Snapshot:
+        path = self.path()
+        snap = self._snapshot
+        now = self._clock()
+        if snap is not None and snap.path == path and not self._stale:
+            if now < self._next_check:
+                return snap
+            self._next_check = now + self.check_interval
+            if self._signature(path) == snap.signature:
+                return snap
+        with self._lock:
+            snap = self._snapshot
+            if snap is None or snap.path != path or self._stale or self._signature(path) != snap.signature:
+                snap = self._snapshot = self._load(path)
+                self._stale = False
+                self._next_check = self._clock() + self.check_interval
+            return snap
+
+    def refresh(self):
+        """Reload the config and re-check Vault tokens when due, then publish the result. May block."""
+        snap = self._current()
+        if not snap.tokens:
+            self._vault_tokens(snap)
+        self._published = snap
+
+    def config(self, refresh: bool = True) -> dict:
+        """The current config; callers must treat it as read-only.
+
+        With `refresh=False` the last published config is returned without touching the file system.
+        """
+        if not refresh and self._published is not None:
+            return self._published.config
+        return self._current().config
+
+    def invalidate(self):
+        """Force a reload (and a fresh Vault token lookup) on the next access."""
+        self._stale = True
+
+    def _vault_tokens(self, snap: _Snapshot) -> FrozenSet[bytes]:
+        now = self._clock()
+        if snap.vault_checked_at is not None and now - snap.vault_checked_at < VAULT_TOKEN_REFRESH:
+            return snap.vault_tokens
+        with self._lock:
+            if snap.vault_checked_at is not None and now - snap.vault_checked_at < VAULT_TOKEN_REFRESH:
+                return snap.vault_tokens
+            vcfg = snap.config.get('vault') or {}
+            tokens = frozenset()
+            if vcfg.get('secrets_path'):
+                try:
+                    vc = VaultClient(vault_addr=vcfg.get('addr'))
+                    tokens = parse_tokens(vc.get_secret_value(vcfg.get('secrets_path'), 'agent_api_token'))
+                except Exception as e:
+                    logger.warning('Vault token lookup failed: %s', e)
+            snap.vault_tokens = tokens
+            snap.vault_checked_at = self._clock()
+            return tokens
+
+    def tokens(self, refresh: bool = True) -> FrozenSet[bytes]:
+        """Currently accepted API tokens; empty when authentication is not configured."""
+        env = os.environ.get('AGENT_API_TOKEN')
+        if env:
+            if env != self._env_raw:
+                self._env_tokens = parse_tokens(env)
+                self._env_raw = env
+            return self._env_tokens
+        if not refresh and self._published is not None:
+            snap = self._published
+            return snap.tokens or snap.vault_tokens
+        snap = self._current()
+        return snap.tokens or self._vault_tokens(snap)
+
+    def authorized(self, presented: Optional[str], refresh: bool = True) -> bool:
+        tokens = self.tokens(refresh)
+        if not tokens:
+            return True
+        if not presented:
+            return False
+        candidate = presented.encode('utf-8')
+        ok = False
+        # Compare against every token so the time taken does not reveal which one matched
+        for token in tokens:
+            ok |= hmac.compare_digest(candidate, token)
+        return ok
+
+
+def install_sighup_handler(provider: ConfigProvider):
+    """Reload `provider` on SIGHUP. Must be called from the main thread; a no-op where SIGHUP does not exist."""
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, lambda signum, frame: provider.invalidate())
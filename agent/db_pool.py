@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Pooled SQLite connections for `actions.db_query`.
+
+One pool exists per database path; each thread gets its own long-lived connection (sqlite3 connections
+must not be shared across threads), so repeated queries skip connection setup and reuse the
+connection's prepared-statement cache. Read-write connections put the database in WAL mode and apply
+tuned pragmas; SELECT-only queries use a separate `mode=ro` connection.
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+# Pragmas applied to every connection; journal_mode is set once per database on the read-write connection
+CONNECTION_PRAGMAS = {
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -16000,  # negative values are KiB: 16 MiB page cache
+    'temp_store': 'MEMORY',
+}
+CACHED_STATEMENTS = 256
+
+_WRITE_KEYWORDS = re.compile(r'\b(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER|ATTACH|DETACH|PRAGMA|VACUUM)\b', re.I)
+_LEADING_COMMENTS = re.compile(r'^\s*(?:(?:--[^\n]*\n|/\*.*?\*/)\s*)*', re.S)
+
+
+def is_read_only_query(query: str) -> bool:
+    """True for statements that only read: SELECT/VALUES/EXPLAIN, or WITH without a write clause."""
+    body = _LEADING_COMMENTS.sub('', query or '')
+    keyword = body.split(None, 1)[0].upper() if body.strip() else ''
+    if keyword in ('SELECT', 'VALUES', 'EXPLAIN'):
+        return True
+    return keyword == 'WITH' and not _WRITE_KEYWORDS.search(body)
+
+
+class ConnectionPool:
+    def __init__(self, db_path: str):
+        self.db_path = os.path.abspath(db_path)
+        self._local = threading.local()
+
+    def _apply_pragmas(self, conn: sqlite3.Connection):
+        for name, value in CONNECTION_PRAGMAS.items():
+            conn.execute(f'PRAGMA {name}={value}')
+
+    def _open_read_write(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, cached_statements=CACHED_STATEMENTS)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        self._apply_pragmas(conn)
+        return conn
+
+    def _open_read_only(self) -> sqlite3.Connection:
+        # The read-write connection is opened first so the database is in WAL mode and its -shm file exists
+        self.connection(read_only=False)
+        uri = f'file:{quote(self.db_path)}?mode=ro'
+        try:
+            conn = sqlite3.connect(uri, uri=True, cached_statements=CACHED_STATEMENTS)
+        except sqlite3.OperationalError as e:
+            logger.warning('Read-only open of %s failed (%s); using a query_only connection', self.db_path, e)
+            conn = sqlite3.connect(self.db_path, cached_statements=CACHED_STATEMENTS)
+            conn.execute('PRAGMA query_only=ON')
+        self._apply_pragmas(conn)
+        return conn
+
+    def connection(self, read_only: bool = False) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conns: Dict[str, sqlite3.Connection] = getattr(self._local, 'conns', None)
+        if conns is None:
+            conns = self._local.conns = {}
+        mode = 'ro' if read_only else 'rw'
+        conn = conns.get(mode)
+        if conn is None:
+            conn = self._open_read_only() if read_only else self._open_read_write()
+            conns[mode] = conn
+        return conn
+
+    def close(self):
+        """Close the calling thread's connections."""
+        for conn in (getattr(self._local, 'conns', None) or {}).values():
+            conn.close()
+        self._local.conns = {}
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(key)
+        return pool
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Pool of pre-started sandbox containers used by `executor.run_in_docker`.
+
+A cold `docker run --rm` pays for container creation and image startup on every command. Instead,
+containers are started once (`docker run -d ... sleep infinity`) with the same `--cpus`, `--memory`
+and seccomp settings, and commands run in them with `docker exec`. A container is removed and
+replaced in the background after `max_uses` commands, or as soon as a command in it fails or times
+out, so a command never sees state left behind by a failed one.
+
+Pool size and reuse count come from the `sandbox` section of the agent config (`docker_pool_size`,
+`docker_max_uses`), overridden by AGENT_DOCKER_POOL_SIZE / AGENT_DOCKER_MAX_USES. A size of 0
+disables the pool and every command gets a cold `docker run --rm`.
+"""
+import atexit
+import logging
+import os
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .config_provider import ConfigProvider
+from .output_capture import OnChunk, OutputCapture, pump
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_USES = 50
+SECCOMP_PATH = os.path.join(os.path.dirname(__file__), '..', 'security', 'seccomp.json')
+CONTAINER_LABEL = 'agent.sandbox=1'
+# Time allowed for `docker run -d` / `docker rm -f` themselves
+DOCKER_CLI_TIMEOUT = 60
+
+config_provider = ConfigProvider()
+
+
+class ContainerError(RuntimeError):
+    pass
+
+
+def container_options(cpus: float, mem: str) -> List[str]:
+    """Resource and seccomp flags shared by pooled and one-off containers."""
+    return ['--cpus', str(cpus), '--memory', str(mem), '--security-opt', f'seccomp={SECCOMP_PATH}']
+
+
+def _remove(container_ids: List[str]):
+    if not container_ids:
+        return
+    try:
+        subprocess.run(['docker', 'rm', '-f', *container_ids], stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, timeout=DOCKER_CLI_TIMEOUT)
+    except Exception as e:
+        logger.warning('Could not remove sandbox containers %s: %s', container_ids, e)
+
+
+class _Container:
+    def __init__(self, image: str, cpus: float, mem: str):
+        proc = subprocess.run(
+            ['docker', 'run', '-d', '--rm', '--label', CONTAINER_LABEL, *container_options(cpus, mem),
+             image, 'sleep', 'infinity'],
+            capture_output=True, text=True, timeout=DOCKER_CLI_TIMEOUT)
+        if proc.returncode != 0 or not proc.stdout.strip():
+            raise ContainerError(f'docker run failed ({proc.returncode}): {proc.stderr.strip()}')
+        self.id = proc.stdout.strip()
+        self.uses = 0
+
+    def exec(self, command: str, timeout: Optional[float], on_chunk: OnChunk) -> int:
+        self.uses += 1
+        proc = subprocess.Popen(['docker', 'exec', self.id, 'bash', '-lc', command],
+                                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return pump(proc, on_chunk, timeout)
+
+
+class ContainerPool:
+    """Thread-safe pool of warm containers for one image and resource setting."""
+
+    def __init__(self, image: str, cpus: float, mem: str, size: int = DEFAULT_POOL_SIZE,
+                 max_uses: int = DEFAULT_MAX_USES):
+        self.image = image
+        self.cpus = cpus
+        self.mem = mem
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self._idle: List[_Container] = []
+        self._count = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def _start(self) -> _Container:
+        start = time.perf_counter()
+        container = _Container(self.image, self.cpus, self.mem)
+        logger.debug('Started sandbox container %s in %.3fs', container.id[:12], time.perf_counter() - start)
+        return container
+
+    def _add(self):
+        """Start one container into the idle list; the slot must already be counted."""
+        try:
+            container = self._start()
+        except Exception as e:
+            logger.warning('Could not start sandbox container: %s', e)
+            with self._cond:
+                self._count -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            if not self._closed:
+                self._idle.append(container)
+                self._cond.notify()
+                return
+            self._count -= 1
+        _remove([container.id])
+
+    def warm(self):
+        """Start containers up to the pool size in parallel and wait for them."""
+        with self._cond:
+            missing = self.size - self._count
+            self._count += missing
+        threads = [threading.Thread(target=self._add, daemon=True) for _ in range(missing)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def _acquire(self) -> _Container:
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise ContainerError('container pool is closed')
+                if self._idle:
+                    return self._idle.pop()
+                if self._count < self.size:
+                    self._count += 1
+                    break
+                self._cond.wait()
+        try:
+            return self._start()
+        except Exception:
+            with self._cond:
+                self._count -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, container: _Container, healthy: bool):
+        retire = not healthy or container.uses >= self.max_uses
+        with self._cond:
+            if not retire and not self._closed:
+                self._idle.append(container)
+                self._cond.notify()
+                return
+            replace = not self._closed
+            if not replace:
+                self._count -= 1
+        # The slot stays counted while the replacement starts, so waiters are not oversubscribed
+        _remove([container.id])
+        if replace:
+            threading.Thread(target=self._add, daemon=True).start()
+
+    def run(self, command: str, timeout: Optional[float] = None,
+            on_chunk: Optional[OnChunk] = None) -> subprocess.CompletedProcess:
+        """Run `command` with `bash -lc` in a pooled container.
+
+        Output chunks go to `on_chunk(stream, data)`; without one, the result carries the whole
+        stdout/stderr text. Raises subprocess.TimeoutExpired on timeout; the container is then
+        removed, which also stops the command inside it.
+        """
+        capture = OutputCapture() if on_chunk is None else None
+        container = self._acquire()
+        healthy = False
+        try:
+            returncode = container.exec(command, timeout, on_chunk or capture.write)
+            healthy = returncode == 0
+            if capture is None:
+                return subprocess.CompletedProcess(command, returncode)
+            return subprocess.CompletedProcess(command, returncode, capture.stdout, capture.stderr)
+        finally:
+            self._release(container, healthy)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._count -= len(idle)
+            self._cond.notify_all()
+        _remove([c.id for c in idle])
+
+
+def pool_settings() -> Tuple[int, int]:
+    """(size, max_uses) from the environment, else the config's `sandbox` section."""
+    try:
+        section = config_provider.config().get('sandbox') or {}
+    except Exception:
+        section = {}
+    size = os.environ.get('AGENT_DOCKER_POOL_SIZE', section.get('docker_pool_size', DEFAULT_POOL_SIZE))
+    max_uses = os.environ.get('AGENT_DOCKER_MAX_USES', section.get('docker_max_uses', DEFAULT_MAX_USES))
+    return int(size), int(max_uses)
+
+
+_pools: Dict[Tuple[str, str, str], ContainerPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_container_pool(image: str, cpus: float, mem: str) -> Optional[ContainerPool]:
+    """Process-wide pool for (image, cpus, mem); None when the pool size is 0."""
+    size, max_uses = pool_settings()
+    if size <= 0:
+        return None
+    key = (image, str(cpus), str(mem))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is not None and (pool.size, pool.max_uses) == (size, max_uses):
+            return pool
+        if pool is not None:
+            pool.close()
+        pool = _pools[key] = ContainerPool(image, cpus, mem, size=size, max_uses=max_uses)
+    pool.warm()
+    return pool
+
+
+def close_container_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_container_pools)
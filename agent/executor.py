@@ -1,6 +1,11 @@
 #!/usr/bin/env python3
 """
 Safe executor: runs a command or a whitelisted script under resource limits and checks policy file.
+
+The parsed policy is cached until the policy file changes. Commands are launched through a pool of
+pre-started, rlimit-confined launcher processes (see agent/sandbox.py); set AGENT_SANDBOX_WORKERS=0 to
+launch each command directly with a `preexec_fn` instead. `run_in_docker` reuses warm containers from
+agent/docker_pool.py. Command output is streamed and capped per stream (see agent/output_capture.py).
 """
 import os
 import shlex
@@ -8,20 +13,66 @@ import subprocess
 import time
 import logging
 import resource
-from typing import Optional
+import threading
+from typing import Dict, Optional, Tuple
 
 import ruamel.yaml as yaml
 import shutil
 
+from .docker_pool import container_options, get_container_pool
+from .matching import AhoCorasick, SuffixIndex
+from .metrics_server import instrument
+from .output_capture import OnChunk, OutputCapture, default_max_bytes, pump
+from .sandbox import get_sandbox_pool
+
 POLICY_PATH = os.path.join(os.path.dirname(__file__), '..', 'security', 'agent_policy.yaml')
 
 logger = logging.getLogger(__name__)
 
 
+def _run_command_patterns(actions) -> list:
+    patterns = []
+    for a in actions or []:
+        if a.get('type') == 'run_command':
+            patterns.extend(str(c).strip() for c in (a.get('commands') or []))
+    return [p for p in patterns if p]
+
+
+class CompiledPolicy:
+    """Policy rules compiled into indexes so a check is one pass over the command.
+
+    A command is allowed when it equals an allowed command, or contains one (or its basename, e.g.
+    /full/path/generate_sample_xlsx.py), and contains no prohibited command. Prohibited commands are
+    also matched with runs of whitespace collapsed, so `rm  -rf /` is refused like `rm -rf /`.
+    """
+
+    def __init__(self, data: Optional[dict]):
+        data = data or {}
+        allowed = _run_command_patterns(data.get('allowed_actions'))
+        self.exact = frozenset(allowed)
+        # A command always contains its own basename, so indexing the basenames alone is equivalent
+        self.allowed = AhoCorasick(os.path.basename(c) or c for c in allowed)
+        self.prohibited = AhoCorasick(_run_command_patterns(data.get('prohibited_actions')))
+        self.scripts = SuffixIndex(str(s) for s in (data.get('whitelisted_scripts') or []))
+
+    def denied_by(self, cmd: str) -> Optional[str]:
+        """The prohibited command that `cmd` contains, if any."""
+        return self.prohibited.first_match(cmd) or self.prohibited.first_match(' '.join(cmd.split()))
+
+    def allows_command(self, cmd: str) -> bool:
+        if self.denied_by(cmd):
+            return False
+        return cmd.strip() in self.exact or self.allowed.search(cmd)
+
+    def is_script_whitelisted(self, script_path: str) -> bool:
+        return self.scripts.match(script_path) is not None
+
+
 class Policy:
     def __init__(self, path: Optional[str] = None):
         self.path = path or POLICY_PATH
         self._data = self._load()
+        self.compiled = CompiledPolicy(self._data)
 
     def _load(self):
         if os.path.exists(self.path):
@@ -30,26 +81,36 @@ class Policy:
         return {}
 
     def allows_command(self, cmd: str) -> bool:
-        # Basic check: exact match or substring in whitelisted commands
-        allowed = self._data.get('allowed_actions', [])
-        for a in allowed:
-            if a.get('type') == 'run_command':
-                for c in a.get('commands', []):
-                    candidate = c.strip()
-                    if cmd.strip() == candidate or candidate in cmd:
-                        return True
-                    # Allow matching by basename, e.g., /full/path/generate_sample_xlsx.py
-                    try:
-                        base = os.path.basename(candidate)
-                        if base in cmd or cmd.strip().endswith(base):
-                            return True
-                    except Exception:
-                        pass
-        return False
+        return self.compiled.allows_command(cmd)
+
+    def denies_command(self, cmd: str) -> bool:
+        """True when `cmd` matches a `prohibited_actions` entry."""
+        return self.compiled.denied_by(cmd) is not None
 
     def is_script_whitelisted(self, script_path: str) -> bool:
-        w = self._data.get('whitelisted_scripts', []) or []
-        return any(script_path.endswith(s) for s in w)
+        return self.compiled.is_script_whitelisted(script_path)
+
+
+_policies: Dict[str, Tuple[Optional[tuple], Policy]] = {}
+_policies_lock = threading.Lock()
+
+
+def get_policy(path: Optional[str] = None) -> Policy:
+    """Return the parsed policy, re-reading the file only when its mtime or size changed."""
+    path = os.path.abspath(path or POLICY_PATH)
+    try:
+        st = os.stat(path)
+        sig = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        sig = None
+    with _policies_lock:
+        cached = _policies.get(path)
+        if cached is not None and cached[0] == sig:
+            return cached[1]
+    policy = Policy(path)
+    with _policies_lock:
+        _policies[path] = (sig, policy)
+    return policy
 
 
 def _limit_resources(cpu_seconds: int = 5, mem_bytes: int = 512 * 1024 * 1024):
@@ -60,34 +121,81 @@ def _limit_resources(cpu_seconds: int = 5, mem_bytes: int = 512 * 1024 * 1024):
     return _lim
 
 
-def run_safe_command(command: str, timeout: int = 30, check_policy: bool = True) -> dict:
-    policy = Policy()
-    if check_policy and not policy.allows_command(command):
+def _run_direct(args, timeout: int, on_chunk: OnChunk) -> dict:
+    start = time.perf_counter()
+    proc = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            preexec_fn=_limit_resources())
+    spawned = time.perf_counter()
+    returncode = pump(proc, on_chunk, timeout)
+    return {'returncode': returncode, 'spawn': spawned - start, 'run': time.perf_counter() - spawned}
+
+
+def _capture(max_output_bytes: Optional[int], spill: Optional[str], on_output: Optional[OnChunk]) -> OutputCapture:
+    if max_output_bytes is None:
+        max_output_bytes = default_max_bytes()
+    return OutputCapture(max_bytes=max_output_bytes or None, spill_name=spill, on_output=on_output)
+
+
+@instrument('executor.run_safe_command', outcome=lambda out: out.get('status'))
+def run_safe_command(command: str, timeout: int = 30, check_policy: bool = True,
+                     max_output_bytes: Optional[int] = None, spill: Optional[str] = None,
+                     on_output: Optional[OnChunk] = None) -> dict:
+    """Run `command` under resource limits if the policy allows it.
+
+    Output is read as it arrives. Per stream, the result keeps the first and last `max_output_bytes / 2`
+    bytes (default AGENT_OUTPUT_MAX_BYTES; 0 keeps everything). With `spill`, the full output is
+    also written to exports/command_output/<spill>.{stdout,stderr}.log (characters outside
+    `[A-Za-z0-9_.-]` in `spill` become `_`). `on_output(stream, data)` is called with each chunk as it
+    is read. The result carries `timings` (seconds spent on the policy check, spawning and running) and
+    the capture summary (`output_bytes`, `truncated`, `output_files`).
+    """
+    t0 = time.perf_counter()
+    if check_policy and not get_policy().allows_command(command):
         logger.warning('Command not allowed by policy: %s', command)
         return {'status': 'denied', 'reason': 'policy'}
+    timings = {'policy_check': time.perf_counter() - t0}
 
     args = shlex.split(command)
+    capture = _capture(max_output_bytes, spill, on_output)
     try:
         start = time.time()
-        proc = subprocess.run(args, capture_output=True, text=True, timeout=timeout, preexec_fn=_limit_resources())
+        pool = get_sandbox_pool()
+        if pool is not None:
+            out = pool.run(args, timeout=timeout, on_chunk=capture.write)
+        else:
+            out = _run_direct(args, timeout, capture.write)
         duration = time.time() - start
+        timings['spawn'] = out.get('spawn')
+        timings['run'] = out.get('run')
+        if 'timeout' in out:
+            logger.error('Command timeout: %s', command)
+            return {'status': 'timeout', 'reason': out['timeout'], 'stdout': capture.stdout,
+                    'stderr': capture.stderr, 'timings': timings, **capture.summary()}
+        if 'error' in out:
+            logger.error('Command failed: %s: %s', command, out['error'])
+            return {'status': 'error', 'reason': out['error'], 'timings': timings}
         return {
-            'status': 'ok' if proc.returncode == 0 else 'failed',
-            'returncode': proc.returncode,
-            'stdout': proc.stdout,
-            'stderr': proc.stderr,
+            'status': 'ok' if out['returncode'] == 0 else 'failed',
+            'returncode': out['returncode'],
+            'stdout': capture.stdout,
+            'stderr': capture.stderr,
             'duration': duration,
+            'timings': timings,
+            **capture.summary(),
         }
     except subprocess.TimeoutExpired as e:
         logger.error('Command timeout: %s', command)
-        return {'status': 'timeout', 'reason': str(e)}
+        return {'status': 'timeout', 'reason': str(e), 'stdout': capture.stdout, 'stderr': capture.stderr,
+                'timings': timings, **capture.summary()}
     except Exception as e:
         logger.exception('Command failed: %s', command)
-        return {'status': 'error', 'reason': str(e)}
+        return {'status': 'error', 'reason': str(e), 'timings': timings}
+    finally:
+        capture.close()
 
 
 def run_safe_script(script_path: str, timeout: int = 30) -> dict:
-    policy = Policy()
+    policy = get_policy()
     if not policy.is_script_whitelisted(script_path):
         logger.warning('Script not whitelisted: %s', script_path)
         return {'status': 'denied', 'reason': 'script_whitelist'}
@@ -97,38 +205,49 @@ def run_safe_script(script_path: str, timeout: int = 30) -> dict:
     return run_safe_command(f'bash {script_path}', timeout=timeout)
 
 
-def run_in_docker(command: str, image: str = 'python:3.12-slim', timeout: int = 60, cpus: float = 0.5, mem: str = '512m') -> dict:
+@instrument('executor.run_in_docker', outcome=lambda out: out.get('status'))
+def run_in_docker(command: str, image: str = 'python:3.12-slim', timeout: int = 60, cpus: float = 0.5, mem: str = '512m',
+                  max_output_bytes: Optional[int] = None, spill: Optional[str] = None,
+                  on_output: Optional[OnChunk] = None) -> dict:
     """Run a command inside a docker container for sandboxing. Returns similar output dict.
     This is a best-effort fallback; requires docker installed on host.
+
+    Commands run with `docker exec` in a pool of warm containers (see agent/docker_pool.py); with the
+    pool size set to 0 each command gets a cold `docker run --rm`. Output is captured as in
+    `run_safe_command`.
     """
     if not shutil.which('docker'):
         return {'status': 'error', 'reason': 'docker-not-available'}
     # Basic policy check: ensure command is allowed
-    policy = Policy()
+    policy = get_policy()
     if not policy.allows_command(command):
         logger.warning('Command not allowed by policy: %s', command)
         return {'status': 'denied', 'reason': 'policy'}
-    # Build docker run command
-    docker_cmd = [
-        'docker', 'run', '--rm',
-        '--cpus', str(cpus),
-        '--memory', str(mem),
-        '--security-opt', f'seccomp={os.path.join(os.path.dirname(__file__), "..", "security", "seccomp.json")}',
-        image, 'bash', '-lc', command
-    ]
+    capture = _capture(max_output_bytes, spill, on_output)
     try:
         start = time.time()
-        proc = subprocess.run(docker_cmd, capture_output=True, text=True, timeout=timeout)
+        pool = get_container_pool(image, cpus, mem)
+        if pool is not None:
+            returncode = pool.run(command, timeout=timeout, on_chunk=capture.write).returncode
+        else:
+            docker_cmd = ['docker', 'run', '--rm', *container_options(cpus, mem), image, 'bash', '-lc', command]
+            proc = subprocess.Popen(docker_cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE)
+            returncode = pump(proc, capture.write, timeout)
         duration = time.time() - start
         return {
-            'status': 'ok' if proc.returncode == 0 else 'failed',
-            'returncode': proc.returncode,
-            'stdout': proc.stdout,
-            'stderr': proc.stderr,
+            'status': 'ok' if returncode == 0 else 'failed',
+            'returncode': returncode,
+            'stdout': capture.stdout,
+            'stderr': capture.stderr,
             'duration': duration,
+            **capture.summary(),
         }
     except subprocess.TimeoutExpired as e:
-        return {'status': 'timeout', 'reason': str(e)}
+        return {'status': 'timeout', 'reason': str(e), 'stdout': capture.stdout, 'stderr': capture.stderr,
+                **capture.summary()}
     except Exception as e:
         logger.exception('Docker execution failed: %s', e)
         return {'status': 'error', 'reason': str(e)}
+    finally:
+        capture.close()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Persistent per-task fingerprints used by the runner's incremental mode.
+
+A fingerprint is a hash of a task's description and input status. The store remembers the fingerprint
+each task had when it was last processed together with the resulting status, so unchanged rows that
+completed can be skipped and kept completed in the output sheet.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint_path(tasks_path: str) -> str:
+    """Location of the fingerprint store for a tasks file, e.g. sample_tasks.fingerprints.json."""
+    root, _ = os.path.splitext(tasks_path)
+    return root + '.fingerprints.json'
+
+
+def task_fingerprint(description: Optional[str], status: Optional[str]) -> str:
+    h = hashlib.sha256()
+    h.update(str(description).encode('utf-8'))
+    h.update(b'\x1f')
+    h.update(str(status).encode('utf-8'))
+    return h.hexdigest()
+
+
+class FingerprintStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, dict] = self._load()
+
+    def _load(self) -> Dict[str, dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception as e:
+            logger.warning('Ignoring unreadable fingerprint store %s: %s', self.path, e)
+            return {}
+
+    def previous_result(self, task_id: str, fingerprint: str) -> Optional[str]:
+        """Return the status recorded for `task_id` if it was processed with the same fingerprint."""
+        entry = self._entries.get(task_id)
+        if entry and entry.get('fingerprint') == fingerprint:
+            return entry.get('result')
+        return None
+
+    def record(self, task_id: str, fingerprint: str, result: str):
+        self._entries[task_id] = {'fingerprint': fingerprint, 'result': result}
+
+    def retain(self, task_ids: Iterable[str]):
+        """Drop entries for tasks that are no longer present in the sheet."""
+        keep = set(task_ids)
+        self._entries = {k: v for k, v in self._entries.items() if k in keep}
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+HTTP client for the MCP server's lease API, used by `agent_runner --serve` workers.
+
+Workers lease tasks (`/tasks:lease`, long-polling while the queue is empty), extend the leases of
+tasks that are still running (`/tasks:extend`), and report final statuses (`/tasks:ack`) or hand
+tasks back (`/tasks:nack`). One keep-alive `requests.Session` is used per client.
+"""
+import logging
+import os
+from typing import Dict, Iterable, List, Optional
+
+import requests
+
+from .config_provider import ConfigProvider
+
+logger = logging.getLogger(__name__)
+
+# Extra time allowed on top of a long-poll's `wait` before the HTTP request times out
+REQUEST_TIMEOUT = 30.0
+
+
+def server_url(cfg: dict) -> str:
+    """Base URL of the MCP server from AGENT_SERVER_URL or the config's `serve.server_url` / api_port."""
+    url = os.environ.get('AGENT_SERVER_URL') or (cfg.get('serve') or {}).get('server_url')
+    if url:
+        return url.rstrip('/')
+    host = cfg.get('api_host', '127.0.0.1')
+    if host in ('0.0.0.0', '::', ''):
+        host = '127.0.0.1'
+    return f"http://{host}:{cfg.get('api_port', 8080)}"
+
+
+class LeaseClient:
+    def __init__(self, base_url: str, token: Optional[str] = None, timeout: float = REQUEST_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        if token:
+            self.session.headers['X-AGENT-TOKEN'] = token
+
+    @classmethod
+    def from_config(cls, cfg: dict, url: Optional[str] = None,
+                    provider: Optional[ConfigProvider] = None) -> 'LeaseClient':
+        """Client for `cfg`'s server. The token is resolved like the server resolves it (AGENT_API_TOKEN,
+        `api_token`/`api_tokens`, then Vault) from the config at AGENT_CONFIG_PATH."""
+        tokens = (provider or ConfigProvider()).tokens()
+        # The server accepts any of several tokens; a client presents one
+        token = min(tokens).decode('utf-8') if tokens else None
+        return cls(url or server_url(cfg), token)
+
+    def _post(self, endpoint: str, payload: dict, wait: float = 0.0) -> dict:
+        resp = self.session.post(f'{self.base_url}/tasks:{endpoint}', json=payload, timeout=self.timeout + wait)
+        resp.raise_for_status()
+        return resp.json()
+
+    def lease(self, worker_id: str, max_tasks: int = 1, lease_seconds: Optional[float] = None,
+              wait: float = 0.0) -> List[dict]:
+        payload = {'worker_id': worker_id, 'max_tasks': max_tasks, 'wait': wait}
+        if lease_seconds:
+            payload['lease_seconds'] = lease_seconds
+        return self._post('lease', payload, wait)['tasks']
+
+    def ack(self, worker_id: str, statuses: Dict[str, str]) -> List[str]:
+        result = self._post('ack', {'worker_id': worker_id, 'statuses': statuses})
+        if result.get('lost'):
+            logger.warning('Leases lost before ack (tasks were redelivered): %s', result['lost'])
+        return result['acked']
+
+    def nack(self, worker_id: str, task_ids: Iterable[str]) -> List[str]:
+        return self._post('nack', {'worker_id': worker_id, 'task_ids': list(task_ids)})['released']
+
+    def extend(self, worker_id: str, task_ids: Iterable[str], lease_seconds: Optional[float] = None) -> List[str]:
+        payload = {'worker_id': worker_id, 'task_ids': list(task_ids)}
+        if lease_seconds:
+            payload['lease_seconds'] = lease_seconds
+        return self._post('extend', payload)['extended']
+
+    def close(self):
+        self.session.close()
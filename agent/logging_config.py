@@ -1,13 +1,202 @@
 #!/usr/bin/env python3
 """
 Configure structured JSON logging and optional HTTP sink.
+
+Records for the HTTP sink never block the logging call: a `QueueHandler` formats each record and puts
+it on a bounded queue, and a `QueueListener` thread ships them in batches. When the queue is full
+the oldest record is dropped and counted. Batches are sent when `batch_size` records are buffered or
+`flush_interval` seconds after the first one, as one gzip-compressed JSON array per POST over a
+keep-alive session.
+
+Settings (environment):
+- LOG_HTTP_DEST: sink URL; HTTP shipping is off when unset
+- LOG_HTTP_BATCH_SIZE (default 100), LOG_HTTP_FLUSH_INTERVAL (seconds, default 1.0)
+- LOG_HTTP_QUEUE_SIZE (default 10000), LOG_HTTP_GZIP (default 1; 0 sends plain JSON)
 """
+import atexit
+import gzip
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+import time
+from typing import List, Optional
+
 from pythonjsonlogger import jsonlogger
 
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_QUEUE_SIZE = 10000
+HTTP_TIMEOUT = 5.0
+
+
+class DropOldestQueue(queue.Queue):
+    """Bounded queue whose puts never block: when full, the oldest item is discarded and counted."""
+
+    def __init__(self, maxsize: int = DEFAULT_QUEUE_SIZE):
+        super().__init__(maxsize)
+        self.dropped = 0
+
+    def put(self, item, block=True, timeout=None):
+        with self.not_full:
+            if 0 < self.maxsize <= self._qsize():
+                self._get()
+                self.dropped += 1
+                # The discarded item will never be processed
+                self.unfinished_tasks -= 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+
+class HTTPBatchHandler(logging.Handler):
+    """Buffers formatted records and POSTs them as one JSON array per batch.
+
+    Only the queue listener's thread calls `handle`/`flush`, so the buffer needs no extra locking.
+    """
+
+    def __init__(self, url: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL, compress: bool = True,
+                 timeout: float = HTTP_TIMEOUT, session=None):
+        super().__init__()
+        import requests
+
+        self.url = url
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.compress = compress
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.buffer: List[dict] = []
+        self._first_at: Optional[float] = None
+        self.sent = 0
+        self.failed = 0
+
+    def emit(self, record):
+        if not self.buffer:
+            self._first_at = time.monotonic()
+        self.buffer.append({'log': self.format(record)})
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def time_to_flush(self) -> Optional[float]:
+        """Seconds until the buffered batch is due, or None when the buffer is empty."""
+        if not self.buffer:
+            return None
+        return max(0.0, self._first_at + self.flush_interval - time.monotonic())
+
+    def flush(self):
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        body = json.dumps(batch).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self.compress:
+            body = gzip.compress(body, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+        try:
+            resp = self.session.post(self.url, data=body, headers=headers, timeout=self.timeout)
+            resp.raise_for_status()
+            self.sent += len(batch)
+        except Exception:
+            # Best effort, as before: a failed batch is counted, never retried or logged recursively
+            self.failed += len(batch)
+
+    def close(self):
+        try:
+            self.flush()
+            self.session.close()
+        finally:
+            super().close()
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """QueueListener that also flushes its batching handlers when their flush interval elapses."""
+
+    @staticmethod
+    def _time_to_flush(handler) -> Optional[float]:
+        return handler.time_to_flush() if isinstance(handler, HTTPBatchHandler) else None
+
+    def dequeue(self, block):
+        while True:
+            due = [t for t in map(self._time_to_flush, self.handlers) if t is not None]
+            try:
+                return self.queue.get(block=True, timeout=min(due) if due else None)
+            except queue.Empty:
+                for h in self.handlers:
+                    if self._time_to_flush(h) == 0.0:
+                        h.flush()
+
+    def stop(self):
+        super().stop()
+        for h in self.handlers:
+            h.flush()
+
+
+class LogShipper:
+    """The HTTP pipeline: queue, queue handler (installed on the root logger), listener and sink handler."""
+
+    def __init__(self, url: str, formatter: logging.Formatter, level: int = logging.INFO,
+                 batch_size: int = DEFAULT_BATCH_SIZE, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, compress: bool = True):
+        self.queue = DropOldestQueue(queue_size)
+        self.queue_handler = logging.handlers.QueueHandler(self.queue)
+        # Formatting happens in the logging thread, so records are shipped exactly as they were logged
+        self.queue_handler.setFormatter(formatter)
+        self.queue_handler.setLevel(level)
+        self.http_handler = HTTPBatchHandler(url, batch_size=batch_size, flush_interval=flush_interval,
+                                             compress=compress)
+        self.http_handler.setFormatter(logging.Formatter('%(message)s'))
+        self.listener = BatchingQueueListener(self.queue, self.http_handler)
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self):
+        with self._lock:
+            if not self._running:
+                self.listener.start()
+                self._running = True
+
+    def stop(self):
+        """Drain the queue, send the last batch and close the session."""
+        with self._lock:
+            if self._running:
+                self.listener.stop()
+                self.http_handler.close()
+                self._running = False
+
+    def stats(self) -> dict:
+        return {
+            'queued': self.queue.qsize(),
+            'dropped': self.queue.dropped,
+            'sent': self.http_handler.sent,
+            'failed': self.http_handler.failed,
+        }
+
+
+_shipper: Optional[LogShipper] = None
+
+
+def get_log_shipper() -> Optional[LogShipper]:
+    return _shipper
+
+
+def stop_log_shipper():
+    """Flush and stop the HTTP shipper and remove its handler from the root logger."""
+    global _shipper
+    shipper, _shipper = _shipper, None
+    if shipper is not None:
+        logging.getLogger().removeHandler(shipper.queue_handler)
+        shipper.stop()
+
+
+atexit.register(stop_log_shipper)
+
 
 def configure_logging(log_file: str = None, level: str = 'INFO'):
+    global _shipper
     logger = logging.getLogger()
     logger.setLevel(getattr(logging, level.upper(), logging.INFO))
 
@@ -40,18 +229,17 @@ def configure_logging(log_file: str = None, level: str = 'INFO'):
     http_url = os.environ.get('LOG_HTTP_DEST')
     if http_url:
         try:
-            import requests
-
-            class HTTPHandler(logging.Handler):
-                def emit(self, record):
-                    payload = formatter.format(record)
-                    try:
-                        requests.post(http_url, json={'log': payload}, timeout=1)
-                    except Exception:
-                        pass
-
-            hh = HTTPHandler()
-            hh.setLevel(getattr(logging, level.upper(), logging.INFO))
-            logger.addHandler(hh)
+            # Reconfiguring replaces the previous shipper instead of starting a second listener
+            stop_log_shipper()
+            _shipper = LogShipper(
+                http_url, formatter,
+                level=getattr(logging, level.upper(), logging.INFO),
+                batch_size=int(os.environ.get('LOG_HTTP_BATCH_SIZE', DEFAULT_BATCH_SIZE)),
+                flush_interval=float(os.environ.get('LOG_HTTP_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)),
+                queue_size=int(os.environ.get('LOG_HTTP_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)),
+                compress=os.environ.get('LOG_HTTP_GZIP', '1') != '0',
+            )
+            _shipper.start()
+            logger.addHandler(_shipper.queue_handler)
         except Exception:
             pass
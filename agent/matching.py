@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+String-set matchers shared by the policy check (`executor.CompiledPolicy`) and other lookups that test
+text against many patterns at once.
+
+- `AhoCorasick`: does `text` contain any of the patterns (or which ones)? One left-to-right scan,
+  O(len(text)), however many patterns there are.
+- `SuffixIndex`: does `text` end with any of the suffixes? One right-to-left walk, O(len(text)).
+
+Both keep their trie transitions in a single dict keyed by `state << 21 | codepoint` and the per-state
+data in `array`s, which keeps 100k-pattern indexes compact.
+"""
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+_SHIFT = 21  # code points fit in 21 bits
+
+
+def _build_trie(words: List[str], reverse: bool = False):
+    delta: Dict[int, int] = {}
+    parent = array('i', [0])
+    label = array('i', [0])
+    depth = array('i', [0])
+    terminal = array('i', [-1])
+    for index, word in enumerate(words):
+        state = 0
+        for ch in (reversed(word) if reverse else word):
+            key = (state << _SHIFT) | ord(ch)
+            nxt = delta.get(key)
+            if nxt is None:
+                nxt = len(parent)
+                delta[key] = nxt
+                parent.append(state)
+                label.append(ord(ch))
+                depth.append(depth[state] + 1)
+                terminal.append(-1)
+            state = nxt
+        if terminal[state] < 0:
+            terminal[state] = index
+    return delta, parent, label, depth, terminal
+
+
+def _unique(patterns: Iterable[str]) -> List[str]:
+    # Empty patterns would match everything; they are ignored
+    return list(dict.fromkeys(p for p in patterns if p))
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = _unique(patterns)
+        delta, parent, label, depth, terminal = _build_trie(self.patterns)
+        size = len(parent)
+        fail = array('i', [0]) * size
+        out = array('i', terminal)
+        # Nearest state on the failure chain (itself included) that ends a pattern, for `find_all`
+        ends = array('i', [s if terminal[s] >= 0 else 0 for s in range(size)])
+        # Failure links are computed breadth-first: a state's link points to a shallower state
+        by_depth: List[List[int]] = [[] for _ in range(max(depth) + 1)] if size else []
+        for state in range(1, size):
+            by_depth[depth[state]].append(state)
+        for level in by_depth[1:]:
+            for state in level:
+                up = parent[state]
+                if up:
+                    c = label[state]
+                    f = fail[up]
+                    while True:
+                        nxt = delta.get((f << _SHIFT) | c)
+                        if nxt is not None or f == 0:
+                            break
+                        f = fail[f]
+                    fail[state] = nxt if nxt is not None else 0
+                # Report the longest pattern ending here, else whatever the failure state reports
+                if out[state] < 0:
+                    out[state] = out[fail[state]]
+                if not ends[state]:
+                    ends[state] = ends[fail[state]]
+        self._delta = delta
+        self._fail = fail
+        self._out = out
+        self._ends = ends
+        self._terminal = terminal
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def first_match(self, text: str) -> Optional[str]:
+        """Return a pattern that occurs in `text` (the first one to end), or None."""
+        delta = self._delta
+        fail = self._fail
+        out = self._out
+        state = 0
+        for ch in text:
+            c = ord(ch)
+            while True:
+                nxt = delta.get((state << _SHIFT) | c)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            if out[state] >= 0:
+                return self.patterns[out[state]]
+        return None
+
+    def search(self, text: str) -> bool:
+        return self.first_match(text) is not None
+
+    def find_all(self, text: str) -> List[str]:
+        """Return every pattern that occurs in `text`, once each, in the order they first end."""
+        delta = self._delta
+        fail = self._fail
+        ends = self._ends
+        terminal = self._terminal
+        found: Dict[int, None] = {}
+        state = 0
+        for ch in text:
+            c = ord(ch)
+            while True:
+                nxt = delta.get((state << _SHIFT) | c)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            hit = ends[state]
+            while hit:
+                found[terminal[hit]] = None
+                hit = ends[fail[hit]]
+        return [self.patterns[i] for i in found]
+
+
+class SuffixIndex:
+    """Reverse trie answering `any(text.endswith(s) for s in suffixes)`."""
+
+    def __init__(self, suffixes: Iterable[str]):
+        self.suffixes = _unique(suffixes)
+        self._delta, _, _, _, self._terminal = _build_trie(self.suffixes, reverse=True)
+
+    def __len__(self) -> int:
+        return len(self.suffixes)
+
+    def match(self, text: str) -> Optional[str]:
+        """Return the shortest suffix that `text` ends with, or None."""
+        delta = self._delta
+        terminal = self._terminal
+        state = 0
+        for ch in reversed(text):
+            state = delta.get((state << _SHIFT) | ord(ch))
+            if state is None:
+                return None
+            if terminal[state] >= 0:
+                return self.suffixes[terminal[state]]
+        return None
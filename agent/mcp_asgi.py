@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+ASGI variant of the MCP server (same `/health` and `/tasks` API as agent/mcp_server.py).
+Usage: python -m agent.mcp_asgi [--workers N]
+   or: uvicorn agent.mcp_asgi:app --workers N
+
+Requires the optional `starlette` and `uvicorn` packages.
+
+Ingest never blocks the event loop: an accepted task is put on a bounded in-process queue and a
+background writer commits queued tasks in batches (`add_many`, run in a thread). A request is answered
+once its task is committed, so a 200 means the same as with the Flask server. When the queue is full
+the server answers 429 with a `Retry-After` header instead of piling up work.
+
+Config keys: `ingest_queue_size` (default 1000), `ingest_batch_size` (default 500) and
+`ingest_retry_after` in seconds (default 1). Authentication uses the same provider as the Flask server.
+The config and tokens (including Vault lookups) are refreshed by a background task in a thread, so
+the request path only reads the provider's in-memory snapshot.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import logging
+from typing import List, Optional, Tuple
+
+try:
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+except ImportError:  # optional dependency
+    Starlette = None
+
+from .config_provider import ConfigProvider, install_sighup_handler
+from .metrics_server import QUEUE_DEPTH
+from .task_schema import task_validation_error
+from .task_store import TaskStore, open_task_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_RETRY_AFTER = 1
+
+
+class IngestQueue:
+    """Bounded queue of (store, task, future) drained by one writer task in batches."""
+
+    def __init__(self, maxsize: int = DEFAULT_QUEUE_SIZE, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._writer: Optional[asyncio.Task] = None
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, store: TaskStore, task: dict) -> asyncio.Future:
+        """Queue `task` for writing; raises asyncio.QueueFull when the queue is at capacity."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((store, task, future))
+        return future
+
+    def start(self):
+        QUEUE_DEPTH.labels('ingest').set_function(self.qsize)
+        self._writer = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Commit what is already queued, then stop the writer."""
+        await self._queue.join()
+        if self._writer is not None:
+            self._writer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._writer
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._write(loop, batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, loop, batch: List[Tuple[TaskStore, dict, asyncio.Future]]):
+        # Usually one store; group in case the config switched stores while tasks were queued
+        by_store = {}
+        for store, task, future in batch:
+            by_store.setdefault(id(store), (store, []))[1].append((task, future))
+        for store, items in by_store.values():
+            try:
+                await loop.run_in_executor(None, store.add_many, [task for task, _ in items])
+            except Exception as e:
+                logger.exception('Failed to write %d queued tasks: %s', len(items), e)
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for _, future in items:
+                if not future.done():
+                    future.set_result(True)
+
+
+def create_app(provider: Optional[ConfigProvider] = None, queue_size: Optional[int] = None,
+               batch_size: Optional[int] = None):
+    """Build the Starlette app; queue settings default to the config values."""
+    if Starlette is None:
+        raise RuntimeError('The ASGI server requires starlette: pip install starlette uvicorn')
+    provider = provider or ConfigProvider()
+    state = {}
+
+    async def health(request: Request):
+        return JSONResponse({'status': 'ok'})
+
+    async def add_task(request: Request):
+        if not provider.authorized(request.headers.get('X-AGENT-TOKEN'), refresh=False):
+            return JSONResponse({'error': 'unauthorized'}, status_code=401)
+        cfg = provider.config(refresh=False)
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        if not data or not isinstance(data, dict):
+            return JSONResponse({'error': 'invalid payload'}, status_code=400)
+        error = task_validation_error(data)
+        if error is not None:
+            return JSONResponse({'error': error}, status_code=400)
+        try:
+            future = state['ingest'].submit(open_task_store(cfg), data)
+        except asyncio.QueueFull:
+            retry_after = str(cfg.get('ingest_retry_after', DEFAULT_RETRY_AFTER))
+            return JSONResponse({'error': 'busy'}, status_code=429, headers={'Retry-After': retry_after})
+        try:
+            await future
+        except Exception:
+            return JSONResponse({'error': 'failed'}, status_code=500)
+        return JSONResponse({'ok': True})
+
+    async def refresh_config():
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(provider.check_interval)
+            try:
+                await loop.run_in_executor(None, provider.refresh)
+            except Exception as e:
+                # Keep serving the last good config and tokens
+                logger.warning('Config refresh failed: %s', e)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, provider.refresh)
+        cfg = provider.config(refresh=False)
+        await loop.run_in_executor(None, open_task_store, cfg)
+        ingest = IngestQueue(maxsize=queue_size or int(cfg.get('ingest_queue_size', DEFAULT_QUEUE_SIZE)),
+                             batch_size=batch_size or int(cfg.get('ingest_batch_size', DEFAULT_BATCH_SIZE)))
+        ingest.start()
+        state['ingest'] = ingest
+        refresher = asyncio.create_task(refresh_config())
+        try:
+            yield
+        finally:
+            refresher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await refresher
+            await ingest.stop()
+
+    routes = [
+        Route('/health', health, methods=['GET']),
+        Route('/tasks', add_task, methods=['POST']),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+config_provider = ConfigProvider()
+app = create_app(config_provider) if Starlette is not None else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ASGI MCP server')
+    parser.add_argument('--host', default=None)
+    parser.add_argument('--port', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=1, help='uvicorn worker processes')
+    args = parser.parse_args(argv)
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO)
+    cfg = config_provider.config()
+    host = args.host or cfg.get('api_host', '0.0.0.0')
+    port = args.port or cfg.get('api_port', 8080)
+    if args.workers > 1:
+        # uvicorn's supervisor restarts the workers on SIGHUP, which reloads their config
+        uvicorn.run('agent.mcp_asgi:app', host=host, port=port, workers=args.workers)
+    else:
+        install_sighup_handler(config_provider)
+        uvicorn.run(app, host=host, port=port)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,29 +4,56 @@ Minimal MCP (Model Context Protocol) server that accepts tasks through a REST AP
 Usage: python -m agent.mcp_server
 
 Endpoints:
-- POST /tasks: Accepts task payload and writes to resources/tasks.xlsx or invokes agent processor.
+- POST /tasks: Validates a task payload against agent/task_schema.py and appends it to the task store
+  (see agent/task_store.py).
+- POST /tasks:batch: Accepts a JSON array or an NDJSON body of tasks, validates each one and commits
+  the valid ones in a single write. Returns per-item accept/reject results.
+- POST /tasks:lease: Leases pending tasks to a worker (`agent_runner --serve`), long-polling up to `wait`
+  seconds when none are available. Leases expire after `lease_seconds` and are then handed out again.
+- POST /tasks:ack, /tasks:nack, /tasks:extend: Report final statuses, return tasks to the queue, or
+  extend the leases of tasks a worker still holds.
 - GET /health: Health check
+- GET /metrics: Prometheus metrics (request latency by endpoint and outcome, task backlog)
 
-Security: Simple token-based header 'X-AGENT-TOKEN' or uses VAULT for token lookup.
+Security: Simple token-based header 'X-AGENT-TOKEN' or uses VAULT for token lookup. The config and the
+accepted tokens are loaded once and reloaded on file change or SIGHUP (see agent/config_provider.py).
 """
 
 from __future__ import annotations
 
 import json
-import os
 import logging
-from flask import Flask, request, jsonify
-from pathlib import Path
+import threading
+import time
+from flask import Flask, Response, request, jsonify
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-from .vault_client import VaultClient
+from .config_provider import ConfigProvider, install_sighup_handler
+from .metrics_server import REQUEST_TIME, instrument, track_backlog
+from .task_schema import task_validation_error
+from .task_store import open_task_store
 
 app = Flask(__name__)
 logger = logging.getLogger(__name__)
 
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+DEFAULT_MAX_BATCH = 10000
+DEFAULT_LEASE_SECONDS = 300
+MAX_LEASE_WAIT = 30.0
+# Long-polling leases also re-check the store at this interval, for tasks added by other processes
+LEASE_POLL_INTERVAL = 1.0
+ACK_STATUSES = ('pending', 'in-progress', 'completed', 'failed')
+
+# Notified whenever this process commits new tasks, waking long-polling lease requests
+_tasks_added = threading.Condition()
+
+config_provider = ConfigProvider()
+
+
 def load_config(path=None):
-    env_cfg = os.getenv('AGENT_CONFIG_PATH')
-    cfg_path = path or env_cfg or os.path.join(os.path.dirname(__file__), 'agent_config.json')
-    with open(cfg_path, 'r', encoding='utf-8') as f:
+    if path is None:
+        return config_provider.config()
+    with open(path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
 
@@ -35,55 +62,197 @@ def health():
     return jsonify({'status': 'ok'})
 
 
-@app.route('/tasks', methods=['POST'])
-def add_task():
-    cfg = load_config()
-    token = request.headers.get('X-AGENT-TOKEN')
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+
+
+def _http_outcome(rv) -> str:
+    """Outcome label for a view's return value: its HTTP status code."""
+    return str(rv[1]) if isinstance(rv, tuple) else '200'
+
+
+def _authorized() -> bool:
+    return config_provider.authorized(request.headers.get('X-AGENT-TOKEN'))
 
-    # Token check: simple header or Vault-backed token check
-    api_token = os.environ.get('AGENT_API_TOKEN') or cfg.get('api_token')
-    if not api_token:
-        # Try vault
-        try:
-            vcfg = cfg.get('vault') or {}
-            vc = VaultClient(vault_addr=vcfg.get('addr'))
-            api_token = vc.get_secret_value(vcfg.get('secrets_path'), 'agent_api_token')
-        except Exception:
-            api_token = None
 
-    if api_token and token != api_token:
+@app.route('/tasks', methods=['POST'])
+@REQUEST_TIME.time()
+@instrument('mcp_server.add_task', outcome=_http_outcome)
+def add_task():
+    # Reject bad tokens before touching the config-derived store or parsing the body
+    if not _authorized():
         return jsonify({'error': 'unauthorized'}), 401
+    cfg = load_config()
 
     data = request.get_json(force=True)
-    if not data:
+    if not data or not isinstance(data, dict):
         return jsonify({'error': 'invalid payload'}), 400
-    # Expected payload: {task_id, description, status, due_date}
-    resources_dir = cfg.get('data_dir') or os.path.join(os.path.dirname(__file__), '..', 'resources')
-    tasks_file = cfg.get('tasks_file') or 'sample_tasks.xlsx'
-
-    tasks_path = Path(resources_dir) / tasks_file
-    # Ensure resources dir exists so writing tasks works when using test-local resources
-    tasks_path.parent.mkdir(parents=True, exist_ok=True)
-    # If tasks file exists, append a new row; else create new excel
+    # Expected payload: {task_id, description, status, due_date}; validated like /tasks:batch items, so a
+    # client cannot write a lease state such as 'claimed'
+    error = task_validation_error(data)
+    if error is not None:
+        return jsonify({'error': error}), 400
+    # Tasks are appended to the task store; the Excel sheet is synced explicitly by the runner
     try:
-        import pandas as pd
-        if tasks_path.exists():
-            df = pd.read_excel(tasks_path)
-            df = pd.concat([df, pd.DataFrame([data])], ignore_index=True)
-        else:
-            df = pd.DataFrame([data])
-        df.to_excel(tasks_path, index=False)
+        open_task_store(cfg).add(data)
     except Exception as e:
         logger.exception('Failed to write task: %s', e)
         return jsonify({'error': 'failed'}), 500
+    _notify_tasks_added()
 
     return jsonify({'ok': True})
 
 
+def _notify_tasks_added():
+    with _tasks_added:
+        _tasks_added.notify_all()
+
+
+def _iter_batch_items():
+    """Yield (item, parse_error) pairs from a JSON array body or a streamed NDJSON body."""
+    if request.mimetype in NDJSON_MIMETYPES:
+        # Parse line by line from the input stream rather than buffering the whole body
+        for raw in request.stream:
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line), None
+            except ValueError as e:
+                yield None, f'invalid json: {e}'
+        return
+    data = request.get_json(force=True, silent=True)
+    if not isinstance(data, list):
+        raise ValueError('expected a JSON array or an NDJSON body')
+    for item in data:
+        yield item, None
+
+
+@app.route('/tasks:batch', methods=['POST'])
+@REQUEST_TIME.time()
+@instrument('mcp_server.add_tasks_batch', outcome=_http_outcome)
+def add_tasks_batch():
+    # Reject bad tokens before touching the config-derived store or parsing the body
+    if not _authorized():
+        return jsonify({'error': 'unauthorized'}), 401
+    cfg = load_config()
+
+    max_batch = int(cfg.get('max_batch_size', DEFAULT_MAX_BATCH))
+    results = []
+    accepted = []
+    try:
+        for index, (item, error) in enumerate(_iter_batch_items()):
+            if index >= max_batch:
+                return jsonify({'error': f'batch exceeds {max_batch} tasks'}), 413
+            if error is None:
+                error = task_validation_error(item)
+            if error is None:
+                accepted.append(item)
+                results.append({'index': index, 'task_id': item['task_id'], 'ok': True})
+            else:
+                task_id = item.get('task_id') if isinstance(item, dict) else None
+                results.append({'index': index, 'task_id': task_id, 'ok': False, 'error': error})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # All accepted tasks are committed in one transaction
+    if accepted:
+        try:
+            open_task_store(cfg).add_many(accepted)
+        except Exception as e:
+            logger.exception('Failed to write task batch: %s', e)
+            return jsonify({'error': 'failed'}), 500
+        _notify_tasks_added()
+
+    return jsonify({'accepted': len(accepted), 'rejected': len(results) - len(accepted), 'results': results})
+
+
+def _worker_request():
+    """Parse a worker request body; returns (body, None) or (None, error response)."""
+    body = request.get_json(force=True, silent=True)
+    if not isinstance(body, dict) or not isinstance(body.get('worker_id'), str) or not body['worker_id']:
+        return None, (jsonify({'error': 'worker_id required'}), 400)
+    return body, None
+
+
+@app.route('/tasks:lease', methods=['POST'])
+def lease_tasks():
+    if not _authorized():
+        return jsonify({'error': 'unauthorized'}), 401
+    body, error = _worker_request()
+    if error:
+        return error
+    cfg = load_config()
+    store = open_task_store(cfg)
+    try:
+        limit = max(1, int(body.get('max_tasks', 1)))
+        lease_seconds = float(body.get('lease_seconds') or cfg.get('lease_seconds', DEFAULT_LEASE_SECONDS))
+        wait = min(max(float(body.get('wait', 0)), 0.0), MAX_LEASE_WAIT)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'invalid lease parameters'}), 400
+
+    deadline = time.monotonic() + wait
+    while True:
+        tasks = store.claim(body['worker_id'], limit=limit, lease_seconds=lease_seconds)
+        remaining = deadline - time.monotonic()
+        if tasks or remaining <= 0:
+            break
+        with _tasks_added:
+            _tasks_added.wait(min(remaining, LEASE_POLL_INTERVAL))
+    return jsonify({'tasks': tasks, 'lease_seconds': lease_seconds})
+
+
+@app.route('/tasks:ack', methods=['POST'])
+def ack_tasks():
+    if not _authorized():
+        return jsonify({'error': 'unauthorized'}), 401
+    body, error = _worker_request()
+    if error:
+        return error
+    statuses = body.get('statuses')
+    if not isinstance(statuses, dict) or any(v not in ACK_STATUSES for v in statuses.values()):
+        return jsonify({'error': f'statuses must map task_id to one of {list(ACK_STATUSES)}'}), 400
+    acked = open_task_store(load_config()).ack(body['worker_id'], statuses)
+    # Tasks missing from `acked` had their lease expire and were handed to another worker
+    return jsonify({'acked': acked, 'lost': [t for t in statuses if t not in set(acked)]})
+
+
+@app.route('/tasks:nack', methods=['POST'])
+def nack_tasks():
+    if not _authorized():
+        return jsonify({'error': 'unauthorized'}), 401
+    body, error = _worker_request()
+    if error:
+        return error
+    released = open_task_store(load_config()).release(body['worker_id'], body.get('task_ids') or [])
+    if released:
+        _notify_tasks_added()
+    return jsonify({'released': released})
+
+
+@app.route('/tasks:extend', methods=['POST'])
+def extend_leases():
+    if not _authorized():
+        return jsonify({'error': 'unauthorized'}), 401
+    body, error = _worker_request()
+    if error:
+        return error
+    cfg = load_config()
+    try:
+        lease_seconds = float(body.get('lease_seconds') or cfg.get('lease_seconds', DEFAULT_LEASE_SECONDS))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'invalid lease parameters'}), 400
+    extended = open_task_store(cfg).extend_lease(body['worker_id'], body.get('task_ids') or [], lease_seconds)
+    return jsonify({'extended': extended})
+
+
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
+    install_sighup_handler(config_provider)
     cfg = load_config()
+    track_backlog(lambda: open_task_store(load_config()).count('pending'))
     host = cfg.get('api_host', '0.0.0.0')
     port = cfg.get('api_port', 8080)
-    # Allow run within docker/host
-    app.run(host=host, port=port)
+    # Allow run within docker/host; threaded so long-polling lease requests do not block ingest
+    app.run(host=host, port=port, threaded=True)
@@ -1,14 +1,108 @@
 #!/usr/bin/env python3
 """
 Simple Prometheus metrics server using Flask; run as a thread or separate process.
+
+Actions are timed with `instrument`, usable as a decorator or a context manager:
+
+    @instrument('actions.export_query')
+    def export_query(...): ...
+
+    with instrument('summarize') as span:
+        ...
+        span.outcome = 'failed'
+
+Each instrumented call observes `agent_action_duration_seconds{action, outcome}` (outcome `ok`, the
+mapped return value, or `error` when it raises) and is counted in `agent_actions_in_flight{action}`
+while it runs. `record_bytes` adds to `agent_action_bytes_total{action, direction}` for the innermost
+running action.
 """
-from prometheus_client import start_http_server, Summary, Counter, Gauge
+import contextvars
+import functools
 import logging
+import math
+import time
+from typing import Any, Callable, Optional, Union
+
+from prometheus_client import start_http_server, Summary, Counter, Gauge, Histogram
 
 REQUEST_TIME = Summary('agent_request_processing_seconds', 'Time spent processing requests')
 TASK_COUNTER = Counter('agent_tasks_processed_total', 'Number of tasks processed')
 TASK_ERRORS = Counter('agent_tasks_errors_total', 'Number of task errors')
 
+ACTION_LATENCY = Histogram(
+    'agent_action_duration_seconds', 'Time spent in an action', ['action', 'outcome'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120, float('inf')))
+ACTIONS_IN_FLIGHT = Gauge('agent_actions_in_flight', 'Actions currently running', ['action'])
+QUEUE_DEPTH = Gauge('agent_queue_depth', 'Items waiting in an in-process queue', ['queue'])
+TASK_BACKLOG = Gauge('agent_task_backlog', 'Pending tasks in the task store')
+ACTION_BYTES = Counter('agent_action_bytes_total', 'Bytes read or written by actions', ['action', 'direction'])
+
+_current: contextvars.ContextVar = contextvars.ContextVar('agent_metrics_span', default=None)
+
+
+class instrument:
+    """Time a function (as a decorator) or a block (as a context manager) as one `action`.
+
+    As a decorator, `action` may be a callable that receives the call's arguments and returns the
+    label (e.g. the task type), and `outcome` a callable that maps the return value to the outcome
+    label. Keep both to a small, fixed set of values.
+    """
+
+    def __init__(self, action: Union[str, Callable[..., str]], outcome: Optional[Callable[[Any], str]] = None):
+        self.action = action
+        self.outcome: Optional[str] = None
+        self._outcome_of = outcome
+        self._start = 0.0
+        self._token = None
+
+    def __enter__(self) -> 'instrument':
+        ACTIONS_IN_FLIGHT.labels(self.action).inc()
+        self._token = _current.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        _current.reset(self._token)
+        outcome = 'error' if exc_type is not None else (self.outcome or 'ok')
+        ACTION_LATENCY.labels(self.action, outcome).observe(elapsed)
+        ACTIONS_IN_FLIGHT.labels(self.action).dec()
+        return False
+
+    def add_bytes(self, direction: str, count: int):
+        if count:
+            ACTION_BYTES.labels(self.action, direction).inc(count)
+
+    def __call__(self, func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            action = self.action(*args, **kwargs) if callable(self.action) else self.action
+            # A fresh span per call: one decorated function may run on several threads at once
+            with instrument(action) as span:
+                result = func(*args, **kwargs)
+                if self._outcome_of is not None:
+                    span.outcome = self._outcome_of(result)
+                return result
+        return wrapper
+
+
+def record_bytes(direction: str, count: int):
+    """Count bytes `read` or `written` by the innermost instrumented action, if any."""
+    span = _current.get()
+    if span is not None:
+        span.add_bytes(direction, count)
+
+
+def track_backlog(count: Callable[[], int]):
+    """Report `count()` (evaluated on each scrape) as the task backlog."""
+    def _value() -> float:
+        try:
+            return float(count())
+        except Exception:
+            logging.getLogger(__name__).debug('Backlog count failed', exc_info=True)
+            return math.nan
+    TASK_BACKLOG.set_function(_value)
+
 
 def start_metrics(port: int = 8000):
     try:
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Streaming capture of a child process's stdout/stderr.
+
+`pump()` reads both pipes incrementally as data arrives (instead of `communicate()` buffering the
+whole output) and hands each chunk to a callback. `OutputCapture` is the usual callback: per stream it
+keeps the first and last `max_bytes / 2` bytes and counts what was dropped in between, optionally
+writes the full output to files under `exports/command_output/`, and forwards chunks to an
+`on_output(stream, data)` callback for live progress. Bytes are decoded only when the text is read.
+
+Stdlib only: the sandbox launcher (agent/sandbox.py run as a script) imports this module too.
+
+Settings:
+- AGENT_OUTPUT_MAX_BYTES: bytes kept per stream (default 1 MiB; 0 keeps everything)
+"""
+import locale
+import logging
+import os
+import re
+import selectors
+import subprocess
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_BYTES = 1024 * 1024
+EXPORTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'exports'))
+SPILL_DIR = os.path.join(EXPORTS_DIR, 'command_output')
+
+OnChunk = Callable[[str, bytes], None]
+_UNSAFE_NAME_CHARS = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+def safe_spill_name(name: str) -> str:
+    """`name` as a single plain file name: spill names carry task ids, which come from ingest."""
+    return _UNSAFE_NAME_CHARS.sub('_', name).lstrip('.') or '_'
+
+
+def default_max_bytes() -> Optional[int]:
+    value = int(os.environ.get('AGENT_OUTPUT_MAX_BYTES', DEFAULT_MAX_BYTES))
+    return value if value > 0 else None
+
+
+def pump(proc: subprocess.Popen, on_chunk: OnChunk, timeout: Optional[float] = None) -> int:
+    """Read `proc`'s stdout/stderr pipes until both close, then return its exit code.
+
+    On timeout the process is killed and subprocess.TimeoutExpired is raised; chunks read so far
+    have already been delivered.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    sel = selectors.DefaultSelector()
+    for name in ('stdout', 'stderr'):
+        pipe = getattr(proc, name)
+        if pipe is not None:
+            sel.register(pipe, selectors.EVENT_READ, name)
+    try:
+        while sel.get_map():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise subprocess.TimeoutExpired(proc.args, timeout)
+            for key, _ in sel.select(remaining):
+                data = os.read(key.fd, CHUNK_SIZE)
+                if data:
+                    on_chunk(key.data, data)
+                else:
+                    sel.unregister(key.fileobj)
+                    key.fileobj.close()
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            return proc.wait(remaining)
+        except subprocess.TimeoutExpired:
+            raise subprocess.TimeoutExpired(proc.args, timeout) from None
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        for key in list(sel.get_map().values()):
+            key.fileobj.close()
+        sel.close()
+
+
+class CappedBuffer:
+    """Keeps the head and tail of a byte stream within `max_bytes` (None keeps everything)."""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self._head_limit = max_bytes // 2 if max_bytes else None
+        self._tail_limit = max_bytes - self._head_limit if max_bytes else None
+        self._head = bytearray()
+        self._tail = bytearray()
+        self.total = 0
+
+    def write(self, data: bytes):
+        self.total += len(data)
+        if self._head_limit is None:
+            self._head += data
+            return
+        room = self._head_limit - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+        if data:
+            self._tail += data
+            # Trim in bulk so a stream of small chunks does not shift the buffer on every write
+            if len(self._tail) > 2 * self._tail_limit:
+                del self._tail[:len(self._tail) - self._tail_limit]
+
+    @property
+    def omitted(self) -> int:
+        kept = len(self._head) + min(len(self._tail), self._tail_limit or 0)
+        return self.total - kept if self._tail_limit is not None else 0
+
+    @property
+    def truncated(self) -> bool:
+        return self.omitted > 0
+
+    def text(self, encoding: str) -> str:
+        head = self._head.decode(encoding, errors='replace')
+        if self._tail_limit is None:
+            return head
+        tail = bytes(self._tail[-self._tail_limit:]) if self._tail else b''
+        if not self.truncated:
+            return head + tail.decode(encoding, errors='replace')
+        return f'{head}\n... [{self.omitted} bytes omitted] ...\n{tail.decode(encoding, errors="replace")}'
+
+
+class OutputCapture:
+    """Chunk sink for `pump()`: capped in-memory buffers, optional spill files and a progress callback."""
+
+    def __init__(self, max_bytes: Optional[int] = None, spill_name: Optional[str] = None,
+                 on_output: Optional[OnChunk] = None, encoding: Optional[str] = None):
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self.buffers = {'stdout': CappedBuffer(max_bytes), 'stderr': CappedBuffer(max_bytes)}
+        self.spill_prefix = os.path.join(SPILL_DIR, safe_spill_name(spill_name)) if spill_name else None
+        self.on_output = on_output
+        self._files: Dict[str, object] = {}
+        self._text: Dict[str, str] = {}
+
+    def write(self, stream: str, data: bytes):
+        self.buffers[stream].write(data)
+        self._text.pop(stream, None)
+        if self.spill_prefix:
+            f = self._files.get(stream)
+            if f is None:
+                os.makedirs(os.path.dirname(self.spill_prefix), exist_ok=True)
+                f = self._files[stream] = open(f'{self.spill_prefix}.{stream}.log', 'wb')
+            f.write(data)
+        if self.on_output is not None:
+            try:
+                self.on_output(stream, data)
+            except Exception:
+                # A broken progress callback must not fail the command
+                logger.exception('Output callback failed; disabling it')
+                self.on_output = None
+
+    def _decoded(self, stream: str) -> str:
+        if stream not in self._text:
+            self._text[stream] = self.buffers[stream].text(self.encoding)
+        return self._text[stream]
+
+    @property
+    def stdout(self) -> str:
+        return self._decoded('stdout')
+
+    @property
+    def stderr(self) -> str:
+        return self._decoded('stderr')
+
+    @property
+    def truncated(self) -> bool:
+        return any(b.truncated for b in self.buffers.values())
+
+    def summary(self) -> dict:
+        """Result fields describing the capture: byte counts, truncation and spill files."""
+        out = {
+            'output_bytes': {name: b.total for name, b in self.buffers.items()},
+            'truncated': self.truncated,
+        }
+        if self._files:
+            out['output_files'] = {name: f.name for name, f in self._files.items()}
+        return out
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+
+
+def abbreviate(text: str, limit: int = 2000) -> str:
+    """Head and tail of `text` within about `limit` characters, for log lines."""
+    if text is None or len(text) <= limit:
+        return text
+    half = limit // 2
+    return f'{text[:half]} ... [{len(text) - 2 * half} chars omitted] ... {text[-half:]}'
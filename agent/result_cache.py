@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for action artifacts (summaries, CSV exports).
+
+Entries are keyed on the SHA-256 of the source file's content together with the action type and its
+parameters, so a task that repeats the same request against an unchanged file reuses the previous
+artifact instead of redoing the pandas work. Artifacts live under `exports/.cache` and are bounded in
+total size; the least recently used entries are evicted first.
+
+On a hit the artifact is hard-linked into place (copied when linking is not possible). Artifacts are
+always replaced by renaming a new file over the destination, never rewritten in place, so a linked
+destination cannot alter the cached copy.
+
+Environment:
+- AGENT_RESULT_CACHE_DIR: cache directory (default exports/.cache)
+- AGENT_RESULT_CACHE_MAX_MB: size bound in MiB (default 256; 0 disables the cache)
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EXPORTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'exports'))
+DEFAULT_CACHE_DIR = os.path.join(EXPORTS_DIR, '.cache')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_digest_lock = threading.Lock()
+_digests: Dict[Tuple, str] = {}
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's content, memoized on (path, inode, size, mtime) so unchanged files hash once."""
+    st = os.stat(path)
+    sig = (os.path.abspath(path), st.st_ino, st.st_size, st.st_mtime_ns)
+    with _digest_lock:
+        cached = _digests.get(sig)
+    if cached is not None:
+        return cached
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(block)
+    digest = h.hexdigest()
+    with _digest_lock:
+        _digests[sig] = digest
+    return digest
+
+
+def temp_path_for(dest: str) -> str:
+    """A hidden sibling of `dest` with the same extension, for writing before an atomic rename."""
+    directory, name = os.path.split(dest)
+    root, ext = os.path.splitext(name)
+    return os.path.join(directory, f'.{root}.tmp-{uuid.uuid4().hex}{ext}')
+
+
+def _link_or_copy(src: str, dest: str):
+    tmp = temp_path_for(dest)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dest)
+
+
+def _dump_json(path: str, value):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(value, f)
+
+
+def _produce(dest: str, produce: Callable[[str], None]):
+    tmp = temp_path_for(dest)
+    try:
+        produce(tmp)
+        os.replace(tmp, dest)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class ResultCache:
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, source_path: str, action: str, params: Optional[dict] = None) -> str:
+        material = json.dumps({'source': file_digest(source_path), 'action': action, 'params': params or {}},
+                              sort_keys=True, default=str)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _entry(self, key: str, ext: str) -> str:
+        return os.path.join(self.root, key + ext)
+
+    def get(self, key: str, dest: str) -> bool:
+        """Materialize the entry for `key` at `dest`; return False on a miss."""
+        entry = self._entry(key, os.path.splitext(dest)[1])
+        try:
+            _link_or_copy(entry, dest)
+        except FileNotFoundError:
+            return False
+        # Touch the entry so eviction sees it as recently used
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return True
+
+    def put(self, key: str, artifact_path: str):
+        _link_or_copy(artifact_path, self._entry(key, os.path.splitext(artifact_path)[1]))
+        self.evict()
+
+    def load_value(self, key: str):
+        """Return a JSON value stored with `store_value`, or None on a miss."""
+        entry = self._entry(key, '.json')
+        try:
+            with open(entry, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return value
+
+    def store_value(self, key: str, value):
+        _produce(self._entry(key, '.json'), lambda tmp: _dump_json(tmp, value))
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in `max_bytes`."""
+        entries = []
+        total = 0
+        for e in os.scandir(self.root):
+            if e.is_file() and not e.name.startswith('.'):
+                st = e.stat()
+                entries.append((st.st_mtime, st.st_size, e.path))
+                total += st.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def materialize(self, source_path: str, action: str, params: Optional[dict], dest: str,
+                    produce: Callable[[str], None]) -> bool:
+        """Place the artifact for (source content, action, params) at `dest`.
+
+        On a miss `produce(tmp_path)` writes the artifact to a temporary path, which is renamed to
+        `dest` and stored in the cache. Returns True on a cache hit.
+        """
+        key = self.key(source_path, action, params)
+        if self.get(key, dest):
+            logger.info('Result cache hit for %s on %s', action, source_path)
+            return True
+        _produce(dest, produce)
+        try:
+            self.put(key, dest)
+        except OSError as e:
+            logger.warning('Could not cache %s result: %s', action, e)
+        return False
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Process-wide cache configured from the environment; None when disabled."""
+    global _cache
+    max_mb = float(os.environ.get('AGENT_RESULT_CACHE_MAX_MB', DEFAULT_MAX_BYTES / (1024 * 1024)))
+    if max_mb <= 0:
+        return None
+    root = os.environ.get('AGENT_RESULT_CACHE_DIR', DEFAULT_CACHE_DIR)
+    with _cache_lock:
+        if _cache is None or _cache.root != root:
+            _cache = ResultCache(root, int(max_mb * 1024 * 1024))
+        return _cache
+
+
+def materialize(source_path: str, action: str, params: Optional[dict], dest: str,
+                produce: Callable[[str], None]) -> bool:
+    """Run `produce` through the process-wide cache, or directly (with an atomic rename) if disabled."""
+    cache = get_result_cache()
+    if cache is not None:
+        return cache.materialize(source_path, action, params, dest, produce)
+    _produce(dest, produce)
+    return False
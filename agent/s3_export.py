@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Streaming DataFrame export to S3 for `actions.export_dataframe_to_s3`.
+
+The DataFrame is encoded in row chunks (CSV, or Parquet row groups), optionally compressed
+(gzip, or zstd when the `zstandard` package is installed), and streamed straight into a multipart
+upload whose parts are sent in parallel. Nothing is written to local disk, and memory stays bounded
+by the part size times the number of parts in flight. Exports smaller than one part use a single
+PUT. A failed export aborts its multipart upload so no orphaned parts are left behind.
+
+One boto3 client is created per process (credentials are looked up in Vault once) and reused;
+boto3 clients are thread-safe.
+
+Environment:
+- S3_ENDPOINT_URL: alternative endpoint, e.g. a local S3 stand-in such as moto or MinIO
+- AWS_REGION / AWS_DEFAULT_REGION: region for the client
+- VAULT_SECRETS_PATH: Vault path holding the AWS keys (default secret/data/myapp)
+"""
+import io
+import logging
+import os
+import threading
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from .metrics_server import record_bytes
+from .vault_client import get_aws_credentials
+
+logger = logging.getLogger(__name__)
+
+# S3 rejects multipart parts below 5 MiB, except for the last part
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_CHUNK_ROWS = 50_000
+
+FORMATS = ('csv', 'parquet')
+COMPRESSIONS = (None, 'gzip', 'zstd')
+_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+_CONTENT_TYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+_client = None
+_client_key: Optional[Tuple] = None
+_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """Process-wide boto3 S3 client, created on first use and rebuilt only if the endpoint or region changes."""
+    global _client, _client_key
+    endpoint = os.environ.get('S3_ENDPOINT_URL') or None
+    region = os.environ.get('AWS_REGION') or os.environ.get('AWS_DEFAULT_REGION') or None
+    key = (endpoint, region)
+    with _client_lock:
+        if _client is None or _client_key != key:
+            import boto3
+            from botocore.config import Config
+
+            # Falls back to boto3's own credential chain (env, profile, instance role) when Vault has none
+            creds = get_aws_credentials(os.environ.get('VAULT_SECRETS_PATH', 'secret/data/myapp')) or {}
+            config = Config(max_pool_connections=max(10, DEFAULT_MAX_WORKERS * 2),
+                            retries={'max_attempts': 5, 'mode': 'adaptive'})
+            _client = boto3.client('s3', endpoint_url=endpoint, region_name=region, config=config, **creds)
+            _client_key = key
+        return _client
+
+
+def reset_s3_client():
+    """Drop the cached client, e.g. after rotating credentials."""
+    global _client, _client_key
+    with _client_lock:
+        _client = None
+        _client_key = None
+
+
+def object_key(export_name: str, prefix: Optional[str] = None, fmt: str = 'csv', compression: Optional[str] = None) -> str:
+    key = f"{(prefix.rstrip('/') + '/') if prefix else ''}{export_name}.{fmt}"
+    # Parquet compresses its pages internally, so the object keeps its plain extension
+    if fmt == 'csv' and compression:
+        key += _EXTENSIONS[compression]
+    return key
+
+
+def iter_csv_chunks(df: pd.DataFrame, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[bytes]:
+    """Encode `df` as UTF-8 CSV, `chunk_rows` rows at a time; the header is emitted with the first chunk."""
+    if df.empty:
+        yield df.to_csv(index=False).encode('utf-8')
+        return
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=False, header=start == 0).encode('utf-8')
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose accumulated bytes are taken out with `drain()`."""
+
+    def __init__(self):
+        super().__init__()
+        self._parts: List[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_parquet_chunks(df: pd.DataFrame, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                        compression: Optional[str] = None) -> Iterator[bytes]:
+    """Encode `df` as Parquet with one row group per chunk, yielding the bytes written so far after each."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _DrainableSink()
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(sink, schema, compression=compression or 'none') as writer:
+        for start in range(0, max(len(df), 1), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            data = sink.drain()
+            if data:
+                yield data
+    # Closing the writer appends the footer
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def _compressor(compression: Optional[str]):
+    if compression == 'gzip':
+        return zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError as e:
+            raise RuntimeError('zstd compression requires the zstandard package') from e
+        return zstandard.ZstdCompressor().compressobj()
+    raise ValueError(f'Unsupported compression: {compression!r}')
+
+
+def compress_chunks(chunks: Iterator[bytes], compression: Optional[str]) -> Iterator[bytes]:
+    """Stream `chunks` through gzip or zstd; passes them through unchanged when `compression` is None."""
+    if not compression:
+        yield from chunks
+        return
+    comp = _compressor(compression)
+    for chunk in chunks:
+        data = comp.compress(chunk)
+        if data:
+            yield data
+    yield comp.flush()
+
+
+def encode_dataframe(df: pd.DataFrame, fmt: str = 'csv', compression: Optional[str] = None,
+                     chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[bytes]:
+    if fmt not in FORMATS:
+        raise ValueError(f'Unsupported export format: {fmt!r}')
+    if compression not in COMPRESSIONS:
+        raise ValueError(f'Unsupported compression: {compression!r}')
+    if fmt == 'parquet':
+        return iter_parquet_chunks(df, chunk_rows, compression)
+    return compress_chunks(iter_csv_chunks(df, chunk_rows), compression)
+
+
+class MultipartUpload:
+    """Write bytes to an S3 object, uploading fixed-size parts in parallel as they fill.
+
+    Use as a context manager: the upload completes on a clean exit and is aborted on an exception.
+    At most `2 * max_workers` parts are buffered at once.
+    """
+
+    def __init__(self, client, bucket: str, key: str, part_size: int = DEFAULT_PART_SIZE,
+                 max_workers: int = DEFAULT_MAX_WORKERS, extra_args: Optional[dict] = None):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f'part_size must be at least {MIN_PART_SIZE} bytes')
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.max_workers = max_workers
+        self.extra_args = extra_args or {}
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._parts = []  # (part number, future of the ETag)
+
+    def write(self, data: bytes):
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._submit(part)
+
+    def _submit(self, body: bytes):
+        if self._upload_id is None:
+            resp = self.client.create_multipart_upload(Bucket=self.bucket, Key=self.key, **self.extra_args)
+            self._upload_id = resp['UploadId']
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='s3-part')
+        in_flight = [f for _, f in self._parts if not f.done()]
+        if len(in_flight) >= 2 * self.max_workers:
+            wait(in_flight, return_when=FIRST_COMPLETED)
+        # Surface a failed part now rather than after encoding the rest of the export
+        for _, f in self._parts:
+            if f.done():
+                f.result()
+        number = len(self._parts) + 1
+        self._parts.append((number, self._pool.submit(self._upload_part, number, body)))
+
+    def _upload_part(self, number: int, body: bytes) -> str:
+        resp = self.client.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                                       PartNumber=number, Body=body)
+        return resp['ETag']
+
+    def complete(self):
+        if self._upload_id is None:
+            # Everything fit in one part: a single PUT is cheaper than a multipart upload
+            self.client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer), **self.extra_args)
+            self._buffer = bytearray()
+            return
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer = bytearray()
+            parts = [{'PartNumber': n, 'ETag': f.result()} for n, f in self._parts]
+            self.client.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                                                  MultipartUpload={'Parts': parts})
+        except BaseException:
+            # A part that failed late, or the completion itself: do not leave billed parts behind
+            self.abort()
+            raise
+        self._pool.shutdown(wait=True)
+
+    def abort(self):
+        if self._upload_id is None:
+            return
+        for _, f in self._parts:
+            f.cancel()
+        self._pool.shutdown(wait=True)
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+        except Exception as e:
+            logger.warning('Could not abort multipart upload of s3://%s/%s: %s', self.bucket, self.key, e)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.complete()
+        else:
+            self.abort()
+        return False
+
+
+def upload_dataframe(df: pd.DataFrame, bucket: str, key: str, fmt: str = 'csv', compression: Optional[str] = None,
+                     client=None, part_size: int = DEFAULT_PART_SIZE, max_workers: int = DEFAULT_MAX_WORKERS,
+                     chunk_rows: int = DEFAULT_CHUNK_ROWS) -> str:
+    """Stream `df` to s3://bucket/key and return that URL."""
+    client = client or get_s3_client()
+    extra = {'ContentType': _CONTENT_TYPES[fmt]} if fmt in _CONTENT_TYPES else {}
+    with MultipartUpload(client, bucket, key, part_size=part_size, max_workers=max_workers, extra_args=extra) as upload:
+        for chunk in encode_dataframe(df, fmt, compression, chunk_rows):
+            upload.write(chunk)
+    record_bytes('written', upload.bytes_written)
+    logger.info('Uploaded %d rows (%d bytes) to s3://%s/%s', len(df), upload.bytes_written, bucket, key)
+    return f's3://{bucket}/{key}'
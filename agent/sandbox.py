@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Pool of pre-started, rlimit-confined launcher processes used by `executor.run_safe_command`.
+
+Each launcher is a small stdlib-only Python process (this file run as a script) that applies the CPU
+and address-space limits to itself once at startup and then launches commands on request. Children
+inherit the limits, so no `preexec_fn` is needed: `preexec_fn` forces the slow fork+exec path and is
+not safe to use from threads. Without it, and with `close_fds=False` and an absolute executable path,
+`subprocess` launches children with `posix_spawn`. Launchers are recycled after `max_uses` commands,
+or once their own CPU time nears the limit, and replaced if they die.
+
+Requests and responses are single JSON lines over the launcher's stdin/stdout. While a command runs
+the launcher streams its output back as `{"stream": ..., "data": ...}` lines (bytes as latin-1), so
+neither the launcher nor the pool buffers more than a chunk; the final line carries the exit status.
+Launchers share no descriptors with their children other than the pipes set up for each command.
+"""
+import atexit
+import json
+import logging
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Optional
+
+if __package__:
+    from .output_capture import OnChunk, OutputCapture, pump
+else:  # the launcher: this file run with -I, which leaves its directory off sys.path
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from output_capture import OnChunk, OutputCapture, pump
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CPU_SECONDS = 5
+DEFAULT_MEM_BYTES = 512 * 1024 * 1024
+DEFAULT_POOL_SIZE = 4
+DEFAULT_MAX_USES = 100
+# Slack on top of a command's timeout before an unresponsive launcher is killed
+RESPONSE_GRACE_SECONDS = 5.0
+
+
+class LauncherError(RuntimeError):
+    pass
+
+
+def _set_limits(cpu_seconds: int, mem_bytes: int):
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+    resource.setrlimit(resource.RLIMIT_AS, (mem_bytes, mem_bytes))
+
+
+def _launch(request: dict, emit: OnChunk) -> dict:
+    """Run one command inside the launcher, passing output chunks to `emit`.
+
+    The response carries the exit status and the spawn and run timings.
+    """
+    argv = request['argv']
+    # An absolute executable keeps subprocess on its posix_spawn path
+    executable = shutil.which(argv[0]) if argv else None
+    if executable is None:
+        return {'error': f"[Errno 2] No such file or directory: '{argv[0] if argv else ''}'"}
+    start = time.perf_counter()
+    try:
+        proc = subprocess.Popen(argv, executable=os.path.abspath(executable), stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, close_fds=False)
+    except OSError as e:
+        return {'error': str(e)}
+    spawned = time.perf_counter()
+    try:
+        returncode = pump(proc, emit, request.get('timeout'))
+    except subprocess.TimeoutExpired as e:
+        return {'timeout': str(e), 'spawn': spawned - start, 'run': time.perf_counter() - spawned}
+    return {'returncode': returncode, 'spawn': spawned - start, 'run': time.perf_counter() - spawned}
+
+
+def _launcher_main(cpu_seconds: int, mem_bytes: int):
+    _set_limits(cpu_seconds, mem_bytes)
+    out = sys.stdout.buffer
+
+    def emit(stream: str, data: bytes):
+        out.write(json.dumps({'stream': stream, 'data': data.decode('latin-1')}).encode('utf-8') + b'\n')
+        # Deliver each chunk now, not when the pipe buffer fills or the command exits
+        out.flush()
+
+    for line in sys.stdin.buffer:
+        try:
+            response = _launch(json.loads(line), emit)
+        except Exception as e:
+            response = {'error': str(e)}
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        response['launcher_cpu'] = usage.ru_utime + usage.ru_stime
+        out.write(json.dumps(response).encode('utf-8') + b'\n')
+        out.flush()
+
+
+class _Launcher:
+    def __init__(self, cpu_seconds: int, mem_bytes: int):
+        # -I -S: isolated interpreter without site-packages, so the launcher stays small
+        self.proc = subprocess.Popen(
+            [sys.executable, '-I', '-S', os.path.abspath(__file__), str(cpu_seconds), str(mem_bytes)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, close_fds=True)
+        self.uses = 0
+        self.cpu = 0.0
+
+    @property
+    def pid(self) -> int:
+        return self.proc.pid
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def request(self, argv: List[str], timeout: Optional[float], on_chunk: OnChunk) -> dict:
+        self.uses += 1
+        try:
+            self.proc.stdin.write(json.dumps({'argv': argv, 'timeout': timeout}).encode('utf-8') + b'\n')
+            self.proc.stdin.flush()
+        except OSError as e:
+            raise LauncherError(f'launcher {self.pid} is gone: {e}') from e
+        # The launcher enforces `timeout` itself; the watchdog only covers a wedged launcher
+        watchdog = threading.Timer((timeout or 0) + RESPONSE_GRACE_SECONDS, self.proc.kill) if timeout else None
+        if watchdog is not None:
+            watchdog.daemon = True
+            watchdog.start()
+        try:
+            while True:
+                line = self.proc.stdout.readline()
+                if not line:
+                    raise LauncherError(f'launcher {self.pid} exited with {self.proc.wait()}')
+                response = json.loads(line)
+                if 'stream' not in response:
+                    break
+                on_chunk(response['stream'], response['data'].encode('latin-1'))
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+        self.cpu = response.pop('launcher_cpu', self.cpu)
+        return response
+
+    def close(self):
+        if self.proc.poll() is None:
+            try:
+                self.proc.stdin.close()
+                self.proc.wait(timeout=2)
+            except Exception:
+                self.proc.kill()
+                self.proc.wait()
+        for stream in (self.proc.stdin, self.proc.stdout):
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+
+class SandboxPool:
+    """Thread-safe pool of launchers; `run` blocks while all `size` launchers are busy."""
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, cpu_seconds: int = DEFAULT_CPU_SECONDS,
+                 mem_bytes: int = DEFAULT_MEM_BYTES, max_uses: int = DEFAULT_MAX_USES):
+        self.size = max(1, size)
+        self.cpu_seconds = cpu_seconds
+        self.mem_bytes = mem_bytes
+        self.max_uses = max_uses
+        self._idle: List[_Launcher] = []
+        self._count = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def warm(self):
+        """Start launchers up to the pool size so the first commands do not wait for one."""
+        with self._cond:
+            missing = self.size - self._count
+            self._count += missing
+        started = [_Launcher(self.cpu_seconds, self.mem_bytes) for _ in range(missing)]
+        with self._cond:
+            self._idle.extend(started)
+            self._cond.notify_all()
+
+    def _acquire(self) -> _Launcher:
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise LauncherError('sandbox pool is closed')
+                if self._idle:
+                    return self._idle.pop()
+                if self._count < self.size:
+                    self._count += 1
+                    break
+                self._cond.wait()
+        try:
+            return _Launcher(self.cpu_seconds, self.mem_bytes)
+        except Exception:
+            with self._cond:
+                self._count -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, launcher: _Launcher, healthy: bool):
+        # Recycle well before the launcher's own RLIMIT_CPU would kill it
+        retire = (not healthy or not launcher.alive() or launcher.uses >= self.max_uses
+                  or launcher.cpu >= self.cpu_seconds / 2)
+        with self._cond:
+            if retire or self._closed:
+                self._count -= 1
+            else:
+                self._idle.append(launcher)
+            self._cond.notify()
+        if retire or self._closed:
+            launcher.close()
+
+    def run(self, argv: List[str], timeout: Optional[float] = None, on_chunk: Optional[OnChunk] = None) -> dict:
+        """Run `argv` in a launcher.
+
+        Output chunks go to `on_chunk(stream, data)`; without one, the response carries the whole
+        `stdout`/`stderr` text. A command is retried once on a fresh launcher if the first one died
+        before producing any output.
+        """
+        capture = OutputCapture() if on_chunk is None else None
+        delivered = False
+
+        def deliver(stream: str, data: bytes):
+            nonlocal delivered
+            delivered = True
+            (on_chunk or capture.write)(stream, data)
+
+        for attempt in (1, 2):
+            launcher = self._acquire()
+            healthy = False
+            try:
+                response = launcher.request(argv, timeout, deliver)
+                healthy = True
+                if capture is not None:
+                    response.update(stdout=capture.stdout, stderr=capture.stderr)
+                return response
+            except LauncherError as e:
+                if attempt == 2 or delivered:
+                    raise
+                logger.warning('Sandbox launcher failed (%s); retrying on a new one', e)
+            finally:
+                self._release(launcher, healthy)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._count -= len(idle)
+            self._cond.notify_all()
+        for launcher in idle:
+            launcher.close()
+
+
+_pool: Optional[SandboxPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool() -> Optional[SandboxPool]:
+    """Process-wide pool configured from the environment; None when disabled.
+
+    AGENT_SANDBOX_WORKERS (default 4; 0 disables the pool) and AGENT_SANDBOX_MAX_USES (default 100).
+    """
+    global _pool
+    size = int(os.environ.get('AGENT_SANDBOX_WORKERS', DEFAULT_POOL_SIZE))
+    if size <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None or _pool.size != size:
+            if _pool is not None:
+                _pool.close()
+            _pool = SandboxPool(size=size, max_uses=int(os.environ.get('AGENT_SANDBOX_MAX_USES', DEFAULT_MAX_USES)))
+            _pool.warm()
+        return _pool
+
+
+def close_sandbox_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+atexit.register(close_sandbox_pool)
+
+
+if __name__ == '__main__':
+    _launcher_main(int(sys.argv[1]), int(sys.argv[2]))
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Concurrent task scheduler used by `agent_runner.process_tasks_file`.
+
+I/O-bound actions (run_command, db_query, send_email) run on a bounded thread pool; pandas-heavy
+actions (summarize, export) are handed to a process pool so they do not contend for the GIL.
+Every action type has its own concurrency limit, configured under `concurrency` in agent_config.json:
+
+    "concurrency": {
+      "thread_workers": 8,
+      "process_workers": 2,
+      "process_actions": ["summarize", "export"],
+      "limits": {"run_command": 4, "summarize": 2}
+    }
+
+Items over their action's limit wait in a per-action queue and are submitted when an item of the same
+action finishes, so they never hold a pool thread and cannot delay other actions. Results are returned
+in input order, regardless of completion order. Items waiting for a concurrency slot are reported as
+`agent_queue_depth{queue="scheduler"}`.
+"""
+import collections
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from .metrics_server import QUEUE_DEPTH, instrument
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMITS = {
+    'run_command': 4,
+    'db_query': 4,
+    'send_email': 4,
+    'summarize': 2,
+    'export': 2,
+}
+
+
+@dataclass
+class SchedulerConfig:
+    thread_workers: int = 8
+    process_workers: int = 2
+    process_actions: Sequence[str] = ('summarize', 'export')
+    limits: Dict[str, int] = field(default_factory=lambda: dict(DEFAULT_LIMITS))
+    default_limit: int = 8
+    start_method: str = 'spawn'
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict]) -> 'SchedulerConfig':
+        """Build a scheduler config from the `concurrency` section of agent_config.json."""
+        section = (cfg or {}).get('concurrency') or {}
+        limits = dict(DEFAULT_LIMITS)
+        limits.update({k: int(v) for k, v in (section.get('limits') or {}).items()})
+        return cls(
+            thread_workers=max(1, int(section.get('thread_workers', cls.thread_workers))),
+            process_workers=max(0, int(section.get('process_workers', cls.process_workers))),
+            process_actions=tuple(section.get('process_actions', cls.process_actions)),
+            limits=limits,
+            default_limit=max(1, int(section.get('default_limit', cls.default_limit))),
+            start_method=section.get('start_method', cls.start_method),
+        )
+
+    def limit_for(self, action: str) -> int:
+        return max(1, int(self.limits.get(action, self.default_limit)))
+
+
+class TaskScheduler:
+    """Dispatch work items to thread/process pools with per-action-type limits.
+
+    `fn` must be a picklable top-level function when any item is routed to the process pool.
+    """
+
+    def __init__(self, config: Optional[SchedulerConfig] = None,
+                 initializer: Optional[Callable] = None, initargs: tuple = ()):
+        self.config = config or SchedulerConfig()
+        self._initializer = initializer
+        self._initargs = initargs
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        ctx = multiprocessing.get_context(self.config.start_method)
+        return ProcessPoolExecutor(max_workers=self.config.process_workers, mp_context=ctx,
+                                   initializer=self._initializer, initargs=self._initargs)
+
+    def run(self, fn: Callable[[Any], Any], items: Iterable[Any],
+            classify: Callable[[Any], str],
+            on_error: Optional[Callable[[Any, BaseException], Any]] = None,
+            outcome: Optional[Callable[[Any], str]] = None) -> List[Any]:
+        """Run `fn` over `items` concurrently and return the results in input order.
+
+        `classify` maps an item to its action type, which selects the pool and the concurrency limit.
+        If `on_error` is given, its return value replaces the result of an item whose call raised.
+        Metrics recorded inside a process-pool worker are not exported, so those items are timed here
+        under their action type, with `outcome` mapping the result to the outcome label.
+        """
+        items = list(items)
+        if not items:
+            return []
+        kinds = [classify(item) for item in items]
+        limits = {k: self.config.limit_for(k) for k in set(kinds)}
+        in_process = set(self.config.process_actions) if self.config.process_workers > 0 else set()
+        procs = self._process_pool() if in_process.intersection(kinds) else None
+        waiting = QUEUE_DEPTH.labels('scheduler')
+        waiting.inc(len(items))
+
+        def _run_one(item, kind):
+            waiting.dec()
+            try:
+                if procs is not None and kind in in_process:
+                    with instrument(kind) as span:
+                        result = procs.submit(fn, item).result()
+                        if outcome is not None:
+                            span.outcome = outcome(result)
+                    return result
+                return fn(item)
+            except Exception as e:
+                if on_error is None:
+                    raise
+                logger.exception('Scheduled %s task failed: %s', kind, e)
+                return on_error(item, e)
+
+        results: List[Any] = [None] * len(items)
+        errors: Dict[int, BaseException] = {}
+        backlog = {k: collections.deque() for k in limits}
+        running = dict.fromkeys(limits, 0)
+        remaining = len(items)
+        # Reentrant: a future that is already done runs its callback inside `_submit`
+        done = threading.Condition(threading.RLock())
+
+        def _submit(pool, index):
+            running[kinds[index]] += 1
+            pool.submit(_run_one, items[index], kinds[index]).add_done_callback(
+                lambda f: _finished(pool, index, f))
+
+        def _finished(pool, index, future):
+            nonlocal remaining
+            kind = kinds[index]
+            with done:
+                try:
+                    results[index] = future.result()
+                except BaseException as e:
+                    errors[index] = e
+                running[kind] -= 1
+                # The freed slot goes to the next item of the same action
+                if backlog[kind]:
+                    _submit(pool, backlog[kind].popleft())
+                remaining -= 1
+                done.notify_all()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.config.thread_workers, thread_name_prefix='agent-task') as pool:
+                with done:
+                    for index, kind in enumerate(kinds):
+                        if running[kind] < limits[kind]:
+                            _submit(pool, index)
+                        else:
+                            backlog[kind].append(index)
+                    while remaining:
+                        done.wait()
+        finally:
+            if procs is not None:
+                procs.shutdown()
+        for index in sorted(errors):
+            raise errors[index]
+        return results
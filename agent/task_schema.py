@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+JSON schema for task payloads, shared by the MCP server and tools/chatgpt_adapter.py.
+"""
+from typing import Optional
+
+from jsonschema import Draft7Validator, FormatChecker
+
+TASK_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'task_id': {'type': 'string'},
+        'description': {'type': 'string'},
+        'status': {'type': 'string', 'enum': ['pending', 'in-progress', 'completed', 'failed']},
+        'due_date': {'type': 'string', 'format': 'date'},
+    },
+    'required': ['task_id', 'description', 'status', 'due_date'],
+}
+
+# Built once; constructing a validator per payload dominates the cost of validating small tasks
+_validator = Draft7Validator(TASK_SCHEMA, format_checker=FormatChecker())
+
+
+def task_validation_error(task) -> Optional[str]:
+    """Return a description of the first schema violation in `task`, or None if it is valid."""
+    error = next(iter(_validator.iter_errors(task)), None)
+    return None if error is None else error.message
+
+
+def validate_task_dict(task_dict: dict) -> bool:
+    """Validate a dict against the TASK_SCHEMA. Returns True if valid, else False."""
+    return task_validation_error(task_dict) is None
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Task sources: the `tasks_file` the runner syncs into the task store and writes results back to.
+
+The format comes from `task_source.format` in agent_config.json, or else from the file extension:
+- xlsx (.xlsx/.xlsm/.xls): read with the configured `excel_engine`.
+- csv: read in chunks of `chunk_rows` rows; task ids stay strings (no "001" -> 1).
+- parquet: through a pyarrow dataset. Only the task columns are read, and a status filter is pushed
+  down so row groups whose statistics exclude it are skipped.
+- sqlite (.db/.sqlite/.sqlite3): a table (`task_source.table`, default `tasks`) with the task
+  columns, filtered in SQL.
+
+Results are written back in place where the format supports it: SQLite sources get an UPDATE of the
+statuses that changed. File sources are left untouched and results go to `<name>.updated.<ext>`, in
+the source's format unless `output_format` says otherwise (see `writers`).
+
+    "task_source": {"format": "parquet", "chunk_rows": 50000, "statuses": ["pending"]}
+
+With `statuses`, only rows in those statuses are imported (a missing status counts as pending).
+Additional formats can be plugged in with `register_task_source`.
+"""
+import logging
+import os
+import re
+import sqlite3
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+import pandas as pd
+
+from . import writers
+from .task_store import TASK_COLUMNS, read_excel
+from .task_table import DEFAULT_STATUS, TaskTable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_ROWS = 50_000
+DEFAULT_TABLE = 'tasks'
+EXTENSIONS = {
+    '.xlsx': 'xlsx', '.xlsm': 'xlsx', '.xls': 'xlsx',
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.db': 'sqlite', '.sqlite': 'sqlite', '.sqlite3': 'sqlite',
+}
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def source_format(path: str, fmt: Optional[str] = None) -> str:
+    """The source format for `path`: `fmt` unless it is empty or `auto`, else from the extension."""
+    if fmt and fmt != 'auto':
+        return fmt.lower()
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in EXTENSIONS:
+        raise ValueError(f'Cannot tell the task source format of {path}; set task_source.format')
+    return EXTENSIONS[ext]
+
+
+def updated_path(path: str, fmt: str) -> str:
+    """Where results for the tasks file `path` are written: `<name>.updated.<ext of fmt>`."""
+    root, ext = os.path.splitext(writers.output_path(path, fmt))
+    return f'{root}.updated{ext}'
+
+
+def write_updated(path: str, tasks: TaskTable, fmt: str) -> str:
+    out = updated_path(path, fmt)
+    writers.write_frame(out, tasks.to_dataframe(), fmt=fmt)
+    return out
+
+
+def _status_filter(df: pd.DataFrame, statuses: Optional[Iterable[str]]) -> pd.DataFrame:
+    if statuses is None:
+        return df
+    status = df['status'] if 'status' in df.columns else pd.Series(None, index=df.index, dtype=object)
+    status = status.astype(object).where(status.notna(), DEFAULT_STATUS).astype(str)
+    return df[status.isin(list(statuses)).to_numpy()]
+
+
+class TaskSource:
+    """A tasks file: read its rows (optionally only some statuses) and write results back."""
+
+    format = ''
+
+    def __init__(self, path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS, engine: Optional[str] = None,
+                 table: str = DEFAULT_TABLE):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.engine = engine
+        self.table = table
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def iter_frames(self, statuses: Optional[Iterable[str]] = None) -> Iterator[pd.DataFrame]:
+        """Yield the task rows as DataFrames of (a subset of) the task columns."""
+        raise NotImplementedError
+
+    def read(self, statuses: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        frames = list(self.iter_frames(statuses))
+        if not frames:
+            return pd.DataFrame(columns=TASK_COLUMNS)
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0].reset_index(drop=True)
+
+    def write_back(self, tasks: TaskTable, changed: Dict[str, str], fmt: Optional[str] = None) -> str:
+        """Record the processed `tasks` (`changed` maps task ids to their new status); returns the path written."""
+        return write_updated(self.path, tasks, fmt or self.format)
+
+
+class ExcelTaskSource(TaskSource):
+    format = 'xlsx'
+
+    def iter_frames(self, statuses=None):
+        df = read_excel(self.path, self.engine, usecols=lambda c: c in TASK_COLUMNS)
+        yield _status_filter(df, statuses)
+
+
+class CSVTaskSource(TaskSource):
+    format = 'csv'
+
+    def iter_frames(self, statuses=None):
+        reader = pd.read_csv(self.path, usecols=lambda c: c in TASK_COLUMNS, chunksize=self.chunk_rows,
+                             dtype={'task_id': str, 'description': str, 'status': str})
+        with reader:
+            for chunk in reader:
+                yield _status_filter(chunk, statuses)
+
+
+class ParquetTaskSource(TaskSource):
+    format = 'parquet'
+
+    def iter_frames(self, statuses=None):
+        try:
+            import pyarrow.dataset as ds
+        except ImportError as e:
+            raise RuntimeError('Parquet task sources require pyarrow') from e
+        dataset = ds.dataset(self.path, format='parquet')
+        columns = [c for c in TASK_COLUMNS if c in dataset.schema.names]
+        expr = None
+        if statuses is not None:
+            statuses = [str(s) for s in statuses]
+            if 'status' not in columns:
+                # Every row is pending
+                if DEFAULT_STATUS not in statuses:
+                    return
+            else:
+                expr = ds.field('status').isin(statuses)
+                if DEFAULT_STATUS in statuses:
+                    expr = expr | ds.field('status').is_null()
+        for batch in dataset.to_batches(columns=columns, filter=expr, batch_size=self.chunk_rows):
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+
+class SQLiteTaskSource(TaskSource):
+    """A table in an SQLite database; statuses are written back with UPDATE."""
+
+    format = 'sqlite'
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(path, **kwargs)
+        if not _IDENTIFIER.match(self.table):
+            raise ValueError(f'Invalid task source table name: {self.table!r}')
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def iter_frames(self, statuses=None):
+        conn = self._connect()
+        try:
+            present = {row[1] for row in conn.execute(f'PRAGMA table_info("{self.table}")')}
+            if not present:
+                raise ValueError(f'Table {self.table!r} not found in {self.path}')
+            columns = [c for c in TASK_COLUMNS if c in present]
+            sql = f'SELECT {", ".join(columns)} FROM "{self.table}"'
+            params: list = []
+            if statuses is not None:
+                statuses = [str(s) for s in statuses]
+                if 'status' in present:
+                    clauses = [f'status IN ({", ".join("?" * len(statuses))})'] if statuses else []
+                    if DEFAULT_STATUS in statuses:
+                        clauses.append('status IS NULL')
+                    sql += f' WHERE {" OR ".join(clauses) or "0"}'
+                    params = statuses
+                elif DEFAULT_STATUS not in statuses:
+                    return
+            for chunk in pd.read_sql_query(sql + ' ORDER BY rowid', conn, params=params, chunksize=self.chunk_rows):
+                yield chunk
+        finally:
+            conn.close()
+
+    def write_back(self, tasks, changed, fmt=None):
+        if fmt and fmt != self.format:
+            return write_updated(self.path, tasks, fmt)
+        conn = self._connect()
+        try:
+            with conn:
+                # Rows already in that status are not rewritten, so an unchanged run leaves the file alone
+                cur = conn.executemany(
+                    f'UPDATE "{self.table}" SET status = ? WHERE task_id = ? AND status IS NOT ?',
+                    [(status, task_id, status) for task_id, status in changed.items()])
+            logger.info('Updated %d task statuses in %s', max(cur.rowcount, 0), self.path)
+        finally:
+            conn.close()
+        return self.path
+
+
+SOURCE_BACKENDS: Dict[str, Callable[..., TaskSource]] = {
+    'xlsx': ExcelTaskSource,
+    'csv': CSVTaskSource,
+    'parquet': ParquetTaskSource,
+    'sqlite': SQLiteTaskSource,
+}
+
+
+def register_task_source(fmt: str, factory: Callable[..., TaskSource], extensions: Iterable[str] = ()):
+    """Make a task source available as `task_source.format = fmt` (and for the given file extensions)."""
+    SOURCE_BACKENDS[fmt] = factory
+    for ext in extensions:
+        EXTENSIONS[ext.lower()] = fmt
+
+
+def task_source_for(path: str, fmt: Optional[str] = None, **options) -> TaskSource:
+    fmt = source_format(path, fmt)
+    if fmt not in SOURCE_BACKENDS:
+        raise ValueError(f'Unknown task source format: {fmt}')
+    return SOURCE_BACKENDS[fmt](path, **options)
+
+
+def open_task_source(cfg: dict) -> TaskSource:
+    """The task source for `data_dir`/`tasks_file`, configured by the `task_source` section."""
+    section = cfg.get('task_source') or {}
+    path = os.path.join(cfg['data_dir'], cfg['tasks_file'])
+    return task_source_for(path, section.get('format'),
+                           chunk_rows=int(section.get('chunk_rows', DEFAULT_CHUNK_ROWS)),
+                           engine=cfg.get('excel_engine'),
+                           table=section.get('table', DEFAULT_TABLE))
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Task storage shared by the MCP server (ingest) and the agent runner (processing).
+
+The default backend is an SQLite database in WAL mode: new tasks are appended with a single INSERT
+(re-adding a known task_id only refreshes the description and due date of a still-pending task, never
+its status or lease), task_id and status are indexed, and claims run inside an IMMEDIATE transaction so
+concurrent workers never receive the same task. A claim is a lease: the claiming worker acks it with a
+final status, releases it, or extends it, and a claim whose lease has expired (e.g. its worker crashed)
+is handed out again by the next `claim`. Importing the tasks file (Excel, CSV, Parquet or SQLite; see
+`task_sources`) and exporting to a sheet are explicit sync steps (`import_source` / `export_excel`)
+rather than the storage format.
+
+Backends are selected by the `task_store` section of agent_config.json:
+
+    "task_store": {"backend": "sqlite", "path": "tasks.db"}
+
+A relative `path` is resolved against `data_dir`. Additional backends can be plugged in with
+`register_task_store`.
+
+Excel sheets are read with the engine named by `excel_engine` in the config (or AGENT_EXCEL_ENGINE):
+`calamine` (the optional python-calamine package, much faster than openpyxl on large sheets),
+`openpyxl`, or `auto` for calamine when it is installed.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from .writers import write_records
+
+logger = logging.getLogger(__name__)
+
+TASK_COLUMNS = ['task_id', 'description', 'status', 'due_date']
+CLAIMED = 'claimed'
+DEFAULT_STORE_FILE = 'tasks.db'
+
+
+def excel_engine(engine: Optional[str] = None) -> Optional[str]:
+    """Resolve an Excel engine name; `auto` picks calamine when python-calamine is installed."""
+    engine = engine or os.environ.get('AGENT_EXCEL_ENGINE')
+    if engine != 'auto':
+        return engine
+    try:
+        import python_calamine  # noqa: F401
+        return 'calamine'
+    except ImportError:
+        return None
+
+
+def read_excel(path: str, engine: Optional[str] = None, **kwargs) -> pd.DataFrame:
+    return pd.read_excel(path, engine=excel_engine(engine), **kwargs)
+
+
+def _normalize_task(task: dict) -> dict:
+    """Coerce a task payload to the stored representation (strings, ISO due dates)."""
+    due = task.get('due_date')
+    if due is None or (not isinstance(due, str) and pd.isna(due)):
+        due = None
+    elif not isinstance(due, str):
+        due = pd.Timestamp(due).date().isoformat()
+    status = task.get('status')
+    if status is None or (not isinstance(status, str) and pd.isna(status)):
+        status = 'pending'
+    return {
+        'task_id': str(task.get('task_id')),
+        'description': None if task.get('description') is None else str(task.get('description')),
+        'status': str(status),
+        'due_date': due,
+    }
+
+
+class TaskStore:
+    """Interface implemented by task store backends."""
+
+    def add(self, task: dict):
+        self.add_many([task])
+
+    def add_many(self, tasks: Iterable[dict]) -> int:
+        raise NotImplementedError
+
+    def list_tasks(self, status: Optional[str] = None) -> List[dict]:
+        raise NotImplementedError
+
+    def count(self, status: Optional[str] = None) -> int:
+        return len(self.list_tasks(status))
+
+    def claim(self, worker_id: str, limit: int = 1, lease_seconds: float = 300,
+              statuses: Iterable[str] = ('pending',)) -> List[dict]:
+        raise NotImplementedError
+
+    def ack(self, worker_id: str, statuses: Dict[str, str]) -> List[str]:
+        raise NotImplementedError
+
+    def release(self, worker_id: str, task_ids: Iterable[str]) -> List[str]:
+        raise NotImplementedError
+
+    def extend_lease(self, worker_id: str, task_ids: Iterable[str], lease_seconds: float = 300) -> List[str]:
+        raise NotImplementedError
+
+    def update_statuses(self, statuses: Dict[str, str]):
+        raise NotImplementedError
+
+    def update_status(self, task_id: str, status: str):
+        self.update_statuses({task_id: status})
+
+    def import_source(self, source, statuses: Optional[Iterable[str]] = None) -> int:
+        """Add the rows of a task source (see `task_sources`), optionally only those in `statuses`.
+
+        Rows already in the store are only refreshed while pending (see `add_many`).
+        """
+        count = 0
+        for df in source.iter_frames(statuses):
+            records = df.reindex(columns=TASK_COLUMNS).to_dict('records')
+            count += self.add_many(r for r in records if not pd.isna(r.get('task_id')))
+        logger.info('Imported %d tasks from %s', count, source.path)
+        return count
+
+    def import_excel(self, path: str, engine: Optional[str] = None) -> int:
+        """Add every row of an Excel tasks sheet to the store."""
+        from .task_sources import ExcelTaskSource
+
+        return self.import_source(ExcelTaskSource(path, engine=engine))
+
+    def export_excel(self, path: str) -> str:
+        count = write_records(path, self.list_tasks(), columns=TASK_COLUMNS)
+        logger.info('Exported %d tasks to %s', count, path)
+        return path
+
+
+class SQLiteTaskStore(TaskStore):
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tasks (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id TEXT NOT NULL,
+        description TEXT,
+        status TEXT NOT NULL DEFAULT 'pending',
+        due_date TEXT,
+        claimed_by TEXT,
+        lease_expires REAL,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_task_id ON tasks(task_id);
+    CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets readers proceed while a writer commits
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def add_many(self, tasks: Iterable[dict]) -> int:
+        # Claimed and processed rows are left alone, so a re-import or re-post cannot reset a lease or result
+        now = time.time()
+        rows = [_normalize_task(t) for t in tasks]
+        with self._transaction() as conn:
+            conn.executemany(
+                'INSERT INTO tasks (task_id, description, status, due_date, created_at, updated_at) '
+                'VALUES (:task_id, :description, :status, :due_date, :now, :now) '
+                'ON CONFLICT(task_id) DO UPDATE SET description=excluded.description, due_date=excluded.due_date, '
+                "updated_at=excluded.updated_at WHERE tasks.status = 'pending'",
+                [dict(r, now=now) for r in rows],
+            )
+        return len(rows)
+
+    def list_tasks(self, status: Optional[str] = None) -> List[dict]:
+        sql = 'SELECT task_id, description, status, due_date FROM tasks'
+        params: tuple = ()
+        if status is not None:
+            sql += ' WHERE status = ?'
+            params = (status,)
+        return [dict(r) for r in self._conn().execute(sql + ' ORDER BY seq', params)]
+
+    def count(self, status: Optional[str] = None) -> int:
+        if status is None:
+            return self._conn().execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+        return self._conn().execute('SELECT COUNT(*) FROM tasks WHERE status = ?', (status,)).fetchone()[0]
+
+    def claim(self, worker_id: str, limit: int = 1, lease_seconds: float = 300,
+              statuses: Iterable[str] = ('pending',)) -> List[dict]:
+        """Atomically lease up to `limit` tasks to `worker_id`: those in `statuses` (pending by default),
+        and claims whose lease expired. Expired claims are returned as pending."""
+        now = time.time()
+        statuses = [s for s in statuses if s != CLAIMED]
+        marks = ','.join('?' * len(statuses))
+        with self._transaction() as conn:
+            rows = [dict(r) for r in conn.execute(
+                f'SELECT seq, task_id, description, status, due_date FROM tasks WHERE status IN ({marks}) '
+                'OR (status = ? AND lease_expires < ?) ORDER BY seq LIMIT ?', (*statuses, CLAIMED, now, limit))]
+            conn.executemany(
+                'UPDATE tasks SET status = ?, claimed_by = ?, lease_expires = ?, updated_at = ? WHERE seq = ?',
+                [(CLAIMED, worker_id, now + lease_seconds, now, r['seq']) for r in rows],
+            )
+        for r in rows:
+            r.pop('seq')
+            if r['status'] == CLAIMED:
+                r['status'] = 'pending'
+        return rows
+
+    def _owned(self, conn: sqlite3.Connection, worker_id: str, task_ids: Iterable[str]) -> List[str]:
+        ids = list(task_ids)
+        if not ids:
+            return []
+        marks = ','.join('?' * len(ids))
+        return [r[0] for r in conn.execute(
+            f'SELECT task_id FROM tasks WHERE status = ? AND claimed_by = ? AND task_id IN ({marks})',
+            (CLAIMED, worker_id, *ids))]
+
+    def ack(self, worker_id: str, statuses: Dict[str, str]) -> List[str]:
+        """Record final statuses for tasks still leased to `worker_id`; returns the task_ids updated.
+
+        A task whose lease was lost to another worker is left alone.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            owned = self._owned(conn, worker_id, statuses)
+            conn.executemany(
+                'UPDATE tasks SET status = ?, claimed_by = NULL, lease_expires = NULL, updated_at = ? '
+                'WHERE task_id = ?',
+                [(statuses[task_id], now, task_id) for task_id in owned],
+            )
+        return owned
+
+    def release(self, worker_id: str, task_ids: Iterable[str]) -> List[str]:
+        """Return tasks leased to `worker_id` to the pending queue."""
+        now = time.time()
+        with self._transaction() as conn:
+            owned = self._owned(conn, worker_id, task_ids)
+            conn.executemany(
+                "UPDATE tasks SET status = 'pending', claimed_by = NULL, lease_expires = NULL, updated_at = ? "
+                'WHERE task_id = ?',
+                [(now, task_id) for task_id in owned],
+            )
+        return owned
+
+    def extend_lease(self, worker_id: str, task_ids: Iterable[str], lease_seconds: float = 300) -> List[str]:
+        """Push the lease of tasks held by `worker_id` to `lease_seconds` from now."""
+        now = time.time()
+        with self._transaction() as conn:
+            owned = self._owned(conn, worker_id, task_ids)
+            conn.executemany('UPDATE tasks SET lease_expires = ?, updated_at = ? WHERE task_id = ?',
+                             [(now + lease_seconds, now, task_id) for task_id in owned])
+        return owned
+
+    def update_statuses(self, statuses: Dict[str, str]):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                'UPDATE tasks SET status = ?, claimed_by = NULL, lease_expires = NULL, updated_at = ? '
+                'WHERE task_id = ?',
+                [(status, now, task_id) for task_id, status in statuses.items()],
+            )
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+STORE_BACKENDS: Dict[str, Callable[[str], TaskStore]] = {'sqlite': SQLiteTaskStore}
+_stores: Dict[tuple, TaskStore] = {}
+_stores_lock = threading.Lock()
+
+
+def register_task_store(name: str, factory: Callable[[str], TaskStore]):
+    """Make a task store backend available under `task_store.backend = name`."""
+    STORE_BACKENDS[name] = factory
+
+
+def task_store_path(cfg: dict) -> str:
+    section = cfg.get('task_store') or {}
+    data_dir = cfg.get('data_dir') or os.path.join(os.path.dirname(__file__), '..', 'resources')
+    path = section.get('path') or DEFAULT_STORE_FILE
+    return os.path.abspath(path if os.path.isabs(path) else os.path.join(data_dir, path))
+
+
+def open_task_store(cfg: dict) -> TaskStore:
+    """Return the (cached) task store configured in `cfg`."""
+    backend = (cfg.get('task_store') or {}).get('backend', 'sqlite')
+    key = (backend, task_store_path(cfg))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            if backend not in STORE_BACKENDS:
+                raise ValueError(f'Unknown task store backend: {backend}')
+            store = STORE_BACKENDS[backend](key[1])
+            _stores[key] = store
+        return store
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Columnar task table used by the runner.
+
+`TaskTable` holds one array per column instead of one `Task` object per row:
+- task ids and descriptions are object arrays that share the strings read from the sheet.
+- status is categorical: small integer codes into a short list of status names.
+- due dates are datetime64[ns], with NaT when unset.
+
+That is about 26 bytes per row on top of the strings, against roughly 240 bytes for a `Task`
+dataclass with its `__dict__` and `Timestamp`.
+
+Rows are accessed through `TaskView`, a slotted view that reads and writes the table in place.
+Pickling a view sends a plain `Task` (process pools get a copy of the row, not the whole table).
+`update_statuses` sets many statuses in one vectorized step, and `to_dataframe` builds the frame
+written back to the sheet straight from the column arrays.
+"""
+import warnings
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .task_store import TASK_COLUMNS
+
+DEFAULT_STATUS = 'pending'
+
+
+@dataclass
+class Task:
+    task_id: str
+    description: str
+    status: str
+    due_date: datetime | None = None
+
+
+def _parse_due_dates(values: pd.Series) -> np.ndarray:
+    """Parse a due_date column in one vectorized pass into datetime64[ns]; bad or missing dates become NaT."""
+    with warnings.catch_warnings():
+        # pandas warns when it cannot infer one format and falls back to per-element parsing
+        warnings.simplefilter('ignore', UserWarning)
+        try:
+            parsed = pd.to_datetime(values, errors='coerce')
+        except (TypeError, ValueError):
+            # e.g. a mix of timezone-aware and naive values
+            parsed = pd.Series(pd.NaT, index=values.index)
+    if getattr(parsed.dt, 'tz', None) is not None:
+        parsed = parsed.dt.tz_convert(None)
+    due = parsed.to_numpy(dtype='datetime64[ns]', copy=True)
+    # Values the inferred format did not fit (mixed formats in one column) are parsed one by one,
+    # once per distinct value
+    retried: dict = {}
+    for i in np.flatnonzero(np.isnat(due) & values.notna().to_numpy()):
+        raw = values.iat[i]
+        key = (type(raw), raw)
+        if key not in retried:
+            try:
+                value = pd.Timestamp(pd.to_datetime(raw))
+                if value.tzinfo is not None:
+                    value = value.tz_convert(None)
+                retried[key] = value.to_datetime64()
+            except Exception:
+                retried[key] = np.datetime64('NaT')
+        due[i] = retried[key]
+    return due
+
+
+class TaskView:
+    """One row of a `TaskTable`; setting `status` writes through to the table."""
+
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table: 'TaskTable', index: int):
+        self.table = table
+        self.index = index
+
+    @property
+    def task_id(self) -> str:
+        return self.table.task_id[self.index]
+
+    @property
+    def description(self) -> str:
+        return self.table.description[self.index]
+
+    @property
+    def status(self) -> str:
+        return self.table.status_at(self.index)
+
+    @status.setter
+    def status(self, value: str):
+        self.table.set_status(self.index, value)
+
+    @property
+    def due_date(self) -> Optional[pd.Timestamp]:
+        return self.table.due_date_at(self.index)
+
+    def to_task(self) -> Task:
+        return Task(task_id=self.task_id, description=self.description, status=self.status,
+                    due_date=self.due_date)
+
+    def __reduce__(self):
+        return Task, (self.task_id, self.description, self.status, self.due_date)
+
+    def __repr__(self):
+        return (f'TaskView(task_id={self.task_id!r}, description={self.description!r}, '
+                f'status={self.status!r}, due_date={self.due_date!r})')
+
+
+class TaskTable:
+    """Tasks stored column-wise; see the module docstring."""
+
+    def __init__(self, task_id: np.ndarray, description: np.ndarray, status_codes: np.ndarray,
+                 categories: List[str], due_date: np.ndarray):
+        self.task_id = task_id
+        self.description = description
+        self.due_date = due_date
+        self._codes = status_codes
+        self._categories = list(categories)
+        self._category_index = {c: i for i, c in enumerate(self._categories)}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'TaskTable':
+        """Build a table from a tasks DataFrame; missing statuses default to 'pending'."""
+        n = len(df)
+
+        def strings(name: str) -> np.ndarray:
+            values = df[name].tolist() if name in df.columns else [None] * n
+            return np.array(list(map(str, values)), dtype=object)
+
+        table = cls(strings('task_id'), strings('description'), np.zeros(n, dtype=np.int16), [DEFAULT_STATUS],
+                    _parse_due_dates(df['due_date']) if 'due_date' in df.columns
+                    else np.full(n, np.datetime64('NaT'), dtype='datetime64[ns]'))
+        if 'status' in df.columns:
+            status = df['status'].astype(object)
+            table.update_statuses(np.arange(n), status.where(status.notna(), DEFAULT_STATUS).to_numpy())
+        return table
+
+    @classmethod
+    def from_tasks(cls, tasks: Iterable[Task]) -> 'TaskTable':
+        return cls.from_frame(pd.DataFrame([vars(t) for t in tasks], columns=TASK_COLUMNS))
+
+    def __len__(self) -> int:
+        return len(self.task_id)
+
+    def __getitem__(self, index: int) -> TaskView:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return TaskView(self, index)
+
+    def __iter__(self) -> Iterator[TaskView]:
+        return (TaskView(self, i) for i in range(len(self)))
+
+    def views(self, indices: Iterable[int]) -> List[TaskView]:
+        return [TaskView(self, int(i)) for i in indices]
+
+    def status_at(self, index: int) -> str:
+        return self._categories[self._codes[index]]
+
+    def due_date_at(self, index: int) -> Optional[pd.Timestamp]:
+        value = self.due_date[index]
+        return None if np.isnat(value) else pd.Timestamp(value)
+
+    def task(self, index: int) -> Task:
+        return self[index].to_task()
+
+    @property
+    def statuses(self) -> np.ndarray:
+        """Status names as an object array (a new array; use `update_statuses` to change them)."""
+        return np.array(self._categories, dtype=object)[self._codes]
+
+    def status_mask(self, status: str) -> np.ndarray:
+        """Boolean mask of the rows whose status is `status`."""
+        code = self._category_index.get(status)
+        return np.zeros(len(self), dtype=bool) if code is None else self._codes == code
+
+    def _code(self, status: str) -> int:
+        code = self._category_index.get(status)
+        if code is None:
+            code = len(self._categories)
+            self._categories.append(status)
+            self._category_index[status] = code
+            if code > np.iinfo(self._codes.dtype).max:
+                self._codes = self._codes.astype(np.int32)
+        return code
+
+    def set_status(self, index: int, status: str):
+        self._codes[index] = self._code(str(status))
+
+    def update_statuses(self, indices: Union[Sequence[int], np.ndarray],
+                        statuses: Union[str, Sequence[str], np.ndarray]):
+        """Set the status of the rows at `indices` to one status, or to one status per row."""
+        if isinstance(statuses, str):
+            self._codes[np.asarray(indices, dtype=np.intp)] = self._code(statuses)
+            return
+        codes, uniques = pd.factorize(np.asarray(statuses, dtype=object))
+        if len(codes) and codes.min() < 0:
+            raise ValueError('statuses must not be missing')
+        mapping = np.array([self._code(str(u)) for u in uniques], dtype=self._codes.dtype)
+        self._codes[np.asarray(indices, dtype=np.intp)] = mapping[codes]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """A DataFrame over the columns, with status as a pandas Categorical."""
+        status = pd.Categorical.from_codes(self._codes, categories=self._categories)
+        return pd.DataFrame({
+            'task_id': self.task_id,
+            'description': self.description,
+            'status': status,
+            'due_date': self.due_date,
+        }, copy=False)
+
+    def to_tasks(self) -> List[Task]:
+        return [view.to_task() for view in self]
+
+    def __repr__(self):
+        return f'TaskTable({len(self)} tasks)'
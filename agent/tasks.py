@@ -2,10 +2,23 @@
 Agent task helper functions used by `agent_runner.py`.
 This file adds some reusable actions for tasks.
 """
+import math
+import os
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, Iterator, List, Optional, Sequence
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+from . import result_cache
+from . import writers
+from .metrics_server import instrument, record_bytes
+
+DEFAULT_CHUNK_ROWS = 50_000
+# Values kept per column for approximate quantiles; quantiles are exact below this many values
+QUANTILE_SAMPLE_SIZE = 8192
+DEFAULT_QUANTILES = (0.25, 0.5, 0.75, 0.9, 0.99)
 
 
 @dataclass
@@ -14,25 +27,185 @@ class SummaryResult:
     mean: float
     sum: float
     count: int
+    min: Optional[float] = None
+    max: Optional[float] = None
+    std: Optional[float] = None
+    quantiles: Optional[Dict[float, float]] = None
+
+    def as_dict(self) -> dict:
+        """Flat row for writing; optional statistics are included only when they were computed."""
+        row = {'column': self.column, 'mean': self.mean, 'sum': self.sum, 'count': self.count}
+        for name in ('min', 'max', 'std'):
+            if getattr(self, name) is not None:
+                row[name] = getattr(self, name)
+        for q, value in (self.quantiles or {}).items():
+            row[f'p{q * 100:g}'] = value
+        return row
 
 
-def summarize_data(file_path: str, sheet_name: str | None = None) -> List[SummaryResult]:
-    # If sheet_name is None, pandas returns a dict of DataFrames; read the default sheet instead
-    if sheet_name is None:
-        df = pd.read_excel(file_path)
+def iter_chunks(file_path: str, sheet_name: str | None = None, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield the rows of a CSV, Parquet or Excel file as DataFrames of at most `chunk_rows` rows."""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in ('.csv', '.txt'):
+        yield from pd.read_csv(file_path, chunksize=chunk_rows)
+    elif ext == '.parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            yield pd.read_parquet(file_path)
+            return
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    elif ext in ('.xlsx', '.xlsm'):
+        yield from _iter_xlsx_chunks(file_path, sheet_name, chunk_rows)
+    elif sheet_name is None:
+        # Legacy formats (.xls) have no streaming reader; read the default sheet at once
+        yield pd.read_excel(file_path)
     else:
-        df = pd.read_excel(file_path, sheet_name=sheet_name)
-    results = []
-    numeric_columns = df.select_dtypes(include=["number"]).columns
-    for col in numeric_columns:
-        column_data = df[col].dropna()
-        results.append(SummaryResult(column=col, mean=float(column_data.mean()), sum=float(column_data.sum()), count=int(len(column_data))))
-    return results
+        yield pd.read_excel(file_path, sheet_name=sheet_name)
+
+
+def _iter_xlsx_chunks(file_path: str, sheet_name: str | None, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    # read_only mode streams rows from the sheet XML instead of building the whole workbook
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name is not None else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [c if c is not None else f'Unnamed: {i}' for i, c in enumerate(header)]
+        buf = []
+        for row in rows:
+            buf.append(row)
+            if len(buf) >= chunk_rows:
+                yield pd.DataFrame(buf, columns=columns)
+                buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=columns)
+    finally:
+        wb.close()
+
+
+class _ColumnStats:
+    """Mergeable aggregates for one numeric column (Chan et al. parallel variance)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sample_keys = np.empty(0)
+        self.sample_values = np.empty(0)
+
+    def merge(self, count: int, total: float, m2: float, lo: float, hi: float):
+        if count == 0:
+            return
+        mean = total / count
+        if self.count == 0:
+            self.mean, self.m2 = mean, m2
+        else:
+            n = self.count + count
+            delta = mean - self.mean
+            self.m2 += m2 + delta * delta * self.count * count / n
+            self.mean += delta * count / n
+        self.count += count
+        self.total += total
+        self.min = min(self.min, lo)
+        self.max = max(self.max, hi)
+
+    def sample(self, values: np.ndarray, rng: np.random.Generator, size: int):
+        # Bottom-k sampling: keeping the values with the k smallest random keys is a uniform sample
+        # of everything seen so far and merges chunk by chunk without revisiting earlier rows.
+        keys = np.concatenate([self.sample_keys, rng.random(len(values))])
+        vals = np.concatenate([self.sample_values, values])
+        if len(keys) > size:
+            keep = np.argpartition(keys, size)[:size]
+            keys, vals = keys[keep], vals[keep]
+        self.sample_keys, self.sample_values = keys, vals
+
+    def result(self, column: str, extended: bool, quantiles: Sequence[float]) -> SummaryResult:
+        res = SummaryResult(column=column, mean=self.total / self.count if self.count else float('nan'),
+                            sum=float(self.total), count=int(self.count))
+        if extended and self.count:
+            res.min, res.max = float(self.min), float(self.max)
+            res.std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else float('nan')
+            if quantiles:
+                res.quantiles = {q: float(v) for q, v in zip(quantiles, np.quantile(self.sample_values, quantiles))}
+        return res
+
+
+def summarize_chunks(chunks: Iterator[pd.DataFrame], extended: bool = False,
+                     quantiles: Sequence[float] = DEFAULT_QUANTILES) -> List[SummaryResult]:
+    """Summarize numeric columns across DataFrame chunks in a single pass with bounded memory.
+
+    A column counts as numeric when it holds only numbers (or nulls) in every chunk, matching
+    `DataFrame.select_dtypes(include=['number'])` on the full data.
+    """
+    stats: Dict[str, _ColumnStats] = {}
+    excluded = set()
+    rng = np.random.default_rng(0)
+    for chunk in chunks:
+        chunk = chunk.infer_objects()
+        numeric = []
+        for col in chunk.columns:
+            if col in excluded:
+                continue
+            series = chunk[col]
+            if is_numeric_dtype(series) and not is_bool_dtype(series):
+                numeric.append(col)
+                stats.setdefault(col, _ColumnStats())
+            elif series.notna().any():
+                excluded.add(col)
+                stats.pop(col, None)
+            else:
+                stats.setdefault(col, _ColumnStats())
+        if not numeric:
+            continue
+        block = chunk[numeric].astype('float64')
+        counts = block.count()
+        sums = block.sum()
+        m2 = ((block - sums / counts) ** 2).sum()
+        mins, maxs = block.min(), block.max()
+        for col in numeric:
+            stats[col].merge(int(counts[col]), float(sums[col]), float(m2[col]), float(mins[col]), float(maxs[col]))
+            if extended and quantiles and counts[col]:
+                values = block[col].to_numpy()
+                stats[col].sample(values[~np.isnan(values)], rng, QUANTILE_SAMPLE_SIZE)
+    return [s.result(col, extended, quantiles) for col, s in stats.items()]
+
+
+def summarize_data(file_path: str, sheet_name: str | None = None, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                   extended: bool = False, quantiles: Sequence[float] = DEFAULT_QUANTILES) -> List[SummaryResult]:
+    """Summarize the numeric columns of an Excel, CSV or Parquet file, streaming it in row chunks.
+
+    With `extended=True` the results also carry min, max, sample standard deviation and approximate
+    quantiles.
+    """
+    return summarize_chunks(iter_chunks(file_path, sheet_name, chunk_rows), extended=extended, quantiles=quantiles)
 
 
 def write_summary(output_path: str, results: List[SummaryResult]):
+    """Write summary rows as xlsx, CSV or Parquet (by extension), atomically; see `writers`."""
     import logging
-    df = pd.DataFrame([r.__dict__ for r in results])
-    df.to_excel(output_path, index=False)
+    writers.write_records(output_path, (r.as_dict() for r in results))
     logging.getLogger(__name__).info('Wrote summary to %s', output_path)
 
+
+@instrument('tasks.summarize_to_file', outcome=lambda hit: 'cached' if hit else 'ok')
+def summarize_to_file(file_path: str, output_path: str, extended: bool = False) -> bool:
+    """Write the summary of `file_path` to `output_path`.
+
+    The summary is served from the result cache when the same content was summarized before.
+    Returns True on a cache hit.
+    """
+    def produce(tmp_path: str):
+        write_summary(tmp_path, summarize_data(file_path, extended=extended))
+        record_bytes('read', os.path.getsize(file_path))
+        record_bytes('written', os.path.getsize(tmp_path))
+
+    return result_cache.materialize(file_path, 'summarize', {'extended': extended}, output_path, produce)
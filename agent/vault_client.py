@@ -8,25 +8,158 @@ Usage:
 
 This wrapper uses requests to query Vault's KV v2 API and returns the 'data' section.
 To avoid adding a full vault dependency, this is a small helper for demo use.
+
+Secrets are cached in-process per (address, token, path). An entry lives for the secret's
+`lease_duration` when Vault reports one, else `VAULT_CACHE_TTL` seconds (default 300; 0 disables the
+cache). Concurrent lookups of the same path share a single request, and an entry read during the
+last quarter of its lifetime is refreshed in the background so callers keep getting cached values.
+All requests go through one keep-alive `requests.Session`.
 """
 
 from __future__ import annotations
 
 import base64
+import logging
 import os
 import json
+import threading
+import time
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
 
 import requests
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_VAULT_ADDR = "http://127.0.0.1:8200"
+DEFAULT_TTL = 300.0
+REQUEST_TIMEOUT = 10
+# Fraction of an entry's lifetime after which a read triggers a background refresh
+REFRESH_AFTER = 0.75
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Process-wide session so Vault lookups reuse pooled keep-alive connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+        return _session
+
+
+class _Entry:
+    __slots__ = ("value", "refresh_at", "expires_at", "refreshing")
+
+    def __init__(self, value, now: float, ttl: float):
+        self.value = value
+        self.refresh_at = now + ttl * REFRESH_AFTER
+        self.expires_at = now + ttl
+        self.refreshing = False
+
+
+class SecretCache:
+    """TTL cache with single-flight fetches and refresh-ahead.
+
+    `fetch` callables return `(value, ttl_seconds)`. Failed fetches are not cached; a failed
+    background refresh leaves the current entry in place until it expires.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._inflight: Dict[Hashable, threading.Event] = {}
+        self._errors: Dict[Hashable, BaseException] = {}
+
+    def get(self, key: Hashable, fetch: Callable[[], Tuple[Any, float]]):
+        while True:
+            with self._lock:
+                now = self._clock()
+                entry = self._entries.get(key)
+                if entry is not None and now < entry.expires_at:
+                    if now >= entry.refresh_at and not entry.refreshing:
+                        entry.refreshing = True
+                        threading.Thread(target=self._refresh, args=(key, fetch), daemon=True,
+                                         name="vault-refresh").start()
+                    return entry.value
+                event = self._inflight.get(key)
+                leader = event is None
+                if leader:
+                    event = self._inflight[key] = threading.Event()
+            if leader:
+                return self._fetch(key, fetch, event)
+            event.wait()
+            with self._lock:
+                error = self._errors.get(key)
+                if key not in self._entries and error is not None:
+                    raise error
+            # Loop to read the entry the leader stored
+
+    def _fetch(self, key, fetch, event: threading.Event):
+        try:
+            value, ttl = fetch()
+        except BaseException as e:
+            with self._lock:
+                self._errors[key] = e
+                self._entries.pop(key, None)
+                del self._inflight[key]
+            event.set()
+            raise
+        with self._lock:
+            self._errors.pop(key, None)
+            if ttl > 0:
+                self._entries[key] = _Entry(value, self._clock(), ttl)
+            else:
+                self._entries.pop(key, None)
+            del self._inflight[key]
+        event.set()
+        return value
+
+    def _refresh(self, key, fetch):
+        try:
+            value, ttl = fetch()
+        except Exception as e:
+            logger.warning("Background refresh of a Vault secret failed: %s", e)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+            return
+        with self._lock:
+            if ttl > 0:
+                self._entries[key] = _Entry(value, self._clock(), ttl)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one entry, or every entry when `key` is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+_secret_cache = SecretCache()
+
+
+def clear_secret_cache():
+    _secret_cache.invalidate()
+
+
+def _cache_ttl() -> float:
+    return float(os.environ.get("VAULT_CACHE_TTL", DEFAULT_TTL))
+
 
 @dataclass
 class VaultClient:
-    vault_addr: str = os.environ.get("VAULT_ADDR", "http://127.0.0.1:8200")
+    vault_addr: Optional[str] = os.environ.get("VAULT_ADDR", DEFAULT_VAULT_ADDR)
     token: Optional[str] = None
+    use_cache: bool = True
 
     def __post_init__(self):
+        self.vault_addr = self.vault_addr or os.environ.get("VAULT_ADDR", DEFAULT_VAULT_ADDR)
         self.token = self.token or os.environ.get("VAULT_TOKEN")
 
     def _headers(self) -> Dict[str, str]:
@@ -35,23 +168,33 @@ class VaultClient:
             headers["X-Vault-Token"] = self.token
         return headers
 
-    def get_secret(self, path: str) -> Dict[str, Any]:
-        """Get a secret from Vault's KV v2 secrets engine.
-
-        Path example (KV v2): 'secret/data/mysecrets'
-        """
+    def _fetch(self, path: str) -> Tuple[Dict[str, Any], float]:
         url = f"{self.vault_addr}/v1/{path}"
-        resp = requests.get(url, headers=self._headers())
+        resp = get_session().get(url, headers=self._headers(), timeout=REQUEST_TIMEOUT)
         if not resp.ok:
             raise RuntimeError(f"Vault GET failed: {resp.status_code} {resp.text}")
         data = resp.json()
+        # Leased secrets report their lifetime; static KV secrets report 0 and use the default TTL
+        lease = data.get("lease_duration") or 0
+        ttl = float(lease) if lease > 0 else _cache_ttl()
         # For KV v2, the payload is at data.data
         if "data" in data and isinstance(data["data"], dict) and "data" in data["data"]:
-            return data["data"]["data"]
+            return data["data"]["data"], ttl
         # Otherwise return the inner data
         if "data" in data:
-            return data["data"]
-        return data
+            return data["data"], ttl
+        return data, ttl
+
+    def get_secret(self, path: str) -> Dict[str, Any]:
+        """Get a secret from Vault's KV v2 secrets engine, served from the cache while it is fresh.
+
+        Path example (KV v2): 'secret/data/mysecrets'
+        """
+        if not self.use_cache or _cache_ttl() <= 0:
+            return self._fetch(path)[0]
+        secret = _secret_cache.get((self.vault_addr, self.token, path), lambda: self._fetch(path))
+        # Callers get their own copy so the cached payload cannot be modified
+        return dict(secret) if isinstance(secret, dict) else secret
 
     def get_raw_secret(self, path: str) -> Dict[str, Any]:
         return self.get_secret(path)
@@ -70,36 +213,37 @@ def get_credential(path: str, key: str, env_var: Optional[str] = None) -> Option
     if env_var and os.environ.get(env_var):
         return os.environ.get(env_var)
 
-
-    def get_aws_credentials(path: str, env_prefix: str = 'AWS') -> Dict[str, str] | None:
-        try:
-            client = VaultClient()
-            data = client.get_raw_secret(path)
-            # Expected keys: aws_access_key_id, aws_secret_access_key, aws_session_token (optional)
-            aws_key = data.get('aws_access_key_id') or data.get('aws_access_key')
-            aws_secret = data.get('aws_secret_access_key') or data.get('aws_secret_key')
-            aws_token = data.get('aws_session_token')
-            if aws_key and aws_secret:
-                return {
-                    'aws_access_key_id': aws_key,
-                    'aws_secret_access_key': aws_secret,
-                    'aws_session_token': aws_token,
-                }
-        except Exception:
-            pass
-        # fallback to env vars
-        k = os.environ.get(f'{env_prefix}_ACCESS_KEY_ID') or os.environ.get('AWS_ACCESS_KEY_ID')
-        s = os.environ.get(f'{env_prefix}_SECRET_ACCESS_KEY') or os.environ.get('AWS_SECRET_ACCESS_KEY')
-        t = os.environ.get(f'{env_prefix}_SESSION_TOKEN') or os.environ.get('AWS_SESSION_TOKEN')
-        if k and s:
-            return {
-                'aws_access_key_id': k,
-                'aws_secret_access_key': s,
-                'aws_session_token': t,
-            }
-        return None
     try:
         client = VaultClient()
         return client.get_secret_value(path, key)
     except Exception:
         return os.environ.get(env_var)
+
+
+def get_aws_credentials(path: str, env_prefix: str = 'AWS') -> Dict[str, str] | None:
+    try:
+        client = VaultClient()
+        data = client.get_raw_secret(path)
+        # Expected keys: aws_access_key_id, aws_secret_access_key, aws_session_token (optional)
+        aws_key = data.get('aws_access_key_id') or data.get('aws_access_key')
+        aws_secret = data.get('aws_secret_access_key') or data.get('aws_secret_key')
+        aws_token = data.get('aws_session_token')
+        if aws_key and aws_secret:
+            return {
+                'aws_access_key_id': aws_key,
+                'aws_secret_access_key': aws_secret,
+                'aws_session_token': aws_token,
+            }
+    except Exception:
+        pass
+    # fallback to env vars
+    k = os.environ.get(f'{env_prefix}_ACCESS_KEY_ID') or os.environ.get('AWS_ACCESS_KEY_ID')
+    s = os.environ.get(f'{env_prefix}_SECRET_ACCESS_KEY') or os.environ.get('AWS_SECRET_ACCESS_KEY')
+    t = os.environ.get(f'{env_prefix}_SESSION_TOKEN') or os.environ.get('AWS_SESSION_TOKEN')
+    if k and s:
+        return {
+            'aws_access_key_id': k,
+            'aws_secret_access_key': s,
+            'aws_session_token': t,
+        }
+    return None
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+File watchers used by `agent_runner.run_watch`.
+
+`InotifyWatcher` uses Linux inotify (through ctypes, no extra dependency) on the directory containing
+the tasks file, so it sees in-place writes as well as editors and tools that save by writing a
+temporary file and renaming it over the original. Events for other files in the directory, including
+the runner's own `.updated.xlsx` output, are ignored. `PollWatcher` keeps the previous mtime polling
+behaviour and is used where inotify is unavailable.
+
+Both watchers debounce bursts of writes and only report a change once the file is complete (for
+`.xlsx`, a readable zip archive), so half-written files are never processed.
+"""
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+import zipfile
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# inotify event masks from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')
+
+# Upper bound on how long a continuous stream of writes can postpone processing
+MAX_SETTLE_SECONDS = 2.0
+
+
+def file_is_complete(path: str) -> bool:
+    """True when `path` exists and, for xlsx workbooks, is a complete zip archive."""
+    try:
+        if os.path.getsize(path) == 0:
+            return False
+    except OSError:
+        return False
+    if path.lower().endswith('.xlsx'):
+        return zipfile.is_zipfile(path)
+    return True
+
+
+class _Watcher:
+    def __init__(self, path: str, debounce: float = 0.05):
+        self.path = os.path.abspath(path)
+        self.debounce = debounce
+        self.idle_timeout = 1.0
+
+    def _wait(self, timeout: float) -> bool:
+        """Block up to `timeout` seconds; return True if the watched file may have changed."""
+        raise NotImplementedError
+
+    def _settle(self):
+        # Debounce: wait until no further change arrives for `debounce` seconds
+        deadline = time.monotonic() + MAX_SETTLE_SECONDS
+        while time.monotonic() < deadline and self._wait(self.debounce):
+            pass
+
+    def _ready(self) -> bool:
+        return file_is_complete(self.path)
+
+    def changes(self, stop: Optional[threading.Event] = None) -> Iterator[None]:
+        """Yield once per settled, complete change of the watched file until `stop` is set."""
+        while stop is None or not stop.is_set():
+            if not self._wait(self.idle_timeout):
+                continue
+            self._settle()
+            if self._ready():
+                yield
+            else:
+                logger.debug('Ignoring incomplete write of %s', self.path)
+
+    def close(self):
+        pass
+
+
+class PollWatcher(_Watcher):
+    def __init__(self, path: str, debounce: float = 0.05, poll_interval: float = 5.0):
+        super().__init__(path, debounce)
+        self.idle_timeout = poll_interval
+        self._last = self._signature()
+
+    def _signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        # The inode changes when a save replaces the file by renaming a temporary one over it
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _wait(self, timeout: float) -> bool:
+        time.sleep(timeout)
+        sig = self._signature()
+        changed = sig != self._last
+        self._last = sig
+        return changed
+
+
+class InotifyWatcher(_Watcher):
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, path: str, debounce: float = 0.05):
+        super().__init__(path, debounce)
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        directory = os.path.dirname(self.path).encode()
+        if libc.inotify_add_watch(self._fd, directory, self.MASK) < 0:
+            err = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(err, f'inotify_add_watch failed for {directory!r}')
+        self._name = os.path.basename(self.path).encode()
+        self._writing = False
+
+    def _wait(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+            if not ready:
+                return False
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    continue
+                raise
+            if self._consume(data):
+                return True
+
+    def _consume(self, data: bytes) -> bool:
+        relevant = False
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b'\0')
+            offset += _EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                relevant = True
+            elif name == self._name:
+                relevant = True
+                # A writer still holds the file open until IN_CLOSE_WRITE; renames arrive complete
+                if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    self._writing = False
+                elif mask & (IN_MODIFY | IN_CREATE):
+                    self._writing = True
+        return relevant
+
+    def _ready(self) -> bool:
+        return not self._writing and super()._ready()
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def open_watcher(path: str, backend: str = 'auto', debounce: float = 0.05, poll_interval: float = 5.0) -> _Watcher:
+    """Create a watcher for `path`: inotify when available (backend 'auto' or 'inotify'), else polling."""
+    if backend in ('auto', 'inotify') and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(path, debounce=debounce)
+        except (OSError, AttributeError) as e:
+            if backend == 'inotify':
+                raise
+            logger.warning('inotify unavailable (%s); falling back to polling', e)
+    return PollWatcher(path, debounce=debounce, poll_interval=poll_interval)
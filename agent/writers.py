@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Streaming table writers for the sheets and exports the agent produces.
+
+`write_frame` and `write_records` write rows in chunks of `chunk_rows`, in a format chosen from the
+file extension (or `fmt`):
+- xlsx: an openpyxl write-only workbook. Rows are streamed to the sheet XML, so memory stays flat
+  instead of holding every cell of the workbook.
+- csv: pandas `to_csv` per chunk, appended to one file.
+- parquet: one row group per chunk through a pyarrow `ParquetWriter` (optional dependency).
+
+Every writer goes through `atomic_path`: the output is written to a hidden temporary sibling and
+renamed into place when complete. The watcher and other readers see either the previous file or the
+finished new one, never a partial write.
+
+Usage example:
+    write_frame('exports/tasks.parquet', df)
+    write_records('exports/summary.xlsx', ({'column': c, 'mean': m} for c, m in stats))
+"""
+import contextlib
+import itertools
+import logging
+import os
+from typing import Iterable, Iterator, List, Optional, Union
+
+import pandas as pd
+
+from .result_cache import temp_path_for
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_ROWS = 10_000
+DEFAULT_SHEET_NAME = 'Sheet1'
+FORMATS = {'.xlsx': 'xlsx', '.xlsm': 'xlsx', '.csv': 'csv', '.parquet': 'parquet'}
+
+
+def output_format(path: str, fmt: Optional[str] = None) -> str:
+    """The output format for `path`: `fmt` when given, else from the extension."""
+    fmt = (fmt or FORMATS.get(os.path.splitext(path)[1].lower(), '')).lower()
+    if fmt not in ('xlsx', 'csv', 'parquet'):
+        raise ValueError(f'Unsupported output format for {path}: {fmt or "unknown extension"}')
+    return fmt
+
+
+def output_path(path: str, fmt: str) -> str:
+    """`path` with its extension replaced by the one for `fmt` (e.g. tasks.xlsx -> tasks.csv)."""
+    return os.path.splitext(path)[0] + {'xlsx': '.xlsx', 'csv': '.csv', 'parquet': '.parquet'}[fmt]
+
+
+@contextlib.contextmanager
+def atomic_path(path: str) -> Iterator[str]:
+    """Yield a temporary path next to `path`; on success it replaces `path`, on error it is removed."""
+    tmp = temp_path_for(path)
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _chunks(frame: Union[pd.DataFrame, Iterable[pd.DataFrame]], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    if isinstance(frame, pd.DataFrame):
+        # Slices are views: the frame is not copied, only one chunk is converted at a time
+        for start in range(0, max(len(frame), 1), chunk_rows):
+            yield frame.iloc[start:start + chunk_rows]
+    else:
+        yield from frame
+
+
+def _write_xlsx(path: str, chunks: Iterator[pd.DataFrame], sheet_name: str) -> int:
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    rows = 0
+    columns = None
+    for chunk in chunks:
+        if columns is None:
+            columns = list(chunk.columns)
+            if columns:
+                ws.append([str(c) for c in columns])
+        # Plain Python values for openpyxl; missing values (NaN/NaT/None) become empty cells
+        values = chunk.reindex(columns=columns).astype(object)
+        for row in values.where(values.notna(), None).itertuples(index=False, name=None):
+            ws.append(row)
+        rows += len(chunk)
+    wb.save(path)
+    return rows
+
+
+def _write_csv(path: str, chunks: Iterator[pd.DataFrame]) -> int:
+    rows = 0
+    columns = None
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for chunk in chunks:
+            if columns is None:
+                columns = list(chunk.columns)
+                chunk.to_csv(f, index=False)
+            else:
+                chunk.reindex(columns=columns).to_csv(f, index=False, header=False)
+            rows += len(chunk)
+    return rows
+
+
+def _write_parquet(path: str, chunks: Iterator[pd.DataFrame]) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError('Parquet output requires pyarrow') from e
+    writer = None
+    rows = 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            else:
+                table = table.select(writer.schema.names).cast(writer.schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def write_frame(path: str, frame: Union[pd.DataFrame, Iterable[pd.DataFrame]], fmt: Optional[str] = None,
+                sheet_name: str = DEFAULT_SHEET_NAME, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> int:
+    """Write a DataFrame, or an iterable of DataFrame chunks sharing the first chunk's columns, to `path`.
+
+    Returns the number of rows written.
+    """
+    fmt = output_format(path, fmt)
+    chunks = _chunks(frame, chunk_rows)
+    with atomic_path(path) as tmp:
+        if fmt == 'xlsx':
+            rows = _write_xlsx(tmp, chunks, sheet_name)
+        elif fmt == 'csv':
+            rows = _write_csv(tmp, chunks)
+        else:
+            rows = _write_parquet(tmp, chunks)
+    logger.debug('Wrote %d rows to %s', rows, path)
+    return rows
+
+
+def write_records(path: str, records: Iterable[dict], columns: Optional[List[str]] = None,
+                  fmt: Optional[str] = None, sheet_name: str = DEFAULT_SHEET_NAME,
+                  chunk_rows: int = DEFAULT_CHUNK_ROWS) -> int:
+    """Write dict rows to `path`, buffering at most `chunk_rows` of them at a time.
+
+    Without `columns`, the columns are those of the first chunk, in first-seen key order.
+    """
+    records = iter(records)
+
+    def chunks() -> Iterator[pd.DataFrame]:
+        cols = columns
+        first = True
+        while True:
+            batch = list(itertools.islice(records, chunk_rows))
+            # The first chunk is written even when empty, so an empty output still gets its header
+            if not batch and not first:
+                return
+            first = False
+            df = pd.DataFrame(batch, columns=cols)
+            cols = list(df.columns)
+            yield df
+            if len(batch) < chunk_rows:
+                return
+
+    return write_frame(path, chunks(), fmt=fmt, sheet_name=sheet_name, chunk_rows=chunk_rows)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+import os
+import sys
+
+import pytest
+from prometheus_client import REGISTRY
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import action_registry
+from agent.action_registry import UNMATCHED, ActionRegistry, configured_plugins, parse_params
+from agent.agent_runner import Task, action_type, process_task
+from agent.matching import AhoCorasick
+
+
+def test_builtin_routing_keeps_chain_order():
+    assert action_type(Task('T1', 'Summarize then db_query: SELECT 1', 'pending')) == 'summarize'
+    assert action_type(Task('T2', 'sample export_csv', 'pending')) == 'export'
+    assert action_type(Task('T3', 'sample send_email: to=a@b.c', 'pending')) == 'send_email'
+    assert action_type(Task('T4', 'nothing to do', 'pending')) == 'sample'
+    assert action_type(Task('T5', None, 'pending')) == 'sample'
+    assert process_task(Task('T6', 'nothing to do', 'pending')) == 'in-progress'
+    assert process_task(Task('T7', 'a Sample task', 'pending')) == 'completed'
+    # send_email without parameters fails as before
+    assert process_task(Task('T8', 'send_email', 'pending')) == 'failed'
+
+
+def test_spec_arguments_and_params():
+    spec = action_registry.parse_action('DB_QUERY: SELECT Name FROM People')
+    assert (spec.action, spec.keyword, spec.argument) == ('db_query', 'db_query:', 'SELECT Name FROM People')
+    spec = action_registry.parse_action('send_email: to=a@b.c; subject = Hi there ;junk')
+    assert spec.params == {'to': 'a@b.c', 'subject': 'Hi there'}
+    assert parse_params(None) == {} and parse_params('a=b=c') == {'a': 'b=c'}
+    assert action_registry.parse_action('') is UNMATCHED
+
+
+def test_registry_priority_cache_and_errors():
+    calls = []
+    reg = ActionRegistry()
+    reg.register('low', 'go', lambda task, spec: calls.append(spec) or 'low', priority=50)
+    reg.register('high', ['stop:', 'halt'], lambda task, spec: 'high', priority=5)
+    assert reg.parse('go now, halt: here').action == 'high'
+    assert reg.parse('go: Fast').argument == 'Fast'
+    assert reg.parse('go').argument is None
+    assert reg.parse('go: Fast') is reg.parse('go: Fast')
+    assert reg.dispatch(Task('T1', 'GO', 'pending')) == 'low' and calls[-1].action == 'low'
+    assert reg.dispatch(Task('T2', 'idle', 'pending')) == 'in-progress'
+
+    with pytest.raises(ValueError):
+        reg.register('low', 'other', lambda task, spec: 'x')
+    with pytest.raises(ValueError):
+        reg.register('third', 'HALT', lambda task, spec: 'x')
+    with pytest.raises(ValueError):
+        reg.register('empty', [''], lambda task, spec: 'x')
+    # Replacing and unregistering invalidate cached specs
+    reg.register('low', 'go', lambda task, spec: 'new', priority=1, replace=True)
+    assert reg.parse('go now, halt: here').action == 'low'
+    reg.unregister('low')
+    assert reg.parse('go: Fast') is UNMATCHED
+    assert [a.name for a in reg.actions()] == ['high']
+
+
+def test_parse_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(action_registry, 'PARSE_CACHE_SIZE', 2)
+    reg = ActionRegistry()
+    reg.register('go', 'go', lambda task, spec: 'done')
+    first = reg.parse('go: 1')
+    reg.parse('go: 2')
+    assert reg.parse('go: 1') is first
+    reg.parse('go: 3')  # evicts 'go: 2', the least recently used
+    assert reg.parse('go: 1') is first
+    assert list(reg._specs) == ['go: 3', 'go: 1']
+
+
+def test_plugins_load_on_first_use(monkeypatch):
+    monkeypatch.setenv('AGENT_ACTION_PLUGINS', ' json, missing_action_plugin ,')
+    assert configured_plugins() == ['json', 'missing_action_plugin']
+    monkeypatch.setenv('AGENT_ACTION_PLUGINS', '')
+    assert configured_plugins() == []
+
+    loaded = []
+    reg = ActionRegistry(plugins=lambda: loaded.append(1) or ['missing_action_plugin'])
+    reg.register('go', 'go', lambda task, spec: 'done')
+    assert loaded == []
+    # A plugin that fails to import is logged, not raised
+    assert reg.dispatch(Task('T1', 'go', 'pending')) == 'done'
+    reg.parse('go again')
+    assert loaded == [1]
+
+
+def test_plugin_module_registers_and_is_timed(tmp_path, monkeypatch):
+    (tmp_path / 'echo_actions.py').write_text(
+        'from agent.action_registry import register_action\n'
+        '@register_action("echo", "echo:", kind="echo_plugin", priority=5)\n'
+        'def echo(task, spec):\n'
+        '    return "completed" if spec.argument else "failed"\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(action_registry, 'registry', ActionRegistry(plugins=lambda: ['echo_actions']))
+    sys.modules.pop('echo_actions', None)
+    labels = {'action': 'echo_plugin', 'outcome': 'completed'}
+    before = REGISTRY.get_sample_value('agent_action_duration_seconds_count', labels) or 0.0
+    try:
+        task = Task('T1', 'please echo: hi sample', 'pending')
+        assert action_type(task) == 'echo_plugin'
+        assert process_task(task) == 'completed'
+    finally:
+        sys.modules.pop('echo_actions', None)
+    assert REGISTRY.get_sample_value('agent_action_duration_seconds_count', labels) == before + 1
+
+
+def test_find_all_reports_each_pattern_once():
+    matcher = AhoCorasick(['he', 'she', 'hers', 'email', 'send_email'])
+    assert matcher.find_all('send_email to her: ushers, she') == ['send_email', 'email', 'he', 'she', 'hers']
+    assert matcher.find_all('nothing') == []
@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 import os
 import sys
+import gzip
+import io
 import json
 import subprocess
 
+import pytest
+
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from agent.actions import export_dataframe_to_s3_stub, export_dataframe_to_s3
@@ -16,6 +20,27 @@ def test_export_stub(tmp_path):
     assert os.path.exists(p)
 
 
+def test_export_stub_does_not_rewrite_linked_cache_entry():
+    from agent import actions
+    os.makedirs(actions.EXPORTS_DIR, exist_ok=True)
+    cached = os.path.join(actions.EXPORTS_DIR, '.cached_entry_test.csv')
+    dest = os.path.join(actions.EXPORTS_DIR, 'linked_export_test.csv')
+    with open(cached, 'w') as f:
+        f.write('cached\n')
+    if os.path.exists(dest):
+        os.remove(dest)
+    # Cache hits are hard-linked into place, like export_file_stub's outputs
+    os.link(cached, dest)
+    try:
+        export_dataframe_to_s3_stub(pd.DataFrame({'id': [1]}), 'linked_export_test')
+        with open(cached) as f:
+            assert f.read() == 'cached\n'
+        assert pd.read_csv(dest)['id'].tolist() == [1]
+    finally:
+        os.remove(cached)
+        os.remove(dest)
+
+
 def test_export_boto3_local(tmp_path):
     # If boto3 is not configured (no bucket) the function should fall back to stub.
     df = pd.DataFrame({'id': [1, 2], 'value': [10, 20]})
@@ -25,6 +50,116 @@ def test_export_boto3_local(tmp_path):
     assert path.startswith('s3://') or os.path.exists(path)
 
 
+@pytest.fixture
+def s3(monkeypatch):
+    moto = pytest.importorskip('moto')
+    mock = getattr(moto, 'mock_aws', None) or getattr(moto, 'mock_s3')
+    from agent import s3_export
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('VAULT_ADDR', 'http://127.0.0.1:1')
+    monkeypatch.delenv('S3_ENDPOINT_URL', raising=False)
+    with mock():
+        s3_export.reset_s3_client()
+        client = s3_export.get_s3_client()
+        client.create_bucket(Bucket='exports')
+        yield client
+    s3_export.reset_s3_client()
+
+
+def _big_frame(rows=600_000):
+    return pd.DataFrame({'id': range(rows), 'value': [i * 0.5 for i in range(rows)], 'name': ['row'] * rows})
+
+
+def test_export_multipart_csv(s3):
+    from agent import s3_export
+    df = _big_frame()
+    url = export_dataframe_to_s3(df, 'big', bucket='exports', prefix='runs')
+    assert url == 's3://exports/runs/big.csv'
+    obj = s3.get_object(Bucket='exports', Key='runs/big.csv')
+    body = obj['Body'].read()
+    # Larger than one part, so the multipart path was taken
+    assert len(body) > s3_export.DEFAULT_PART_SIZE
+    assert body == df.to_csv(index=False).encode('utf-8')
+    assert s3.list_multipart_uploads(Bucket='exports').get('Uploads', []) == []
+
+
+def test_export_small_gzip_uses_single_put(s3):
+    df = pd.DataFrame({'id': [1, 2], 'value': [10, 20]})
+    url = export_dataframe_to_s3(df, 'small', bucket='exports', compression='gzip')
+    assert url == 's3://exports/small.csv.gz'
+    body = s3.get_object(Bucket='exports', Key='small.csv.gz')['Body'].read()
+    assert gzip.decompress(body) == df.to_csv(index=False).encode('utf-8')
+
+
+def test_export_parquet_zstd(s3):
+    pytest.importorskip('pyarrow')
+    from agent import s3_export
+    df = _big_frame(20_000)
+    url = export_dataframe_to_s3(df, 'frame', bucket='exports', fmt='parquet', compression='zstd')
+    assert url == 's3://exports/frame.parquet'
+    body = s3.get_object(Bucket='exports', Key='frame.parquet')['Body'].read()
+    pd.testing.assert_frame_equal(pd.read_parquet(io.BytesIO(body)), df)
+    # The client is created once and reused across exports
+    assert s3_export.get_s3_client() is s3
+
+
+def test_failed_part_aborts_upload(s3, monkeypatch):
+    from agent import s3_export
+    calls = []
+
+    def failing_upload_part(**kwargs):
+        calls.append(kwargs['PartNumber'])
+        raise RuntimeError('network down')
+
+    monkeypatch.setattr(s3, 'upload_part', failing_upload_part)
+    with pytest.raises(RuntimeError):
+        s3_export.upload_dataframe(_big_frame(), 'exports', 'broken.csv', client=s3,
+                                   part_size=s3_export.MIN_PART_SIZE)
+    assert calls
+    assert s3.list_multipart_uploads(Bucket='exports').get('Uploads', []) == []
+    # Through the action a failed upload falls back to the local stub
+    path = export_dataframe_to_s3(_big_frame(10), 'broken', bucket='no-such-bucket')
+    assert os.path.exists(path)
+
+
+class _RecordingClient:
+    def __init__(self, fail_part=None, fail_complete=False):
+        self.calls = []
+        self.fail_part = fail_part
+        self.fail_complete = fail_complete
+
+    def create_multipart_upload(self, **kwargs):
+        self.calls.append('create')
+        return {'UploadId': 'u1'}
+
+    def upload_part(self, PartNumber, **kwargs):
+        self.calls.append(f'part {PartNumber}')
+        if PartNumber == self.fail_part:
+            raise RuntimeError('part failed')
+        return {'ETag': f'etag-{PartNumber}'}
+
+    def complete_multipart_upload(self, **kwargs):
+        self.calls.append('complete')
+        if self.fail_complete:
+            raise RuntimeError('complete failed')
+
+    def abort_multipart_upload(self, **kwargs):
+        self.calls.append('abort')
+
+
+@pytest.mark.parametrize('client', [_RecordingClient(fail_part=2), _RecordingClient(fail_complete=True)])
+def test_failure_while_completing_aborts_upload(client):
+    from agent import s3_export
+    with pytest.raises(RuntimeError):
+        with s3_export.MultipartUpload(client, 'exports', 'late.csv', part_size=s3_export.MIN_PART_SIZE) as upload:
+            # The second part is only submitted, and its failure only seen, inside complete()
+            upload.write(b'x' * (s3_export.MIN_PART_SIZE + 10))
+    assert client.calls[0] == 'create' and client.calls[-1] == 'abort'
+    assert sorted(c for c in client.calls if c.startswith('part')) == ['part 1', 'part 2']
+
+
 if __name__ == '__main__':
     test_export_stub(None)
     test_export_boto3_local(None)
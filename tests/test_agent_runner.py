@@ -61,6 +61,44 @@ def test_generate_and_process(tmp_path):
     assert len(email_files) >= 1, "Email stub not written"
 
 
+def test_read_tasks_matches_row_loader(tmp_path):
+    from agent.agent_runner import read_tasks
+    from agent.task_table import TaskTable
+
+    df = pd.DataFrame({
+        'task_id': ['T1', 'T2', 'T3', 'T4', 'T5'],
+        'description': ['a', 'b', None, 'd', 'e'],
+        'status': ['pending', None, 'completed', float('nan'), 'failed'],
+        'due_date': ['2025-12-01', None, 'not a date', '01/02/2026', pd.Timestamp('2026-03-04 05:06')],
+    })
+    tasks = TaskTable.from_frame(df)
+    assert [t.status for t in tasks] == ['pending', 'pending', 'completed', 'pending', 'failed']
+    assert tasks[2].description == 'None'
+    # Mixed formats fall back to per-value parsing; unparseable dates become None
+    assert [t.due_date for t in tasks] == [pd.Timestamp('2025-12-01'), None, None, pd.Timestamp('2026-01-02'),
+                                           pd.Timestamp('2026-03-04 05:06')]
+
+    bare = TaskTable.from_frame(pd.DataFrame({'task_id': [1]}))
+    assert (bare[0].task_id, bare[0].description, bare[0].status, bare[0].due_date) == ('1', 'None', 'pending', None)
+
+    sheet = tmp_path / 'tasks.xlsx'
+    df.to_excel(sheet, index=False)
+    for engine in ('openpyxl', 'auto'):
+        loaded = read_tasks(str(sheet), engine=engine)
+        assert [(t.task_id, t.status) for t in loaded] == [(t.task_id, t.status) for t in tasks]
+        assert loaded[0].due_date == pd.Timestamp('2025-12-01')
+
+
+def test_excel_engine_resolution(monkeypatch):
+    from agent import task_store
+
+    assert task_store.excel_engine('openpyxl') == 'openpyxl'
+    monkeypatch.setenv('AGENT_EXCEL_ENGINE', 'openpyxl')
+    assert task_store.excel_engine() == 'openpyxl'
+    monkeypatch.setitem(sys.modules, 'python_calamine', None)  # not installed
+    assert task_store.excel_engine('auto') is None
+
+
 if __name__ == "__main__":
     test_generate_and_process(os.getcwd())
     print("Test completed")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import config_provider
+from agent.config_provider import ConfigProvider, parse_tokens
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def env(monkeypatch):
+    monkeypatch.delenv('AGENT_API_TOKEN', raising=False)
+    return monkeypatch
+
+
+def _write(path, cfg):
+    path.write_text(json.dumps(cfg))
+    return path
+
+
+def test_config_loaded_once_until_changed(tmp_path, env, monkeypatch):
+    cfg_file = _write(tmp_path / 'cfg.json', {'api_token': 'a', 'max_batch_size': 5})
+    env.setenv('AGENT_CONFIG_PATH', str(cfg_file))
+    clock = FakeClock()
+    provider = ConfigProvider(clock=clock)
+    loads = []
+    original = provider._load
+    monkeypatch.setattr(provider, '_load', lambda path: loads.append(path) or original(path))
+
+    for _ in range(100):
+        assert provider.config()['max_batch_size'] == 5
+    assert len(loads) == 1
+
+    _write(cfg_file, {'api_token': 'b', 'max_batch_size': 50})
+    # Within the check interval the file is not even stat'ed
+    assert provider.config()['max_batch_size'] == 5
+    clock.now += 2
+    assert provider.config()['max_batch_size'] == 50
+    assert len(loads) == 2
+
+    other = _write(tmp_path / 'other.json', {'max_batch_size': 7})
+    env.setenv('AGENT_CONFIG_PATH', str(other))
+    assert provider.config()['max_batch_size'] == 7
+
+
+def test_invalidate_forces_reload(tmp_path, env):
+    cfg_file = _write(tmp_path / 'cfg.json', {'api_token': 'old'})
+    env.setenv('AGENT_CONFIG_PATH', str(cfg_file))
+    provider = ConfigProvider(clock=FakeClock())
+    assert provider.authorized('old')
+    st = os.stat(cfg_file)
+    _write(cfg_file, {'api_token': 'new'})
+    # Same mtime and size: only an explicit reload (SIGHUP) notices the change
+    os.utime(cfg_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert provider.authorized('old')
+    provider.invalidate()
+    assert provider.authorized('new') and not provider.authorized('old')
+
+
+def test_multiple_tokens_for_rotation(tmp_path, env):
+    cfg_file = _write(tmp_path / 'cfg.json', {'api_token': 'current', 'api_tokens': ['next', ' ']})
+    env.setenv('AGENT_CONFIG_PATH', str(cfg_file))
+    provider = ConfigProvider()
+    assert provider.tokens() == {b'current', b'next'}
+    assert provider.authorized('current') and provider.authorized('next')
+    assert not provider.authorized('other') and not provider.authorized(None) and not provider.authorized('')
+
+    env.setenv('AGENT_API_TOKEN', 'e1, e2')
+    assert provider.authorized('e2') and not provider.authorized('current')
+
+
+def test_no_token_configured_allows_all(tmp_path, env):
+    env.setenv('AGENT_CONFIG_PATH', str(_write(tmp_path / 'cfg.json', {})))
+    assert ConfigProvider().authorized(None)
+
+
+def test_vault_token_looked_up_once(tmp_path, env, monkeypatch):
+    cfg = {'vault': {'addr': 'http://vault', 'secrets_path': 'secret/data/app'}}
+    env.setenv('AGENT_CONFIG_PATH', str(_write(tmp_path / 'cfg.json', cfg)))
+    calls = []
+
+    class DummyVault:
+        def __init__(self, vault_addr=None):
+            pass
+
+        def get_secret_value(self, path, key, default=None):
+            calls.append((path, key))
+            return 'v1,v2'
+
+    monkeypatch.setattr(config_provider, 'VaultClient', DummyVault)
+    clock = FakeClock()
+    provider = ConfigProvider(clock=clock)
+    for _ in range(10):
+        assert provider.authorized('v2')
+    assert not provider.authorized('bad')
+    assert calls == [('secret/data/app', 'agent_api_token')]
+    clock.now += config_provider.VAULT_TOKEN_REFRESH + 1
+    assert provider.authorized('v1')
+    assert len(calls) == 2
+
+
+def test_refresh_publishes_snapshot_for_non_blocking_reads(tmp_path, env, monkeypatch):
+    cfg = {'api_token': 'a', 'vault': {'addr': 'http://vault', 'secrets_path': 'secret/data/app'}}
+    path = _write(tmp_path / 'cfg.json', cfg)
+    env.setenv('AGENT_CONFIG_PATH', str(path))
+    calls = []
+
+    class DummyVault:
+        def __init__(self, vault_addr=None):
+            pass
+
+        def get_secret_value(self, path, key, default=None):
+            calls.append(key)
+            return 'v1'
+
+    monkeypatch.setattr(config_provider, 'VaultClient', DummyVault)
+    clock = FakeClock()
+    provider = ConfigProvider(clock=clock)
+    provider.refresh()
+    assert provider.authorized('a', refresh=False)
+
+    # Later changes are only seen after the next refresh(); refresh=False reads do no I/O
+    _write(path, {'vault': cfg['vault']})
+    clock.now += 10
+    with monkeypatch.context() as m:
+        m.setattr(provider, '_current', lambda: pytest.fail('blocking read'))
+        assert provider.authorized('a', refresh=False) and provider.config(refresh=False)['api_token'] == 'a'
+    provider.refresh()
+    assert calls == ['agent_api_token']
+    assert provider.authorized('v1', refresh=False) and not provider.authorized('a', refresh=False)
+
+
+def test_parse_tokens():
+    assert parse_tokens('a, b,,') == {b'a', b'b'}
+    assert parse_tokens(['x']) == {b'x'}
+    assert parse_tokens(None) == frozenset()
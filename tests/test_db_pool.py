@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.actions import db_query
+from agent.db_pool import get_pool, is_read_only_query
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'test.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE sample (id INTEGER PRIMARY KEY, value INTEGER)')
+    conn.executemany('INSERT INTO sample VALUES (?, ?)', [(i, i * 10) for i in range(1, 6)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_read_only_detection():
+    assert is_read_only_query('SELECT * FROM sample')
+    assert is_read_only_query('  -- comment\n/* block */ select 1')
+    assert is_read_only_query('WITH t AS (SELECT 1) SELECT * FROM t')
+    assert not is_read_only_query('WITH t AS (SELECT 1) INSERT INTO sample SELECT 9, 9')
+    assert not is_read_only_query('DELETE FROM sample')
+
+
+def test_connections_are_reused_per_thread(db_path):
+    pool = get_pool(db_path)
+    assert pool.connection(read_only=True) is pool.connection(read_only=True)
+    assert pool.connection(read_only=True) is not pool.connection(read_only=False)
+    assert pool.connection().execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+    other = []
+    t = threading.Thread(target=lambda: other.append(pool.connection(read_only=True)))
+    t.start()
+    t.join()
+    assert other[0] is not pool.connection(read_only=True)
+
+
+def test_select_uses_read_only_connection(db_path):
+    res = db_query('SELECT id, value FROM sample ORDER BY id', db_path)
+    assert res.columns == ['id', 'value']
+    assert res.rows[-1] == (5, 50)
+    with pytest.raises(sqlite3.OperationalError):
+        get_pool(db_path).connection(read_only=True).execute('DELETE FROM sample')
+    # Writes through db_query are rolled back, as before pooling
+    db_query('DELETE FROM sample', db_path)
+    assert len(db_query('SELECT * FROM sample', db_path).rows) == 5
+
+
+def test_export_query_streams_batches(db_path, tmp_path):
+    from agent.actions import db_query_iter, export_query
+
+    res = db_query_iter('SELECT id, value FROM sample ORDER BY id', db_path, batch_size=2)
+    assert [len(b) for b in res.iter_batches()] == [2, 2, 1]
+
+    out = tmp_path / 'out.csv'
+    stats = export_query('SELECT id, value FROM sample ORDER BY id', str(out), db_path, batch_size=2)
+    assert stats.rows == 5 and stats.bytes == out.stat().st_size
+    assert out.read_text().splitlines() == ['id,value', '1,10', '2,20', '3,30', '4,40', '5,50']
+
+
+def test_export_query_parquet(db_path, tmp_path):
+    pytest.importorskip('pyarrow')
+    import pandas as pd
+    from agent.actions import export_query
+
+    out = tmp_path / 'out.parquet'
+    stats = export_query('SELECT id, value FROM sample ORDER BY id', str(out), db_path, batch_size=2)
+    assert stats.rows == 5
+    assert list(pd.read_parquet(out)['value']) == [10, 20, 30, 40, 50]
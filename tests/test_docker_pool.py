@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import docker_pool, executor
+from agent.docker_pool import ContainerPool
+
+# Stands in for the docker CLI: containers are files under $FAKE_DOCKER_STATE, `exec`/`run --rm`
+# run the command on the host, and every invocation is logged as a JSON line.
+FAKE_DOCKER = textwrap.dedent('''\
+    #!{python}
+    import json, os, sys, uuid
+    state = os.environ['FAKE_DOCKER_STATE']
+    args = sys.argv[1:]
+    # A login shell would read the host's profile, which has nothing to do with a container
+    argv = ['-c' if a == '-lc' else a for a in args]
+    with open(os.path.join(state, 'calls.log'), 'a') as f:
+        f.write(json.dumps(args) + '\\n')
+    verb = args[0]
+    if verb == 'run' and '-d' in args:
+        cid = uuid.uuid4().hex
+        open(os.path.join(state, cid), 'w').close()
+        print(cid)
+    elif verb == 'run':
+        os.execvp('bash', argv[argv.index('bash'):])
+    elif verb == 'exec':
+        if not os.path.exists(os.path.join(state, args[1])):
+            print('Error: No such container: ' + args[1], file=sys.stderr)
+            sys.exit(1)
+        os.execvp(argv[2], argv[2:])
+    elif verb == 'rm':
+        for cid in args[2:]:
+            if os.path.exists(os.path.join(state, cid)):
+                os.remove(os.path.join(state, cid))
+''')
+
+
+@pytest.fixture
+def fake_docker(tmp_path, monkeypatch):
+    bindir = tmp_path / 'bin'
+    bindir.mkdir()
+    state = tmp_path / 'state'
+    state.mkdir()
+    shim = bindir / 'docker'
+    shim.write_text(FAKE_DOCKER.format(python=sys.executable))
+    shim.chmod(0o755)
+    monkeypatch.setenv('PATH', f"{bindir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv('FAKE_DOCKER_STATE', str(state))
+
+    def calls(verb=None):
+        path = state / 'calls.log'
+        lines = [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+        return [c for c in lines if verb is None or c[0] == verb]
+
+    def running():
+        return sorted(p.name for p in state.iterdir() if p.name != 'calls.log')
+
+    yield calls, running
+    docker_pool.close_container_pools()
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_commands_reuse_warm_containers(fake_docker):
+    calls, running = fake_docker
+    pool = ContainerPool('img', 0.5, '256m', size=2, max_uses=10)
+    pool.warm()
+    try:
+        assert len(running()) == 2
+        run = calls('run')[0]
+        assert run[:2] == ['run', '-d'] and run[-3:] == ['img', 'sleep', 'infinity']
+        assert ['--cpus', '0.5'] == run[run.index('--cpus'):run.index('--cpus') + 2]
+        assert any(a.startswith('seccomp=') for a in run)
+        for _ in range(3):
+            assert pool.run('echo hello', timeout=10).stdout == 'hello\n'
+        assert len(calls('run')) == 2
+        assert len(calls('exec')) == 3
+    finally:
+        pool.close()
+    assert running() == []
+
+
+def test_container_recycled_after_max_uses_and_on_failure(fake_docker):
+    calls, running = fake_docker
+    pool = ContainerPool('img', 0.5, '256m', size=1, max_uses=2)
+    pool.warm()
+    try:
+        first = running()
+        pool.run('true', timeout=10)
+        pool.run('true', timeout=10)
+        # The second use hit max_uses: that container is removed and a replacement started
+        assert _wait_for(lambda: len(running()) == 1 and running() != first)
+        second = running()
+        assert pool.run('exit 3', timeout=10).returncode == 3
+        assert _wait_for(lambda: len(running()) == 1 and running() != second)
+        assert len(calls('rm')) == 2
+    finally:
+        pool.close()
+
+
+def test_timeout_removes_container(fake_docker):
+    calls, running = fake_docker
+    pool = ContainerPool('img', 0.5, '256m', size=1)
+    pool.warm()
+    try:
+        before = running()
+        with pytest.raises(subprocess.TimeoutExpired):
+            pool.run('sleep 5', timeout=0.5)
+        assert _wait_for(lambda: len(running()) == 1 and running() != before)
+        assert pool.run('echo ok', timeout=10).stdout == 'ok\n'
+    finally:
+        pool.close()
+
+
+def test_concurrent_runs_share_the_pool(fake_docker):
+    calls, running = fake_docker
+    pool = ContainerPool('img', 0.5, '256m', size=2, max_uses=100)
+    pool.warm()
+    results = []
+    threads = [threading.Thread(target=lambda i=i: results.append(pool.run(f'echo {i}', timeout=10).stdout))
+               for i in range(6)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sorted(results) == sorted(f'{i}\n' for i in range(6))
+        assert len(calls('run')) == 2
+    finally:
+        pool.close()
+
+
+def test_run_in_docker_uses_pool_from_settings(fake_docker, tmp_path, monkeypatch):
+    calls, running = fake_docker
+    policy = tmp_path / 'policy.yaml'
+    policy.write_text("allowed_actions:\n  - type: run_command\n    commands: ['echo']\n")
+    monkeypatch.setattr(executor, 'POLICY_PATH', str(policy))
+    monkeypatch.setenv('AGENT_DOCKER_POOL_SIZE', '1')
+    out = executor.run_in_docker('echo hello', image='img')
+    assert out['status'] == 'ok' and out['stdout'] == 'hello\n'
+    executor.run_in_docker('echo hello', image='img')
+    assert len(calls('run')) == 1 and len(calls('exec')) == 2
+
+    monkeypatch.setenv('AGENT_DOCKER_POOL_SIZE', '0')
+    out = executor.run_in_docker('echo cold', image='img')
+    assert out['stdout'] == 'cold\n'
+    assert calls('run')[-1][:2] == ['run', '--rm']
+
+
+def test_pool_settings_from_config(tmp_path, monkeypatch):
+    cfg = tmp_path / 'agent_config.json'
+    cfg.write_text(json.dumps({'sandbox': {'docker_pool_size': 3, 'docker_max_uses': 7}}))
+    monkeypatch.setenv('AGENT_CONFIG_PATH', str(cfg))
+    monkeypatch.delenv('AGENT_DOCKER_POOL_SIZE', raising=False)
+    monkeypatch.delenv('AGENT_DOCKER_MAX_USES', raising=False)
+    assert docker_pool.pool_settings() == (3, 7)
+    monkeypatch.setenv('AGENT_DOCKER_POOL_SIZE', '0')
+    assert docker_pool.pool_settings() == (0, 7)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import agent_runner
+from agent.fingerprints import FingerprintStore, task_fingerprint
+from agent.task_store import open_task_store
+
+
+def _write_sheet(path, rows):
+    pd.DataFrame(rows, columns=['task_id', 'description', 'status', 'due_date']).to_excel(path, index=False)
+
+
+def test_fingerprint_store_roundtrip(tmp_path):
+    path = str(tmp_path / 'tasks.fingerprints.json')
+    store = FingerprintStore(path)
+    fp = task_fingerprint('Sample task', 'pending')
+    store.record('T1', fp, 'completed')
+    store.save()
+
+    reloaded = FingerprintStore(path)
+    assert reloaded.previous_result('T1', fp) == 'completed'
+    assert reloaded.previous_result('T1', task_fingerprint('Sample task v2', 'pending')) is None
+
+
+def test_incremental_only_dispatches_changed_rows(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_process(task):
+        calls.append(task.task_id)
+        return 'completed'
+
+    monkeypatch.setattr(agent_runner, 'process_task', fake_process)
+    sheet = tmp_path / 'tasks.xlsx'
+    rows = [
+        {'task_id': 'T1', 'description': 'Sample one', 'status': 'pending', 'due_date': None},
+        {'task_id': 'T2', 'description': 'Sample two', 'status': 'pending', 'due_date': None},
+        {'task_id': 'T3', 'description': 'Sample three', 'status': 'completed', 'due_date': None},
+    ]
+    _write_sheet(sheet, rows)
+    cfg = {'data_dir': str(tmp_path), 'tasks_file': 'tasks.xlsx', 'incremental': True,
+           'concurrency': {'process_workers': 0}}
+
+    agent_runner.process_tasks_file(cfg)
+    assert sorted(calls) == ['T1', 'T2']
+
+    calls.clear()
+    agent_runner.process_tasks_file(cfg)
+    assert calls == []
+
+    # New rows are dispatched; the import leaves already-processed rows alone
+    rows[1]['description'] = 'Sample two (edited)'
+    rows.append({'task_id': 'T4', 'description': 'Sample four', 'status': 'pending', 'due_date': None})
+    _write_sheet(sheet, rows)
+    agent_runner.process_tasks_file(cfg)
+    assert calls == ['T4']
+
+    out = pd.read_excel(tmp_path / 'tasks.updated.xlsx')
+    assert list(out['status']) == ['completed'] * 4
+    assert out['description'][1] == 'Sample two'
+
+
+def test_failed_task_reset_to_pending_is_retried(tmp_path, monkeypatch):
+    outcomes = iter(['failed', 'completed'])
+    calls = []
+
+    def fake_process(task):
+        calls.append(task.task_id)
+        return next(outcomes)
+
+    monkeypatch.setattr(agent_runner, 'process_task', fake_process)
+    _write_sheet(tmp_path / 'tasks.xlsx',
+                 [{'task_id': 'T1', 'description': 'Sample one', 'status': 'pending', 'due_date': None}])
+    cfg = {'data_dir': str(tmp_path), 'tasks_file': 'tasks.xlsx', 'incremental': True,
+           'concurrency': {'process_workers': 0}}
+
+    agent_runner.process_tasks_file(cfg)
+    store = open_task_store(cfg)
+    assert store.list_tasks()[0]['status'] == 'failed'
+
+    # Same description and status as the failed run, so the fingerprint matches
+    store.update_status('T1', 'pending')
+    agent_runner.process_tasks_file(cfg)
+    assert calls == ['T1', 'T1']
+    assert store.list_tasks()[0]['status'] == 'completed'
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+import gzip
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import logging_config
+from agent.logging_config import DropOldestQueue, LogShipper
+
+
+class _Sink(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        with self.server.lock:
+            self.server.batches.append(json.loads(body))
+            self.server.peers.add(self.client_address)
+            self.server.encodings.append(self.headers.get('Content-Encoding'))
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def sink():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Sink)
+    server.batches, server.peers, server.encodings = [], set(), []
+    server.lock = threading.Lock()
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f'http://127.0.0.1:{server.server_address[1]}/logs'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _logger(shipper, name):
+    log = logging.getLogger(name)
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    log.addHandler(shipper.queue_handler)
+    return log
+
+
+def _messages(batches):
+    return [json.loads(entry['log'])['message'] for batch in batches for entry in batch]
+
+
+def test_drop_oldest_queue():
+    q = DropOldestQueue(3)
+    for i in range(5):
+        q.put_nowait(i)
+    assert q.dropped == 2
+    assert [q.get_nowait() for _ in range(3)] == [2, 3, 4]
+
+
+def test_batches_by_count_over_one_connection(sink):
+    shipper = LogShipper(sink.url, logging_config.jsonlogger.JsonFormatter('%(levelname)s %(message)s'),
+                         batch_size=5, flush_interval=30)
+    shipper.start()
+    log = _logger(shipper, 'test.ship.count')
+    for i in range(12):
+        log.info('record %d', i)
+    shipper.stop()
+    assert [len(b) for b in sink.batches] == [5, 5, 2]
+    assert _messages(sink.batches) == [f'record {i}' for i in range(12)]
+    assert set(sink.encodings) == {'gzip'}
+    assert len(sink.peers) == 1
+    assert shipper.stats() == {'queued': 0, 'dropped': 0, 'sent': 12, 'failed': 0}
+
+
+def test_partial_batch_flushed_after_interval(sink):
+    shipper = LogShipper(sink.url, logging.Formatter('{"message": "%(message)s"}'), batch_size=1000,
+                         flush_interval=0.2, compress=False)
+    shipper.start()
+    try:
+        log = _logger(shipper, 'test.ship.interval')
+        for i in range(3):
+            log.info('tick %d', i)
+        deadline = time.monotonic() + 5
+        while not sink.batches and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert _messages(sink.batches) == ['tick 0', 'tick 1', 'tick 2']
+        assert sink.encodings == [None]
+    finally:
+        shipper.stop()
+
+
+def test_slow_sink_never_blocks_logging(sink):
+    sink.delay = 0.2
+    shipper = LogShipper(sink.url, logging.Formatter('{"message": "%(message)s"}'), batch_size=10,
+                         flush_interval=0.1, queue_size=50)
+    shipper.start()
+    log = _logger(shipper, 'test.ship.slow')
+    start = time.perf_counter()
+    for i in range(2000):
+        log.info('burst %d', i)
+    elapsed = time.perf_counter() - start
+    shipper.stop()
+    stats = shipper.stats()
+    assert elapsed < 0.5
+    assert stats['dropped'] > 0
+    assert stats['sent'] + stats['dropped'] == 2000
+    # The newest records survive
+    assert _messages(sink.batches)[-1] == 'burst 1999'
+
+
+def test_unreachable_sink_counts_failures():
+    shipper = LogShipper('http://127.0.0.1:9/logs', logging.Formatter('%(message)s'), batch_size=2)
+    shipper.start()
+    log = _logger(shipper, 'test.ship.down')
+    log.info('a')
+    log.info('b')
+    shipper.stop()
+    assert shipper.stats()['failed'] == 2
+
+
+def test_configure_logging_installs_shipper(sink, monkeypatch):
+    monkeypatch.setenv('LOG_HTTP_DEST', sink.url)
+    monkeypatch.setenv('LOG_HTTP_BATCH_SIZE', '2')
+    root = logging.getLogger()
+    before = list(root.handlers), root.level
+    try:
+        logging_config.configure_logging(None)
+        shipper = logging_config.get_log_shipper()
+        assert shipper.queue_handler in root.handlers
+        logging.getLogger('test.ship.config').info('hello sink')
+        logging_config.stop_log_shipper()
+        assert 'hello sink' in _messages(sink.batches)
+        assert shipper.queue_handler not in root.handlers
+    finally:
+        logging_config.stop_log_shipper()
+        for h in root.handlers[:]:
+            if h not in before[0]:
+                root.removeHandler(h)
+        root.setLevel(before[1])
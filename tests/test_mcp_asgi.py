@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip('starlette')
+pytest.importorskip('httpx')
+from starlette.testclient import TestClient
+
+from agent import mcp_asgi
+from agent.config_provider import ConfigProvider
+from agent.task_store import open_task_store
+
+
+@pytest.fixture
+def cfg(tmp_path, monkeypatch):
+    cfg = {'data_dir': str(tmp_path), 'tasks_file': 'sample_tasks.xlsx', 'api_token': 'testtoken',
+           'ingest_retry_after': 3}
+    cfg_file = tmp_path / 'agent_config.json'
+    cfg_file.write_text(json.dumps(cfg))
+    monkeypatch.setenv('AGENT_CONFIG_PATH', str(cfg_file))
+    monkeypatch.delenv('AGENT_API_TOKEN', raising=False)
+    return cfg
+
+
+def _task(task_id):
+    return {'task_id': task_id, 'description': 'Async add', 'status': 'pending', 'due_date': '2025-01-01'}
+
+
+def test_health_and_add_task(cfg):
+    with TestClient(mcp_asgi.create_app(ConfigProvider())) as client:
+        assert client.get('/health').json() == {'status': 'ok'}
+        r = client.post('/tasks', json=_task('A1'), headers={'X-AGENT-TOKEN': 'testtoken'})
+        assert r.status_code == 200 and r.json() == {'ok': True}
+        assert client.post('/tasks', json=_task('A2'), headers={'X-AGENT-TOKEN': 'wrong'}).status_code == 401
+        assert client.post('/tasks', content=b'[1]', headers={'X-AGENT-TOKEN': 'testtoken'}).status_code == 400
+        claimed = dict(_task('A3'), status='claimed')
+        assert client.post('/tasks', json=claimed, headers={'X-AGENT-TOKEN': 'testtoken'}).status_code == 400
+    assert [t['task_id'] for t in open_task_store(cfg).list_tasks()] == ['A1']
+
+
+def test_request_path_does_not_refresh_config(cfg, monkeypatch):
+    provider = ConfigProvider(check_interval=3600)
+    with TestClient(mcp_asgi.create_app(provider)) as client:
+        # Vault and file checks may block for seconds; requests must only read the published snapshot
+        with monkeypatch.context() as m:
+            m.setattr(provider, '_current', lambda: pytest.fail('config refreshed on the event loop'))
+            m.setattr(provider, '_vault_tokens', lambda snap: pytest.fail('tokens refreshed on the event loop'))
+            assert client.post('/tasks', json=_task('P1'), headers={'X-AGENT-TOKEN': 'testtoken'}).status_code == 200
+            assert client.post('/tasks', json=_task('P2'), headers={'X-AGENT-TOKEN': 'wrong'}).status_code == 401
+
+
+def test_full_queue_returns_429(cfg, monkeypatch):
+    store = open_task_store(cfg)
+    release = threading.Event()
+    original = store.add_many
+
+    def slow_add_many(tasks):
+        release.wait(10)
+        return original(tasks)
+
+    monkeypatch.setattr(store, 'add_many', slow_add_many)
+    statuses = []
+    headers = {}
+    with TestClient(mcp_asgi.create_app(ConfigProvider(), queue_size=1, batch_size=1)) as client:
+        def post(task_id):
+            r = client.post('/tasks', json=_task(task_id), headers={'X-AGENT-TOKEN': 'testtoken'})
+            statuses.append(r.status_code)
+            if r.status_code == 429:
+                headers.update(r.headers)
+
+        # One task is held by the blocked writer and one fills the queue; the rest are turned away
+        threads = []
+        for i in range(5):
+            t = threading.Thread(target=post, args=(f'Q{i}',))
+            t.start()
+            threads.append(t)
+            time.sleep(0.05)
+        deadline = time.monotonic() + 5
+        while statuses.count(429) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for t in threads:
+            t.join()
+    assert sorted(statuses) == [200, 200, 429, 429, 429]
+    assert headers['retry-after'] == '3'
+    assert len(store.list_tasks()) == 2
@@ -43,10 +43,10 @@ def test_add_task(client, tmp_path):
     r = client.post('/tasks', json=payload, headers=headers)
     assert r.status_code == 200
     assert r.get_json().get('ok') == True
-    # Ensure written
-    import pandas as pd
-    df = pd.read_excel(os.path.join(os.path.dirname(__file__), '..', 'resources', 'sample_tasks.xlsx'))
-    assert 'M001' in df['task_id'].astype(str).values
+    # Ensure written to the task store
+    from agent.task_store import open_task_store
+    store = open_task_store({'data_dir': os.path.join(os.path.dirname(__file__), '..', 'resources')})
+    assert 'M001' in [t['task_id'] for t in store.list_tasks()]
 
 
 if __name__ == '__main__':
@@ -30,9 +30,8 @@ def test_mcp_post_authorized(tmp_path):
     response = client.post('/tasks', json=payload, headers=headers)
     assert response.status_code == 200
 
-    # The server should have written the tasks file
-    tasks_path = tmp_path / 'sample_tasks.xlsx'
-    assert tasks_path.exists()
+    # The server should have appended the task to the task store
+    assert (tmp_path / 'tasks.db').exists()
 
 
 def test_mcp_post_unauthorized(tmp_path):
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import mcp_server as server
+from agent.task_store import open_task_store
+
+
+@pytest.fixture
+def cfg(tmp_path):
+    cfg = {'data_dir': str(tmp_path), 'tasks_file': 'sample_tasks.xlsx', 'api_token': 'testtoken'}
+    cfg_file = tmp_path / 'agent_config.json'
+    cfg_file.write_text(json.dumps(cfg))
+    os.environ['AGENT_CONFIG_PATH'] = str(cfg_file)
+    return cfg
+
+
+def _task(task_id, **overrides):
+    task = {'task_id': task_id, 'description': 'Sample batch', 'status': 'pending', 'due_date': '2025-01-01'}
+    task.update(overrides)
+    return task
+
+
+def test_batch_json_array(cfg):
+    client = server.app.test_client()
+    payload = [_task('B1'), _task('B2', status='running'), _task('B3')]
+    r = client.post('/tasks:batch', json=payload, headers={'X-AGENT-TOKEN': 'testtoken'})
+    assert r.status_code == 200
+    body = r.get_json()
+    assert body['accepted'] == 2 and body['rejected'] == 1
+    assert [res['ok'] for res in body['results']] == [True, False, True]
+    assert [t['task_id'] for t in open_task_store(cfg).list_tasks()] == ['B1', 'B3']
+
+
+def test_batch_ndjson_stream(cfg):
+    client = server.app.test_client()
+    lines = [json.dumps(_task('N1')), '{not json', json.dumps(_task('N2'))]
+    r = client.post('/tasks:batch', data='\n'.join(lines) + '\n', content_type='application/x-ndjson',
+                    headers={'X-AGENT-TOKEN': 'testtoken'})
+    assert r.status_code == 200
+    body = r.get_json()
+    assert body['accepted'] == 2
+    assert body['results'][1]['error'].startswith('invalid json')
+
+
+def test_batch_requires_token_and_array(cfg):
+    client = server.app.test_client()
+    assert client.post('/tasks:batch', json=[_task('X1')], headers={'X-AGENT-TOKEN': 'bad'}).status_code == 401
+    assert client.post('/tasks:batch', json=_task('X1'), headers={'X-AGENT-TOKEN': 'testtoken'}).status_code == 400
+
+
+def test_reposting_keeps_processed_status(cfg):
+    client = server.app.test_client()
+    headers = {'X-AGENT-TOKEN': 'testtoken'}
+    assert client.post('/tasks:batch', json=[_task('R1')], headers=headers).get_json()['accepted'] == 1
+    open_task_store(cfg).update_status('R1', 'completed')
+    assert client.post('/tasks', json=_task('R1', description='Again'), headers=headers).status_code == 200
+    assert open_task_store(cfg).list_tasks() == [
+        {'task_id': 'R1', 'description': 'Sample batch', 'status': 'completed', 'due_date': '2025-01-01'}]
+
+
+def test_single_add_is_validated_like_batch(cfg):
+    client = server.app.test_client()
+    headers = {'X-AGENT-TOKEN': 'testtoken'}
+    # A client-supplied lease state would never get a lease expiry and could not be claimed again
+    r = client.post('/tasks', json=_task('V1', status='claimed'), headers=headers)
+    assert r.status_code == 400 and 'claimed' in r.get_json()['error']
+    assert client.post('/tasks', json={'task_id': 'V2'}, headers=headers).status_code == 400
+    assert open_task_store(cfg).list_tasks() == []
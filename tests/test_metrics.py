@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+from prometheus_client import REGISTRY
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import actions, metrics_server
+from agent.agent_runner import Task, process_task
+from agent.metrics_server import instrument, record_bytes
+from agent.scheduler import SchedulerConfig, TaskScheduler
+from agent.task_store import SQLiteTaskStore
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def _count(action, outcome):
+    return _value('agent_action_duration_seconds_count', action=action, outcome=outcome)
+
+
+def test_decorator_labels_outcome_and_tracks_in_flight():
+    seen = {}
+
+    @instrument('test.op', outcome=lambda r: r)
+    def op(result):
+        seen['in_flight'] = _value('agent_actions_in_flight', action='test.op')
+        if result is None:
+            raise RuntimeError('boom')
+        return result
+
+    before_ok, before_err = _count('test.op', 'done'), _count('test.op', 'error')
+    assert op('done') == 'done'
+    with pytest.raises(RuntimeError):
+        op(None)
+    assert seen['in_flight'] == 1
+    assert _value('agent_actions_in_flight', action='test.op') == 0
+    assert _count('test.op', 'done') == before_ok + 1
+    assert _count('test.op', 'error') == before_err + 1
+
+
+def test_context_manager_and_bytes_go_to_innermost_span():
+    before = _value('agent_action_bytes_total', action='test.inner', direction='written')
+    outer_before = _value('agent_action_bytes_total', action='test.outer', direction='read')
+    with instrument('test.outer') as outer:
+        record_bytes('read', 10)
+        with instrument('test.inner'):
+            record_bytes('written', 5)
+        outer.outcome = 'partial'
+    record_bytes('read', 99)  # no running span: ignored
+    assert _value('agent_action_bytes_total', action='test.inner', direction='written') == before + 5
+    assert _value('agent_action_bytes_total', action='test.outer', direction='read') == outer_before + 10
+    assert _count('test.outer', 'partial') >= 1
+
+
+def test_process_task_is_labeled_by_action_type():
+    before = _count('sample', 'completed')
+    assert process_task(Task(task_id='M1', description='sample task', status='pending')) == 'completed'
+    assert _count('sample', 'completed') == before + 1
+
+
+def test_export_query_counts_bytes_written(tmp_path):
+    db = tmp_path / 'm.db'
+    conn = sqlite3.connect(db)
+    conn.execute('CREATE TABLE t (a INTEGER)')
+    conn.executemany('INSERT INTO t VALUES (?)', [(i,) for i in range(100)])
+    conn.commit()
+    conn.close()
+    before = _value('agent_action_bytes_total', action='actions.export_query', direction='written')
+    stats = actions.export_query('SELECT a FROM t', str(tmp_path / 'out.csv'), db_path=str(db))
+    after = _value('agent_action_bytes_total', action='actions.export_query', direction='written')
+    assert after - before == stats.bytes > 0
+    assert _count('actions.export_query', 'ok') >= 1
+
+
+def test_scheduler_queue_depth_returns_to_zero():
+    gate = threading.Event()
+    depths = []
+
+    def work(i):
+        depths.append(_value('agent_queue_depth', queue='scheduler'))
+        gate.wait(5)
+        return i
+
+    cfg = SchedulerConfig(thread_workers=4, process_workers=0, limits={'x': 1})
+    threading.Timer(0.2, gate.set).start()
+    assert TaskScheduler(cfg).run(work, range(4), classify=lambda i: 'x') == [0, 1, 2, 3]
+    # One slot for 'x': the first item saw the other three still waiting
+    assert depths[0] == 3
+    assert _value('agent_queue_depth', queue='scheduler') == 0
+
+
+def test_backlog_gauge_counts_pending_tasks(tmp_path):
+    store = SQLiteTaskStore(str(tmp_path / 'tasks.db'))
+    store.add_many([{'task_id': f'B{i}', 'description': 'x', 'status': 'pending'} for i in range(5)])
+    store.update_status('B0', 'completed')
+    metrics_server.track_backlog(lambda: store.count('pending'))
+    assert _value('agent_task_backlog') == 4
+    metrics_server.track_backlog(lambda: 0)
+    store.close()
+
+
+def test_mcp_metrics_endpoint_reports_add_task(monkeypatch):
+    from agent import mcp_server
+    monkeypatch.setenv('AGENT_API_TOKEN', 'metrics-secret')
+    client = mcp_server.app.test_client()
+    assert client.post('/tasks', json={'task_id': 'x'}).status_code == 401
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'agent_action_duration_seconds_count{action="mcp_server.add_task",outcome="401"}' in body
+    assert 'agent_request_processing_seconds_count' in body
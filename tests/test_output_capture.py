@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+import os
+import shlex
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import executor, output_capture
+from agent.output_capture import CappedBuffer, OutputCapture, abbreviate, pump
+
+
+def _py(code):
+    return [sys.executable, '-c', code]
+
+
+def test_capped_buffer_keeps_head_and_tail():
+    buf = CappedBuffer(max_bytes=10)
+    for i in range(100):
+        buf.write(b'%03d' % i)
+    assert buf.total == 300 and buf.truncated and buf.omitted == 290
+    text = buf.text('utf-8')
+    assert text.startswith('00000') and text.endswith('98099')
+    assert '[290 bytes omitted]' in text
+
+    small = CappedBuffer(max_bytes=10)
+    small.write(b'abc')
+    small.write(b'def')
+    assert small.text('utf-8') == 'abcdef' and not small.truncated
+    unlimited = CappedBuffer()
+    unlimited.write(b'x' * 1000)
+    assert unlimited.text('utf-8') == 'x' * 1000 and not unlimited.truncated
+
+
+def test_pump_streams_chunks_and_times_out():
+    chunks = []
+    proc = subprocess.Popen(_py('import sys; sys.stdout.write("a" * 200000); sys.stderr.write("err")'),
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert pump(proc, lambda stream, data: chunks.append((stream, data)), timeout=10) == 0
+    assert b''.join(d for s, d in chunks if s == 'stdout') == b'a' * 200000
+    assert b''.join(d for s, d in chunks if s == 'stderr') == b'err'
+
+    partial = []
+    proc = subprocess.Popen(_py('import sys, time; print("started", flush=True); time.sleep(10)'),
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    with pytest.raises(subprocess.TimeoutExpired):
+        pump(proc, lambda stream, data: partial.append(data), timeout=1)
+    assert b''.join(partial) == b'started\n'
+    assert proc.returncode is not None
+
+
+def test_capture_spills_full_output(tmp_path, monkeypatch):
+    monkeypatch.setattr(output_capture, 'SPILL_DIR', str(tmp_path))
+    seen = []
+    capture = OutputCapture(max_bytes=8, spill_name='job', on_output=lambda s, d: seen.append(s))
+    capture.write('stdout', b'0123456789' * 10)
+    capture.close()
+    assert capture.truncated and 'bytes omitted' in capture.stdout
+    assert capture.summary()['output_files'] == {'stdout': str(tmp_path / 'job.stdout.log')}
+    assert (tmp_path / 'job.stdout.log').read_bytes() == b'0123456789' * 10
+    assert seen == ['stdout']
+
+
+def test_spill_name_cannot_leave_spill_dir(tmp_path, monkeypatch):
+    spill_dir = tmp_path / 'spill'
+    monkeypatch.setattr(output_capture, 'SPILL_DIR', str(spill_dir))
+    capture = OutputCapture(spill_name='task_../../x/y')
+    capture.write('stderr', b'err')
+    capture.close()
+    assert os.listdir(spill_dir) == ['task_.._.._x_y.stderr.log']
+    assert output_capture.safe_spill_name('../etc') == '_etc' and output_capture.safe_spill_name('..') == '_'
+
+
+@pytest.fixture(params=['pool', 'direct'])
+def python_policy(request, tmp_path, monkeypatch):
+    policy = tmp_path / 'policy.yaml'
+    policy.write_text(f"allowed_actions:\n  - type: run_command\n    commands: ['{sys.executable}']\n")
+    monkeypatch.setattr(executor, 'POLICY_PATH', str(policy))
+    monkeypatch.setattr(output_capture, 'SPILL_DIR', str(tmp_path / 'spill'))
+    if request.param == 'direct':
+        monkeypatch.setenv('AGENT_SANDBOX_WORKERS', '0')
+    return tmp_path
+
+
+def test_run_safe_command_caps_and_streams(python_policy):
+    code = 'import sys\nfor i in range(20000): print("line %05d" % i)\nsys.stderr.write("done")'
+    chunks = []
+    out = executor.run_safe_command(shlex.join(_py(code)), timeout=20, max_output_bytes=2000, spill='big',
+                                    on_output=lambda stream, data: chunks.append((stream, data)))
+    assert out['status'] == 'ok'
+    assert out['truncated'] is True
+    assert out['output_bytes'] == {'stdout': 220000, 'stderr': 4}
+    assert out['stdout'].startswith('line 00000') and out['stdout'].endswith('line 19999\n')
+    assert len(out['stdout']) < 2100 and out['stderr'] == 'done'
+    spilled = python_policy / 'spill' / 'big.stdout.log'
+    assert out['output_files']['stdout'] == str(spilled)
+    assert spilled.read_bytes() == b''.join(d for s, d in chunks if s == 'stdout')
+    assert spilled.stat().st_size == 220000
+
+
+def test_run_safe_command_timeout_keeps_partial_output(python_policy):
+    code = 'import time; print("working", flush=True); time.sleep(30)'
+    out = executor.run_safe_command(shlex.join(_py(code)), timeout=1)
+    assert out['status'] == 'timeout'
+    assert out['stdout'] == 'working\n'
+
+
+def test_abbreviate():
+    assert abbreviate('short') == 'short'
+    assert abbreviate(None) is None
+    text = abbreviate('x' * 50 + 'y' * 50, limit=20)
+    assert text.startswith('x' * 10) and text.endswith('y' * 10) and '[80 chars omitted]' in text
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.executor import CompiledPolicy, Policy
+from agent.matching import AhoCorasick, SuffixIndex
+
+
+def _legacy_allows(commands, cmd):
+    # The nested-loop check CompiledPolicy replaces
+    for c in commands:
+        candidate = c.strip()
+        if cmd.strip() == candidate or candidate in cmd:
+            return True
+        base = os.path.basename(candidate)
+        if base in cmd or cmd.strip().endswith(base):
+            return True
+    return False
+
+
+def test_aho_corasick_matches_substring_search():
+    rng = random.Random(7)
+    alphabet = 'ab/ .'
+    for _ in range(200):
+        patterns = [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))) for _ in range(rng.randint(1, 8))]
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+        ac = AhoCorasick(patterns)
+        assert ac.search(text) == any(p in text for p in patterns)
+        found = ac.first_match(text)
+        assert found is None or found in text
+
+
+def test_suffix_index():
+    index = SuffixIndex(['scripts/run_tests.sh', 'tools/x.py', ''])
+    assert index.match('/repo/scripts/run_tests.sh') == 'scripts/run_tests.sh'
+    assert index.match('tools/x.py') == 'tools/x.py'
+    assert index.match('tools/x.pyc') is None
+    assert index.match('') is None
+
+
+def test_compiled_policy_keeps_allow_semantics():
+    commands = ['python agent/agent_runner.py', 'generate_sample_xlsx.py', 'sqlite3', '-m agent.agent_runner',
+                'python /opt/tools/report.py']
+    policy = CompiledPolicy({'allowed_actions': [{'type': 'run_command', 'commands': commands}]})
+    probes = ['python agent/agent_runner.py --watch', '/usr/bin/python /x/generate_sample_xlsx.py', 'sqlite3 db',
+              'python -m agent.agent_runner', 'report.py --all', 'echo hello', 'ls', '', 'python agent/other.py']
+    for cmd in probes:
+        assert policy.allows_command(cmd) == _legacy_allows(commands, cmd), cmd
+
+
+def test_prohibited_commands_are_enforced():
+    data = {
+        'allowed_actions': [{'type': 'run_command', 'commands': ['bash', 'rm']}],
+        'prohibited_actions': [{'type': 'run_command', 'commands': ['rm -rf /', 'shutdown']}],
+    }
+    policy = CompiledPolicy(data)
+    assert policy.allows_command('rm build/tmp.txt')
+    assert not policy.allows_command('rm -rf /')
+    assert not policy.allows_command('rm   -rf   /home')
+    assert not policy.allows_command('bash -c "shutdown now"')
+    assert policy.denied_by('bash -c "shutdown now"') == 'shutdown'
+
+
+def test_repo_policy(tmp_path):
+    policy = Policy()
+    assert policy.allows_command('python resources/generate_sample_xlsx.py')
+    assert not policy.allows_command('echo hello')
+    assert policy.is_script_whitelisted('/home/agent/repo/scripts/run_tests.sh')
+    assert not policy.is_script_whitelisted('scripts/unknown.sh')
+    assert Policy(str(tmp_path / 'missing.yaml')).allows_command('anything') is False
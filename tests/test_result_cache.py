@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.result_cache import ResultCache
+
+
+def _producer(calls, content):
+    def produce(tmp_path):
+        calls.append(tmp_path)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+    return produce
+
+
+def test_hit_reuses_artifact_until_source_changes(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    source = tmp_path / 'data.csv'
+    source.write_text('a\n1\n')
+    dest = tmp_path / 'out.csv'
+    calls = []
+
+    assert cache.materialize(str(source), 'export_csv', {}, str(dest), _producer(calls, 'v1')) is False
+    assert cache.materialize(str(source), 'export_csv', {}, str(dest), _producer(calls, 'v2')) is True
+    assert len(calls) == 1 and dest.read_text() == 'v1'
+    # Different parameters are a different entry
+    assert cache.materialize(str(source), 'export_csv', {'sep': ';'}, str(dest), _producer(calls, 'v3')) is False
+
+    source.write_text('a\n2\n')
+    assert cache.materialize(str(source), 'export_csv', {}, str(dest), _producer(calls, 'v4')) is False
+    assert dest.read_text() == 'v4'
+
+
+def test_values_roundtrip(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    source = tmp_path / 'data.csv'
+    source.write_text('a\n1\n')
+    key = cache.key(str(source), 'summarize_results')
+    assert cache.load_value(key) is None
+    cache.store_value(key, [{'column': 'a', 'sum': 1.0}])
+    assert cache.load_value(key) == [{'column': 'a', 'sum': 1.0}]
+
+
+def test_lru_eviction_keeps_recent_entries(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=2500)
+    sources = []
+    for i in range(3):
+        src = tmp_path / f'src{i}.csv'
+        src.write_text(str(i))
+        sources.append(src)
+        cache.materialize(str(src), 'export_csv', {}, str(tmp_path / f'out{i}.csv'), _producer([], 'x' * 1000))
+        time.sleep(0.01)
+    remaining = os.listdir(tmp_path / 'cache')
+    assert len(remaining) == 2
+    # The oldest entry was evicted; the newest ones are still hits
+    assert not cache.get(cache.key(str(sources[0]), 'export_csv'), str(tmp_path / 'again.csv'))
+    assert cache.get(cache.key(str(sources[2]), 'export_csv'), str(tmp_path / 'again.csv'))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import executor
+from agent.sandbox import SandboxPool
+
+
+@pytest.fixture
+def pool():
+    pool = SandboxPool(size=2, max_uses=3)
+    yield pool
+    pool.close()
+
+
+def _py(code):
+    return [sys.executable, '-c', code]
+
+
+def test_children_inherit_limits(pool):
+    out = pool.run(_py('import resource; print(resource.getrlimit(resource.RLIMIT_CPU)[0], '
+                       'resource.getrlimit(resource.RLIMIT_AS)[0])'), timeout=10)
+    assert out['returncode'] == 0
+    assert out['stdout'].split() == [str(pool.cpu_seconds), str(pool.mem_bytes)]
+    assert out['spawn'] >= 0 and out['run'] >= 0
+
+
+def test_launchers_are_reused_then_recycled(pool):
+    parents = [pool.run(_py('import os; print(os.getppid())'), timeout=10)['stdout'].strip() for _ in range(4)]
+    # Sequential calls reuse one launcher until max_uses (3), then a fresh one takes over
+    assert parents[0] == parents[1] == parents[2]
+    assert parents[3] != parents[0]
+
+
+def test_timeout_and_missing_executable(pool):
+    out = pool.run(_py('import time; time.sleep(10)'), timeout=0.5)
+    assert 'timed out' in out['timeout']
+    assert 'No such file' in pool.run(['definitely-not-a-command-xyz'], timeout=5)['error']
+    assert pool.run(_py('print(1)'), timeout=5)['stdout'] == '1\n'
+
+
+def test_dead_launcher_is_replaced(pool):
+    pid = pool.run(_py('import os; print(os.getppid())'), timeout=10)['stdout'].strip()
+    os.kill(int(pid), 9)
+    time.sleep(0.1)
+    assert pool.run(_py('print("again")'), timeout=10)['stdout'] == 'again\n'
+
+
+def test_chunks_stream_before_exit(pool):
+    arrivals = []
+    start = time.monotonic()
+    out = pool.run(_py('import sys, time; print("one", flush=True); time.sleep(1.5); print("two")'), timeout=10,
+                   on_chunk=lambda stream, data: arrivals.append((time.monotonic() - start, data)))
+    assert out['returncode'] == 0
+    assert b''.join(d for _, d in arrivals).split() == [b'one', b'two']
+    # The first chunk arrives while the command is still sleeping
+    assert arrivals[0][0] < 1.0
+
+
+def test_concurrent_runs(pool):
+    results = []
+    threads = [threading.Thread(target=lambda i=i: results.append(pool.run(_py(f'print({i})'), timeout=10)))
+               for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(int(r['stdout']) for r in results) == list(range(8))
+
+
+def test_run_safe_command_timings_and_policy_cache(tmp_path):
+    out = executor.run_safe_command(f'{sys.executable} -c "print(42)" generate_sample_xlsx.py', timeout=10)
+    assert out['status'] == 'ok' and out['stdout'] == '42\n'
+    assert set(out['timings']) == {'policy_check', 'spawn', 'run'}
+    assert executor.get_policy() is executor.get_policy()
+
+    policy_file = tmp_path / 'policy.yaml'
+    policy_file.write_text("allowed_actions:\n  - type: run_command\n    commands: ['one']\n")
+    first = executor.get_policy(str(policy_file))
+    assert first.allows_command('one') and first is executor.get_policy(str(policy_file))
+    policy_file.write_text("allowed_actions:\n  - type: run_command\n    commands: ['two', 'three']\n")
+    second = executor.get_policy(str(policy_file))
+    assert second is not first and second.allows_command('two')
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.scheduler import SchedulerConfig, TaskScheduler
+
+
+def test_results_keep_input_order():
+    scheduler = TaskScheduler(SchedulerConfig(thread_workers=4, process_workers=0))
+
+    def slow_echo(i):
+        time.sleep(0.01 * (5 - i))
+        return i
+
+    assert scheduler.run(slow_echo, range(5), classify=lambda i: 'db_query') == [0, 1, 2, 3, 4]
+
+
+def test_per_action_limit_is_enforced():
+    cfg = SchedulerConfig(thread_workers=8, process_workers=0, limits={'run_command': 2})
+    scheduler = TaskScheduler(cfg)
+    lock = threading.Lock()
+    active = {'now': 0, 'peak': 0}
+
+    def work(i):
+        with lock:
+            active['now'] += 1
+            active['peak'] = max(active['peak'], active['now'])
+        time.sleep(0.02)
+        with lock:
+            active['now'] -= 1
+        return i
+
+    scheduler.run(work, range(8), classify=lambda i: 'run_command')
+    assert active['peak'] == 2
+
+
+def test_items_over_their_limit_do_not_hold_threads():
+    # Eight leading run_command items with a limit of two must not occupy the pool ahead of db_query
+    cfg = SchedulerConfig(thread_workers=4, process_workers=0, limits={'run_command': 2})
+    scheduler = TaskScheduler(cfg)
+    release, db_started = threading.Event(), threading.Event()
+
+    def work(kind):
+        if kind == 'db_query':
+            db_started.set()
+        else:
+            release.wait(5)
+        return kind
+
+    items = ['run_command'] * 8 + ['db_query']
+    out = []
+    runner = threading.Thread(target=lambda: out.extend(scheduler.run(work, items, classify=lambda k: k)))
+    runner.start()
+    try:
+        assert db_started.wait(2)
+    finally:
+        release.set()
+        runner.join()
+    assert out == items
+
+
+def test_error_without_fallback_is_raised():
+    scheduler = TaskScheduler(SchedulerConfig(thread_workers=2, process_workers=0, limits={'db_query': 1}))
+    with pytest.raises(ZeroDivisionError):
+        scheduler.run(lambda i: 1 / i, [1, 0, 2], classify=lambda i: 'db_query')
+
+
+def test_process_pool_and_error_fallback():
+    cfg = SchedulerConfig(thread_workers=2, process_workers=1, process_actions=('summarize',))
+    scheduler = TaskScheduler(cfg)
+    out = scheduler.run(abs, [-1, -2, 'x'], classify=lambda i: 'summarize', on_error=lambda i, e: 'failed')
+    assert out == [1, 2, 'failed']
+
+
+def test_config_from_agent_config():
+    cfg = SchedulerConfig.from_config({'concurrency': {'thread_workers': 3, 'limits': {'summarize': 1}}})
+    assert cfg.thread_workers == 3
+    assert cfg.limit_for('summarize') == 1
+    assert cfg.limit_for('unknown') == cfg.default_limit
+
+
+if __name__ == '__main__':
+    test_results_keep_input_order()
+    test_per_action_limit_is_enforced()
+    test_process_pool_and_error_fallback()
+    test_config_from_agent_config()
+    print('Scheduler tests passed')
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+import os
+import sqlite3
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import agent_runner
+from agent.task_sources import (CSVTaskSource, ParquetTaskSource, SQLiteTaskSource, open_task_source,
+                                task_source_for, updated_path)
+
+ROWS = [
+    {'task_id': '001', 'description': 'sample one', 'status': 'pending', 'due_date': '2025-12-01', 'owner': 'a'},
+    {'task_id': '002', 'description': 'sample two', 'status': None, 'due_date': None, 'owner': 'b'},
+    {'task_id': '003', 'description': 'sample three', 'status': 'completed', 'due_date': None, 'owner': 'c'},
+    {'task_id': '004', 'description': 'other', 'status': 'failed', 'due_date': None, 'owner': 'd'},
+]
+
+
+def _sqlite(path, rows=ROWS):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE tasks (task_id TEXT PRIMARY KEY, description TEXT, status TEXT, due_date TEXT, '
+                 'owner TEXT)')
+    conn.executemany('INSERT INTO tasks VALUES (:task_id, :description, :status, :due_date, :owner)', rows)
+    conn.commit()
+    conn.close()
+
+
+def test_format_from_extension_or_config(tmp_path):
+    assert isinstance(task_source_for('t.csv'), CSVTaskSource)
+    assert isinstance(task_source_for('t.data', 'parquet'), ParquetTaskSource)
+    assert isinstance(open_task_source({'data_dir': str(tmp_path), 'tasks_file': 'x.sqlite3'}), SQLiteTaskSource)
+    with pytest.raises(ValueError):
+        task_source_for('t.json')
+    with pytest.raises(ValueError):
+        SQLiteTaskSource('t.db', table='tasks; DROP TABLE x')
+    assert updated_path('/d/tasks.parquet', 'parquet') == '/d/tasks.updated.parquet'
+    assert updated_path('/d/tasks.xlsx', 'csv') == '/d/tasks.updated.csv'
+
+
+def test_csv_reads_in_chunks_and_keeps_ids(tmp_path):
+    path = tmp_path / 'tasks.csv'
+    pd.DataFrame(ROWS).to_csv(path, index=False)
+    source = CSVTaskSource(str(path), chunk_rows=2)
+    frames = list(source.iter_frames())
+    assert [len(f) for f in frames] == [2, 2]
+    assert list(frames[0].columns) == ['task_id', 'description', 'status', 'due_date']
+    assert source.read()['task_id'].tolist() == ['001', '002', '003', '004']
+    assert source.read(statuses=['pending'])['task_id'].tolist() == ['001', '002']
+
+
+def test_parquet_prunes_columns_and_pushes_down_status(tmp_path):
+    pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+
+    path = tmp_path / 'tasks.parquet'
+    pd.DataFrame(ROWS).to_parquet(path, index=False, row_group_size=1)
+    assert pq.ParquetFile(path).num_row_groups == 4
+    source = ParquetTaskSource(str(path))
+    df = source.read()
+    assert 'owner' not in df.columns and len(df) == 4
+    assert source.read(statuses=['pending'])['task_id'].tolist() == ['001', '002']
+    assert source.read(statuses=['failed', 'completed'])['task_id'].tolist() == ['003', '004']
+    assert source.read(statuses=['claimed']).empty
+
+
+def test_sqlite_filters_in_sql_and_updates_in_place(tmp_path):
+    path = tmp_path / 'tasks.db'
+    _sqlite(path)
+    source = SQLiteTaskSource(str(path), chunk_rows=3)
+    assert [len(f) for f in source.iter_frames()] == [3, 1]
+    assert source.read(statuses=['pending'])['task_id'].tolist() == ['001', '002']
+    table = agent_runner.read_tasks(str(path))
+    assert source.write_back(table, {'001': 'completed', '003': 'completed'}) == str(path)
+    conn = sqlite3.connect(path)
+    assert dict(conn.execute('SELECT task_id, status FROM tasks')) == {
+        '001': 'completed', '002': None, '003': 'completed', '004': 'failed'}
+    conn.close()
+    assert not os.path.exists(tmp_path / 'tasks.updated.db')
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet', 'sqlite'])
+def test_process_tasks_file_from_non_excel_source(tmp_path, monkeypatch, fmt):
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+    monkeypatch.setattr(agent_runner, 'process_task', lambda task: 'completed')
+    name = {'csv': 'tasks.csv', 'parquet': 'tasks.parquet', 'sqlite': 'tasks.sqlite'}[fmt]
+    path = tmp_path / name
+    if fmt == 'csv':
+        pd.DataFrame(ROWS).to_csv(path, index=False)
+    elif fmt == 'parquet':
+        pd.DataFrame(ROWS).to_parquet(path, index=False)
+    else:
+        _sqlite(path)
+    cfg = {'data_dir': str(tmp_path), 'tasks_file': name, 'concurrency': {'process_workers': 0},
+           'task_store': {'path': str(tmp_path / 'store.db')}, 'task_source': {'statuses': ['pending', 'failed']}}
+    agent_runner.process_tasks_file(cfg)
+
+    # Completed rows were not imported, so they are neither dispatched nor written to the results file
+    expected = {'001': 'completed', '002': 'completed', '004': 'completed'}
+    if fmt == 'sqlite':
+        conn = sqlite3.connect(path)
+        result = dict(conn.execute('SELECT task_id, status FROM tasks'))
+        conn.close()
+        expected['003'] = 'completed'
+    else:
+        df = agent_runner.read_tasks(updated_path(str(path), fmt)).to_dataframe()
+        result = dict(zip(df['task_id'], df['status']))
+    assert result == expected
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+import os
+import sys
+import threading
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.task_store import SQLiteTaskStore, open_task_store
+
+
+def test_add_and_upsert(tmp_path):
+    store = SQLiteTaskStore(str(tmp_path / 'tasks.db'))
+    store.add({'task_id': 'T1', 'description': 'Sample one', 'status': 'pending', 'due_date': '2025-12-01'})
+    store.add({'task_id': 'T2', 'description': 'Sample two'})
+    store.add({'task_id': 'T1', 'description': 'Sample one (edited)', 'status': 'pending', 'due_date': None})
+    tasks = store.list_tasks()
+    assert [t['task_id'] for t in tasks] == ['T1', 'T2']
+    assert tasks[0]['description'] == 'Sample one (edited)'
+    assert tasks[1]['status'] == 'pending'
+    assert [t['task_id'] for t in store.list_tasks(status='pending')] == ['T1', 'T2']
+
+
+def test_re_adding_leaves_claimed_and_processed_tasks_alone(tmp_path):
+    store = SQLiteTaskStore(str(tmp_path / 'tasks.db'))
+    store.add_many({'task_id': f'T{i}', 'description': 'Sample', 'status': 'pending'} for i in range(2))
+    assert [t['task_id'] for t in store.claim('a', limit=1)] == ['T0']
+    store.update_status('T1', 'completed')
+    store.add_many({'task_id': f'T{i}', 'description': 'Sample (again)', 'status': 'pending'} for i in range(2))
+    assert {t['task_id']: (t['description'], t['status']) for t in store.list_tasks()} == {
+        'T0': ('Sample', 'claimed'), 'T1': ('Sample', 'completed')}
+    assert store.ack('a', {'T0': 'completed'}) == ['T0']
+
+
+def test_concurrent_claims_do_not_overlap(tmp_path):
+    store = SQLiteTaskStore(str(tmp_path / 'tasks.db'))
+    store.add_many({'task_id': f'T{i}', 'description': 'Sample', 'status': 'pending'} for i in range(50))
+    claimed = []
+    lock = threading.Lock()
+
+    def worker(name):
+        while True:
+            batch = store.claim(name, limit=3)
+            if not batch:
+                return
+            with lock:
+                claimed.extend(t['task_id'] for t in batch)
+
+    threads = [threading.Thread(target=worker, args=(f'w{i}',)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(claimed) == sorted(f'T{i}' for i in range(50))
+    store.update_status('T0', 'completed')
+    assert store.list_tasks(status='completed')[0]['task_id'] == 'T0'
+
+
+def test_leases_ack_release_and_redelivery(tmp_path):
+    store = SQLiteTaskStore(str(tmp_path / 'tasks.db'))
+    store.add_many({'task_id': f'T{i}', 'description': 'Sample', 'status': 'pending'} for i in range(3))
+    assert [t['task_id'] for t in store.claim('a', limit=2, lease_seconds=60)] == ['T0', 'T1']
+    # Only the lease holder can ack or release
+    assert store.ack('b', {'T0': 'completed'}) == []
+    assert store.ack('a', {'T0': 'completed'}) == ['T0']
+    assert store.release('a', ['T1']) == ['T1']
+    assert [t['task_id'] for t in store.claim('b', limit=5, lease_seconds=0)] == ['T1', 'T2']
+    # Expired leases are handed to the next claimant; the old holder's ack is then rejected
+    redelivered = store.claim('c', limit=5, lease_seconds=60)
+    assert [t['task_id'] for t in redelivered] == ['T1', 'T2']
+    assert all(t['status'] == 'pending' for t in redelivered)
+    assert store.ack('b', {'T1': 'completed'}) == []
+    assert store.extend_lease('c', ['T1', 'T2'], 60) == ['T1', 'T2']
+    assert store.claim('d', limit=5) == []
+    assert store.ack('c', {'T1': 'completed', 'T2': 'failed'}) == ['T1', 'T2']
+    assert {t['task_id']: t['status'] for t in store.list_tasks()} == {'T0': 'completed', 'T1': 'completed',
+                                                                      'T2': 'failed'}
+
+
+def test_excel_sync_roundtrip(tmp_path):
+    sheet = tmp_path / 'tasks.xlsx'
+    pd.DataFrame([
+        {'task_id': 'T1', 'description': 'Sample one', 'status': 'pending', 'due_date': pd.Timestamp('2025-12-01')},
+    ]).to_excel(sheet, index=False)
+    store = open_task_store({'data_dir': str(tmp_path)})
+    assert store.import_excel(str(sheet)) == 1
+    out = tmp_path / 'export.xlsx'
+    store.export_excel(str(out))
+    df = pd.read_excel(out)
+    assert list(df['task_id']) == ['T1']
+    assert df['due_date'][0] == '2025-12-01'
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.agent_runner import write_tasks
+from agent.task_table import Task, TaskTable
+
+
+def _table():
+    return TaskTable.from_frame(pd.DataFrame({
+        'task_id': ['T1', 'T2', 'T3'],
+        'description': ['sample task', 'summarize', 'run_command: ls'],
+        'status': ['pending', None, 'completed'],
+        'due_date': ['2025-12-01', None, '2026-01-15'],
+    }))
+
+
+def test_views_read_and_write_through():
+    table = _table()
+    assert len(table) == 3
+    row = table[1]
+    assert (row.task_id, row.description, row.status, row.due_date) == ('T2', 'summarize', 'pending', None)
+    assert table[-1].due_date == pd.Timestamp('2026-01-15')
+    row.status = 'claimed'
+    assert table.status_at(1) == 'claimed'
+    assert list(table.statuses) == ['pending', 'claimed', 'completed']
+    assert list(np.flatnonzero(~table.status_mask('claimed'))) == [0, 2]
+    assert not table.status_mask('unknown').any()
+    with pytest.raises(IndexError):
+        table[3]
+    with pytest.raises(AttributeError):
+        row.extra = 1  # slotted
+
+
+def test_vectorized_status_updates():
+    table = _table()
+    table.update_statuses([0, 2], ['completed', 'failed'])
+    assert list(table.statuses) == ['completed', 'pending', 'failed']
+    table.update_statuses(np.arange(3), 'in-progress')
+    assert list(table.statuses) == ['in-progress'] * 3
+    # Many distinct statuses widen the codes instead of overflowing
+    table.update_statuses(np.zeros(40000, dtype=int), [f's{i}' for i in range(40000)])
+    assert table.status_at(0) == 's39999' and table.status_at(1) == 'in-progress'
+    with pytest.raises(ValueError):
+        table.update_statuses([0], [None])
+
+
+def test_view_pickles_as_task():
+    row = _table()[0]
+    task = pickle.loads(pickle.dumps(row))
+    assert task == Task('T1', 'sample task', 'pending', pd.Timestamp('2025-12-01'))
+    assert row.to_task() == task
+
+
+def test_dataframe_and_write_roundtrip(tmp_path):
+    table = _table()
+    df = table.to_dataframe()
+    assert list(df.columns) == ['task_id', 'description', 'status', 'due_date']
+    assert isinstance(df['status'].dtype, pd.CategoricalDtype)
+    assert df['due_date'].isna().tolist() == [False, True, False]
+
+    path = tmp_path / 'tasks.xlsx'
+    write_tasks(str(path), table)
+    written = pd.read_excel(tmp_path / 'tasks.updated.xlsx')
+    assert written['status'].tolist() == ['pending', 'pending', 'completed']
+    assert written['due_date'][0] == pd.Timestamp('2025-12-01')
+
+    # A plain list of tasks is still accepted
+    write_tasks(str(path), table.to_tasks())
+    again = TaskTable.from_frame(pd.read_excel(tmp_path / 'tasks.updated.xlsx'))
+    assert again.to_tasks() == table.to_tasks()
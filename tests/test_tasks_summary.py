@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.tasks import summarize_data, write_summary
+
+
+def _frame():
+    rng = np.random.default_rng(1)
+    values = rng.normal(50, 10, 1000)
+    values[::7] = np.nan
+    return pd.DataFrame({
+        'id': np.arange(1000),
+        'value': values,
+        'flag': [True, False] * 500,
+        'note': ['x'] * 999 + [None],
+    })
+
+
+def test_chunked_summary_matches_pandas(tmp_path):
+    df = _frame()
+    path = tmp_path / 'data.xlsx'
+    df.to_excel(path, index=False)
+    results = {r.column: r for r in summarize_data(str(path), chunk_rows=64, extended=True)}
+    # Same column selection as DataFrame.select_dtypes(include=['number'])
+    assert list(results) == ['id', 'value']
+    col = df['value'].dropna()
+    assert results['value'].count == len(col)
+    assert math.isclose(results['value'].mean, col.mean(), rel_tol=1e-9)
+    assert math.isclose(results['value'].sum, col.sum(), rel_tol=1e-9)
+    assert math.isclose(results['value'].std, col.std(), rel_tol=1e-9)
+    assert results['id'].min == 0 and results['id'].max == 999
+    assert math.isclose(results['id'].quantiles[0.5], df['id'].quantile(0.5))
+
+
+def test_csv_and_column_turning_non_numeric(tmp_path):
+    path = tmp_path / 'data.csv'
+    pd.DataFrame({'a': [1, 2, 3, 4], 'b': [1, 2, 3, 'x']}).to_csv(path, index=False)
+    results = summarize_data(str(path), chunk_rows=2)
+    assert [r.column for r in results] == ['a']
+    assert results[0].sum == 10 and results[0].count == 4
+    assert results[0].min is None
+
+
+def test_write_summary_flattens_optional_stats(tmp_path):
+    path = tmp_path / 'data.csv'
+    pd.DataFrame({'a': [1.0, 2.0, 3.0]}).to_csv(path, index=False)
+    out = tmp_path / 'summary.xlsx'
+    write_summary(str(out), summarize_data(str(path), extended=True, quantiles=(0.5,)))
+    df = pd.read_excel(out)
+    assert list(df.columns) == ['column', 'mean', 'sum', 'count', 'min', 'max', 'std', 'p50']
+    assert df['p50'][0] == 2.0
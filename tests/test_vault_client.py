@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import vault_client
+from agent.vault_client import SecretCache, VaultClient
+
+
+class FakeVault:
+    """Minimal KV v2 endpoint that counts requests per path."""
+
+    def __init__(self, secrets, lease_duration=0, delay=0.0):
+        self.secrets = secrets
+        self.lease_duration = lease_duration
+        self.delay = delay
+        self.hits = {}
+        self.tokens = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                path = self.path[len('/v1/'):]
+                fake.hits[path] = fake.hits.get(path, 0) + 1
+                fake.tokens.append(self.headers.get('X-Vault-Token'))
+                if fake.delay:
+                    time.sleep(fake.delay)
+                if path in fake.secrets:
+                    status = 200
+                    body = {'lease_duration': fake.lease_duration, 'data': {'data': fake.secrets[path]}}
+                else:
+                    status, body = 404, {'errors': []}
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.addr = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(vault_client, '_secret_cache', SecretCache(clock=clock))
+    monkeypatch.delenv('VAULT_CACHE_TTL', raising=False)
+    return clock
+
+
+@pytest.fixture
+def vault():
+    servers = []
+
+    def start(**kwargs):
+        server = FakeVault({'secret/data/app': {'aws_access_key': 'AK', 'aws_secret_key': 'SK'}}, **kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def test_values_share_one_fetch(vault, clock):
+    server = vault()
+    vc = VaultClient(vault_addr=server.addr, token='t1')
+    assert vc.get_secret_value('secret/data/app', 'aws_access_key') == 'AK'
+    assert vc.get_secret_value('secret/data/app', 'aws_secret_key') == 'SK'
+    assert VaultClient(vault_addr=server.addr, token='t1').get_secret('secret/data/app')['aws_access_key'] == 'AK'
+    assert server.hits == {'secret/data/app': 1}
+    assert server.tokens == ['t1']
+    # A different token is a different cache entry
+    VaultClient(vault_addr=server.addr, token='t2').get_secret('secret/data/app')
+    assert server.hits == {'secret/data/app': 2}
+
+
+def test_lease_duration_sets_ttl(vault, clock):
+    server = vault(lease_duration=60)
+    vc = VaultClient(vault_addr=server.addr, token='t')
+    vc.get_secret('secret/data/app')
+    clock.now += 59
+    vc.get_secret('secret/data/app')
+    # Past 75% of the lease the read triggered a background refresh
+    deadline = time.monotonic() + 5
+    while server.hits['secret/data/app'] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server.hits['secret/data/app'] == 2
+    time.sleep(0.05)
+    clock.now += 30
+    vc.get_secret('secret/data/app')
+    assert server.hits['secret/data/app'] == 2
+    clock.now += 61
+    vc.get_secret('secret/data/app')
+    assert server.hits['secret/data/app'] == 3
+
+
+def test_default_ttl_without_lease(vault, clock, monkeypatch):
+    monkeypatch.setenv('VAULT_CACHE_TTL', '10')
+    server = vault()
+    vc = VaultClient(vault_addr=server.addr, token='t')
+    vc.get_secret('secret/data/app')
+    clock.now += 11
+    vc.get_secret('secret/data/app')
+    assert server.hits['secret/data/app'] == 2
+
+
+def test_concurrent_lookups_single_flight(vault, clock):
+    server = vault(delay=0.2)
+    vc = VaultClient(vault_addr=server.addr, token='t')
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(vc.get_secret_value('secret/data/app', 'aws_access_key')))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ['AK'] * 8
+    assert server.hits == {'secret/data/app': 1}
+
+
+def test_errors_are_not_cached(vault, clock):
+    server = vault()
+    vc = VaultClient(vault_addr=server.addr, token='t')
+    with pytest.raises(RuntimeError):
+        vc.get_secret('secret/data/missing')
+    assert vc.get_secret_value('secret/data/missing', 'k', default='fallback') == 'fallback'
+    assert server.hits['secret/data/missing'] == 2
+
+
+def test_cache_disabled(vault, clock, monkeypatch):
+    monkeypatch.setenv('VAULT_CACHE_TTL', '0')
+    server = vault()
+    vc = VaultClient(vault_addr=server.addr, token='t')
+    vc.get_secret('secret/data/app')
+    vc.get_secret('secret/data/app')
+    assert server.hits['secret/data/app'] == 2
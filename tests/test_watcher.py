@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.watcher import InotifyWatcher, PollWatcher, file_is_complete
+
+
+def _xlsx_bytes(tmp_path, name='src.xlsx'):
+    src = tmp_path / name
+    pd.DataFrame({'task_id': ['T1'], 'description': ['Sample'], 'status': ['pending']}).to_excel(src, index=False)
+    return src.read_bytes()
+
+
+def _collect(watcher, stop):
+    events = []
+
+    def run():
+        for _ in watcher.changes(stop):
+            events.append(time.monotonic())
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    return events, t
+
+
+def _wait_for(events, count, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while len(events) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return len(events)
+
+
+def test_file_is_complete_rejects_partial_xlsx(tmp_path):
+    data = _xlsx_bytes(tmp_path)
+    target = tmp_path / 'tasks.xlsx'
+    target.write_bytes(data[: len(data) // 2])
+    assert not file_is_complete(str(target))
+    target.write_bytes(data)
+    assert file_is_complete(str(target))
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='inotify is Linux-only')
+def test_inotify_detects_atomic_rename_and_ignores_output(tmp_path):
+    data = _xlsx_bytes(tmp_path)
+    target = tmp_path / 'tasks.xlsx'
+    watcher = InotifyWatcher(str(target), debounce=0.02)
+    stop = threading.Event()
+    events, thread = _collect(watcher, stop)
+    try:
+        # The runner's own output must not trigger processing
+        (tmp_path / 'tasks.updated.xlsx').write_bytes(data)
+        time.sleep(0.2)
+        assert events == []
+
+        tmp = tmp_path / '.tasks.xlsx.tmp'
+        tmp.write_bytes(data)
+        start = time.monotonic()
+        os.replace(tmp, target)
+        assert _wait_for(events, 1) == 1
+        assert events[0] - start < 0.5
+    finally:
+        stop.set()
+        thread.join(timeout=3)
+        watcher.close()
+
+
+def test_poll_watcher_debounces_writes(tmp_path):
+    data = _xlsx_bytes(tmp_path)
+    target = tmp_path / 'tasks.xlsx'
+    target.write_bytes(data)
+    watcher = PollWatcher(str(target), debounce=0.05, poll_interval=0.05)
+    stop = threading.Event()
+    events, thread = _collect(watcher, stop)
+    try:
+        for _ in range(3):
+            target.write_bytes(data + b'')
+            os.utime(target, None)
+            time.sleep(0.01)
+        assert _wait_for(events, 1) == 1
+        time.sleep(0.3)
+        assert len(events) == 1
+    finally:
+        stop.set()
+        thread.join(timeout=3)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+import json
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+import requests
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import agent_runner
+from agent import mcp_server as server
+from agent.lease_client import LeaseClient
+from agent.task_store import open_task_store
+
+
+@pytest.fixture
+def cfg(tmp_path, monkeypatch):
+    cfg = {'data_dir': str(tmp_path), 'tasks_file': 'sample_tasks.xlsx', 'api_token': 'testtoken',
+           'serve': {'lease_seconds': 30, 'poll_wait': 0.2, 'retry_delay': 0.1}}
+    cfg_file = tmp_path / 'agent_config.json'
+    cfg_file.write_text(json.dumps(cfg))
+    monkeypatch.setenv('AGENT_CONFIG_PATH', str(cfg_file))
+    monkeypatch.delenv('AGENT_API_TOKEN', raising=False)
+    srv = make_server('127.0.0.1', 0, server.app, threaded=True)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    cfg['serve']['server_url'] = f'http://127.0.0.1:{srv.server_port}'
+    yield cfg
+    srv.shutdown()
+    srv.server_close()
+
+
+def _wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_workers_process_leased_tasks(cfg):
+    store = open_task_store(cfg)
+    store.add_many({'task_id': f'S{i}', 'description': 'Sample task', 'status': 'pending'} for i in range(6))
+    stop = threading.Event()
+    workers = [threading.Thread(target=agent_runner.run_worker, args=(cfg, f'w{i}', stop)) for i in range(2)]
+    for w in workers:
+        w.start()
+    try:
+        assert _wait_for(lambda: len(store.list_tasks(status='completed')) == 6)
+    finally:
+        stop.set()
+        for w in workers:
+            w.join(5)
+    assert not any(w.is_alive() for w in workers)
+
+
+def test_long_poll_lease_wakes_on_new_task(cfg):
+    client = LeaseClient(cfg['serve']['server_url'], 'testtoken')
+    leased = []
+    started = time.monotonic()
+    t = threading.Thread(target=lambda: leased.extend(client.lease('w1', wait=10)))
+    t.start()
+    time.sleep(0.2)
+    client.session.post(cfg['serve']['server_url'] + '/tasks', json={
+        'task_id': 'P1', 'description': 'Sample', 'status': 'pending', 'due_date': '2025-01-01'})
+    t.join(10)
+    assert [r['task_id'] for r in leased] == ['P1']
+    assert time.monotonic() - started < 5
+    client.close()
+
+
+def test_expired_lease_is_redelivered(cfg):
+    store = open_task_store(cfg)
+    store.add({'task_id': 'R1', 'description': 'Sample', 'status': 'pending'})
+    url = cfg['serve']['server_url']
+    crashed = LeaseClient(url, 'testtoken')
+    assert [r['task_id'] for r in crashed.lease('crashed', lease_seconds=0.2)] == ['R1']
+    survivor = LeaseClient(url, 'testtoken')
+    assert survivor.lease('survivor') == []
+    time.sleep(0.3)
+    assert [r['task_id'] for r in survivor.lease('survivor')] == ['R1']
+    # The original holder lost the lease, so its late ack is ignored
+    assert crashed.ack('crashed', {'R1': 'failed'}) == []
+    assert survivor.ack('survivor', {'R1': 'completed'}) == ['R1']
+    assert store.list_tasks()[0]['status'] == 'completed'
+    crashed.close()
+    survivor.close()
+
+
+def test_lease_api_requires_token(cfg):
+    client = LeaseClient(cfg['serve']['server_url'], 'wrong')
+    with pytest.raises(requests.HTTPError) as exc:
+        client.lease('w1')
+    assert exc.value.response.status_code == 401
+    client.close()
+
+
+def test_extend_rejects_bad_lease_seconds(cfg):
+    client = LeaseClient(cfg['serve']['server_url'], 'testtoken')
+    r = client.session.post(cfg['serve']['server_url'] + '/tasks:extend', json={
+        'worker_id': 'w1', 'task_ids': ['T1'], 'lease_seconds': 'soon'})
+    assert r.status_code == 400 and r.json() == {'error': 'invalid lease parameters'}
+    client.close()
+
+
+def test_client_token_resolves_like_the_server(cfg, tmp_path):
+    # Only an api_tokens list is configured, which the server accepts and AGENT_API_TOKEN/api_token miss
+    rotated = {k: v for k, v in cfg.items() if k != 'api_token'}
+    rotated['api_tokens'] = ['next-token', 'old-token']
+    (tmp_path / 'agent_config.json').write_text(json.dumps(rotated))
+    server.config_provider.invalidate()
+    client = LeaseClient.from_config(cfg)
+    assert client.session.headers['X-AGENT-TOKEN'] == 'next-token'
+    assert client.lease('w1') == []
+    client.close()
+
+
+def test_process_tasks_file_leaves_leased_tasks_to_their_worker(tmp_path, monkeypatch):
+    cfg = {'data_dir': str(tmp_path), 'tasks_file': 'tasks.xlsx', 'sync_excel': True,
+           'concurrency': {'process_workers': 0}, 'task_store': {'path': str(tmp_path / 'store.db')}}
+    rows = [{'task_id': f'T{i}', 'description': 'Sample', 'status': 'pending'} for i in (1, 2)]
+    pd.DataFrame(rows).to_excel(tmp_path / 'tasks.xlsx', index=False)
+    store = open_task_store(cfg)
+    store.add_many(rows)
+    assert [t['task_id'] for t in store.claim('worker-A', limit=1)] == ['T1']
+
+    calls, competing = [], []
+
+    def fake_process(task):
+        calls.append(task.task_id)
+        # The runner holds its own leases while it runs, so a worker cannot take the same task
+        competing.extend(store.claim('worker-B', limit=5))
+        return 'completed'
+
+    monkeypatch.setattr(agent_runner, 'process_task', fake_process)
+    agent_runner.process_tasks_file(cfg)
+    assert calls == ['T2'] and competing == []
+    assert {t['task_id']: t['status'] for t in store.list_tasks()} == {'T1': 'claimed', 'T2': 'completed'}
+    assert store.ack('worker-A', {'T1': 'completed'}) == ['T1']
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import writers
+from agent.agent_runner import write_tasks
+from agent.task_table import Task
+
+
+def _frame(rows=25):
+    return pd.DataFrame({
+        'id': range(rows),
+        'name': [f'row {i}' if i % 5 else None for i in range(rows)],
+        'value': [i / 2 if i % 7 else float('nan') for i in range(rows)],
+        'when': pd.to_datetime(['2025-01-01'] * (rows - 1) + [None]),
+    })
+
+
+def _read(path):
+    if path.endswith('.csv'):
+        return pd.read_csv(path, parse_dates=['when'])
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_excel(path)
+
+
+@pytest.mark.parametrize('ext', ['xlsx', 'csv', 'parquet'])
+def test_write_frame_in_chunks_roundtrips(tmp_path, ext):
+    if ext == 'parquet':
+        pytest.importorskip('pyarrow')
+    df = _frame()
+    path = str(tmp_path / f'out.{ext}')
+    assert writers.write_frame(path, df, chunk_rows=4) == 25
+    back = _read(path)
+    assert list(back.columns) == ['id', 'name', 'value', 'when']
+    assert back['id'].tolist() == list(range(25))
+    assert back['name'].isna().sum() == 5 and back['value'].isna().sum() == 4
+    assert back['when'][0] == pd.Timestamp('2025-01-01') and pd.isna(back['when'][24])
+    assert os.listdir(tmp_path) == [f'out.{ext}']
+
+
+def test_write_records_streams_generator(tmp_path):
+    seen = []
+
+    def records():
+        for i in range(10):
+            seen.append(i)
+            yield {'a': i, 'b': str(i)}
+
+    path = str(tmp_path / 'r.csv')
+    assert writers.write_records(path, records(), chunk_rows=3) == 10
+    assert pd.read_csv(path).to_dict('list') == {'a': list(range(10)), 'b': list(range(10))}
+    empty = str(tmp_path / 'empty.xlsx')
+    assert writers.write_records(empty, [], columns=['x', 'y']) == 0
+    assert list(pd.read_excel(empty).columns) == ['x', 'y']
+
+
+def test_failed_write_keeps_previous_file(tmp_path):
+    path = tmp_path / 'keep.csv'
+    path.write_text('old\n')
+
+    def chunks():
+        yield pd.DataFrame({'a': [1]})
+        raise RuntimeError('source failed')
+
+    with pytest.raises(RuntimeError):
+        writers.write_frame(str(path), chunks())
+    assert path.read_text() == 'old\n'
+    assert os.listdir(tmp_path) == ['keep.csv']
+    with pytest.raises(ValueError):
+        writers.write_frame(str(tmp_path / 'out.txt'), pd.DataFrame({'a': [1]}))
+
+
+def test_write_tasks_formats(tmp_path):
+    tasks = [Task('T1', 'sample', 'completed', pd.Timestamp('2025-12-01')), Task('T2', 'other', 'pending')]
+    sheet = str(tmp_path / 'tasks.xlsx')
+    assert write_tasks(sheet, tasks) == str(tmp_path / 'tasks.updated.xlsx')
+    assert pd.read_excel(tmp_path / 'tasks.updated.xlsx')['status'].tolist() == ['completed', 'pending']
+    out = write_tasks(sheet, tasks, fmt='csv')
+    assert out == str(tmp_path / 'tasks.updated.csv')
+    assert pd.read_csv(out)['task_id'].tolist() == ['T1', 'T2']
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark for task loading: the columnar `TaskTable` against the previous row-by-row `iterrows` loop
+building a list of `Task` dataclasses, `read_excel` with each available xlsx engine, and the CSV and
+Parquet task sources (`agent.task_sources`).
+
+Usage example:
+    python tools/bench_read_tasks.py
+    python tools/bench_read_tasks.py --sizes 10000,100000,1000000 --legacy-max 100000 --excel-max 1000000
+    python tools/bench_read_tasks.py --sizes 100000 --memory
+
+For each size the report shows the time to build tasks from an in-memory sheet with both loaders
+(and with --memory, the Python memory the result holds per task), then the time to read a generated
+.xlsx of that size with each engine (openpyxl, and calamine when python-calamine is installed), and
+the same rows as CSV and Parquet (all rows, and pending only with the status filter pushed down).
+The legacy loop and the file steps are skipped above their limits.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+from agent.task_table import Task, TaskTable  # noqa: E402
+from agent.task_sources import task_source_for  # noqa: E402
+from agent.task_store import excel_engine  # noqa: E402
+
+
+def legacy_tasks(df: pd.DataFrame):
+    tasks = []
+    for _, row in df.iterrows():
+        due = None
+        if not pd.isna(row.get('due_date')):
+            try:
+                due = pd.to_datetime(row['due_date']) if not pd.isna(row['due_date']) else None
+            except Exception:
+                due = None
+        tasks.append(Task(
+            task_id=str(row.get('task_id')),
+            description=str(row.get('description')),
+            status=str(row.get('status')) if not pd.isna(row.get('status')) else 'pending',
+            due_date=due,
+        ))
+    return tasks
+
+
+def make_sheet(rows: int) -> pd.DataFrame:
+    """Tasks with some blank statuses and dates, and a few unparseable dates."""
+    rng = np.random.default_rng(0)
+    due = pd.Series(pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D'))
+    due = due.dt.strftime('%Y-%m-%d').astype(object)
+    due[rng.random(rows) < 0.1] = None
+    due[rng.random(rows) < 0.01] = 'not a date'
+    status = pd.Series(rng.choice(['pending', 'completed', 'failed'], rows), dtype=object)
+    status[rng.random(rows) < 0.2] = None
+    return pd.DataFrame({
+        'task_id': [f'T{i:07d}' for i in range(rows)],
+        'description': rng.choice(['sample task', 'summarize data', 'export_csv', 'db_query: SELECT 1'], rows),
+        'status': status,
+        'due_date': due,
+    })
+
+
+def write_xlsx(df: pd.DataFrame, path: str):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(list(df.columns))
+    for row in df.itertuples(index=False):
+        ws.append(list(row))
+    wb.save(path)
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def _held_bytes(fn) -> int:
+    """Python memory still allocated by the result of `fn` (traced, so run separately from timing)."""
+    tracemalloc.start()
+    result = fn()  # noqa: F841 (kept alive until measured)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held
+
+
+def _report(rows: int, step: str, elapsed: float, fn=None):
+    per_task = f'{_held_bytes(fn) / rows:.1f}' if fn is not None else ''
+    print(f'{rows:>9} {step:>18} {elapsed:>10.3f} {per_task:>11}')
+
+
+def run(sizes, legacy_max: int, excel_max: int, memory: bool = False):
+    engines = ['openpyxl'] + (['calamine'] if excel_engine('auto') == 'calamine' else [])
+    print(f"{'rows':>9} {'step':>18} {'seconds':>10} {'bytes/task':>11}")
+    for rows in sizes:
+        df = make_sheet(rows)
+        build_table = lambda: TaskTable.from_frame(df)  # noqa: E731
+        build_legacy = lambda: legacy_tasks(df)  # noqa: E731
+        elapsed, table = _timed(build_table)
+        _report(rows, 'TaskTable', elapsed, build_table if memory else None)
+        if rows <= legacy_max:
+            elapsed, legacy = _timed(build_legacy)
+            assert [(t.task_id, t.status) for t in legacy] == [(t.task_id, t.status) for t in table]
+            del legacy
+            _report(rows, 'iterrows + Task', elapsed, build_legacy if memory else None)
+        if rows > excel_max:
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'tasks.xlsx')
+            write_xlsx(df, path)
+            for engine in engines:
+                elapsed, _ = _timed(lambda: pd.read_excel(path, engine=engine))
+                _report(rows, f'read_excel {engine}', elapsed)
+            csv_path, parquet_path = os.path.join(tmp, 'tasks.csv'), os.path.join(tmp, 'tasks.parquet')
+            df.to_csv(csv_path, index=False)
+            elapsed, _ = _timed(lambda: task_source_for(csv_path).read())
+            _report(rows, 'source csv', elapsed)
+            try:
+                df.to_parquet(parquet_path, index=False, row_group_size=max(1, rows // 20))
+            except ImportError:
+                continue
+            elapsed, _ = _timed(lambda: task_source_for(parquet_path).read())
+            _report(rows, 'source parquet', elapsed)
+            elapsed, _ = _timed(lambda: task_source_for(parquet_path).read(statuses=['pending']))
+            _report(rows, 'parquet pending', elapsed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark task loading')
+    parser.add_argument('--sizes', default='10000,100000,1000000', help='Comma-separated sheet sizes (rows)')
+    parser.add_argument('--legacy-max', type=int, default=100000, help='Largest size to run the iterrows loop on')
+    parser.add_argument('--excel-max', type=int, default=100000, help='Largest size to write and read as files')
+    parser.add_argument('--memory', action='store_true', help='Also report traced memory per task (slower)')
+    args = parser.parse_args(argv)
+    run([int(s) for s in args.sizes.split(',') if s], args.legacy_max, args.excel_max, args.memory)
+
+
+if __name__ == '__main__':
+    main()
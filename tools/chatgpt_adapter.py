@@ -26,6 +26,12 @@ from jsonschema import validate, ValidationError, FormatChecker
 
 import requests
 
+# The task schema lives in the agent package so the MCP server validates batches with the same rules
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+from agent.task_schema import TASK_SCHEMA, validate_task_dict  # noqa: E402,F401
+
 try:
     import openai
     OPENAI_AVAILABLE = True
@@ -52,18 +58,6 @@ DEFAULT_PROMPT = (
 )
 
 
-TASK_SCHEMA = {
-    'type': 'object',
-    'properties': {
-        'task_id': {'type': 'string'},
-        'description': {'type': 'string'},
-        'status': {'type': 'string', 'enum': ['pending', 'in-progress', 'completed', 'failed']},
-        'due_date': {'type': 'string', 'format': 'date'},
-    },
-    'required': ['task_id', 'description', 'status', 'due_date'],
-}
-
-
 def generate_tasks_with_openai(count: int = 1) -> List[GeneratedTask]:
     if not OPENAI_AVAILABLE:
         raise RuntimeError('openai package is not available. Install openai or run in dry-run mode')
@@ -143,29 +137,39 @@ def generate_tasks_dryrun(count: int = 1) -> List[GeneratedTask]:
     return tasks
 
 
-def validate_task_dict(task_dict: dict) -> bool:
-    """Validate a dict against the TASK_SCHEMA. Returns True if valid, else False."""
-    try:
-        validate(instance=task_dict, schema=TASK_SCHEMA, format_checker=FormatChecker())
-        return True
-    except ValidationError:
-        return False
+def _mcp_url(host: str, port: int, path: str) -> str:
+    base = host.rstrip('/')
+    return f"{base}:{port}{path}" if str(port) not in host else f"{base}{path}"
 
 
-def post_task_to_mcp(host: str, port: int, token: Optional[str], task: GeneratedTask) -> requests.Response:
-    base = host.rstrip('/')
-    url = f"{base}:{port}/tasks" if str(port) not in host else f"{base}/tasks"
-    headers = {"Content-Type": "application/json"}
+def _mcp_headers(token: Optional[str], content_type: str = "application/json") -> dict:
+    headers = {"Content-Type": content_type}
     if token:
         headers["X-AGENT-TOKEN"] = token
-    payload = {
+    return headers
+
+
+def _task_payload(task: GeneratedTask) -> dict:
+    return {
         'task_id': task.task_id,
         'description': task.description,
         'status': task.status,
         'due_date': task.due_date,
     }
-    resp = requests.post(url, headers=headers, json=payload, timeout=5)
-    return resp
+
+
+def post_task_to_mcp(host: str, port: int, token: Optional[str], task: GeneratedTask,
+                     session: Optional[requests.Session] = None) -> requests.Response:
+    http = session or requests
+    return http.post(_mcp_url(host, port, '/tasks'), headers=_mcp_headers(token), json=_task_payload(task), timeout=5)
+
+
+def post_tasks_batch_to_mcp(session: requests.Session, host: str, port: int, token: Optional[str],
+                            tasks: List[GeneratedTask]) -> requests.Response:
+    """Post several tasks in one request to POST /tasks:batch as NDJSON (one JSON object per line)."""
+    body = ''.join(json.dumps(_task_payload(t)) + '\n' for t in tasks).encode('utf-8')
+    headers = _mcp_headers(token, content_type="application/x-ndjson")
+    return session.post(_mcp_url(host, port, '/tasks:batch'), headers=headers, data=body, timeout=30)
 
 
 def main():
@@ -175,6 +179,8 @@ def main():
     parser.add_argument('--count', default=1, type=int)
     parser.add_argument('--dry-run', action='store_true', help='Do not call OpenAI or the MCP server; emit tasks to stdout')
     parser.add_argument('--token', default=os.environ.get('AGENT_API_TOKEN'), help='Agent token for MCP authentication')
+    parser.add_argument('--batch-size', default=0, type=int,
+                        help='Post tasks in batches of this size to POST /tasks:batch (0 posts one task per request)')
     args = parser.parse_args()
 
     if args.dry_run:
@@ -194,9 +200,29 @@ def main():
         logger.info('Task: %s - %s', t.task_id, t.description)
         if args.dry_run:
             print(json.dumps(t.__dict__, indent=2))
-        else:
+
+    if args.dry_run:
+        return
+
+    # One pooled session keeps the connection to the MCP server alive across requests
+    with requests.Session() as session:
+        if args.batch_size > 0:
+            for start in range(0, len(tasks), args.batch_size):
+                chunk = tasks[start:start + args.batch_size]
+                try:
+                    resp = post_tasks_batch_to_mcp(session, args.host, args.port, args.token, chunk)
+                    if resp.ok:
+                        summary = resp.json()
+                        logger.info('Posted batch of %d tasks: %s accepted, %s rejected',
+                                    len(chunk), summary.get('accepted'), summary.get('rejected'))
+                    else:
+                        logger.error('MCP batch POST failed [%s] %s', resp.status_code, resp.text)
+                except Exception as e:
+                    logger.exception('Failed to post task batch: %s', e)
+            return
+        for t in tasks:
             try:
-                resp = post_task_to_mcp(args.host, args.port, args.token, t)
+                resp = post_task_to_mcp(args.host, args.port, args.token, t, session=session)
                 if resp.ok:
                     logger.info('Posted task %s: %s', t.task_id, resp.text)
                 else:
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Load test comparing the Flask MCP server (agent/mcp_server.py) with the ASGI variant (agent/mcp_asgi.py)
+on the same machine.
+
+Each server is started in a subprocess against a throwaway config and task store, then hit with
+`--requests` POST /tasks calls from `--concurrency` client threads (one keep-alive session per thread).
+The report lists throughput, latency percentiles and status codes; 429s from the ASGI server's
+backpressure are counted separately rather than retried.
+
+Usage example:
+    python tools/loadtest_mcp.py --requests 5000 --concurrency 64
+    python tools/loadtest_mcp.py --servers asgi --asgi-workers 4
+
+The client shares the machine with the server, so compare the two servers with each other rather than
+reading the numbers as absolute capacity.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import requests
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+TOKEN = 'loadtest'
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind: str, workdir: str, asgi_workers: int = 1) -> tuple:
+    port = _free_port()
+    cfg = {'data_dir': workdir, 'tasks_file': 'tasks.xlsx', 'api_token': TOKEN,
+           'api_host': '127.0.0.1', 'api_port': port}
+    cfg_path = os.path.join(workdir, 'agent_config.json')
+    with open(cfg_path, 'w', encoding='utf-8') as f:
+        json.dump(cfg, f)
+    env = dict(os.environ, AGENT_CONFIG_PATH=cfg_path, PYTHONPATH=REPO_ROOT)
+    env.pop('AGENT_API_TOKEN', None)
+    if kind == 'flask':
+        cmd = [sys.executable, '-m', 'agent.mcp_server']
+    else:
+        cmd = [sys.executable, '-m', 'agent.mcp_asgi', '--workers', str(asgi_workers)]
+    proc = subprocess.Popen(cmd, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f'{kind} server exited with {proc.returncode}')
+        try:
+            if requests.get(url + '/health', timeout=1).ok:
+                return proc, url
+        except requests.RequestException:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError(f'{kind} server did not start')
+
+
+def run_load(url: str, total: int, concurrency: int) -> Dict:
+    local = threading.local()
+    headers = {'X-AGENT-TOKEN': TOKEN}
+
+    def one(i: int):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        task = {'task_id': f'L{i}', 'description': 'load test', 'status': 'pending', 'due_date': '2025-01-01'}
+        start = time.perf_counter()
+        try:
+            status = session.post(url + '/tasks', json=task, headers=headers, timeout=30).status_code
+        except requests.RequestException:
+            status = 'error'
+        return status, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(lat for status, lat in results if status == 200)
+    return {
+        'elapsed': elapsed,
+        'statuses': Counter(status for status, _ in results),
+        'latencies': latencies,
+    }
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(kind: str, result: Dict):
+    ok = result['statuses'].get(200, 0)
+    lat = result['latencies']
+    print(f"{kind:>6}: {ok / result['elapsed']:8.1f} ok/s  "
+          f"p50 {_percentile(lat, 0.5) * 1000:7.2f} ms  p95 {_percentile(lat, 0.95) * 1000:7.2f} ms  "
+          f"p99 {_percentile(lat, 0.99) * 1000:7.2f} ms  statuses {dict(result['statuses'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the Flask and ASGI MCP servers')
+    parser.add_argument('--servers', default='flask,asgi', help='Comma-separated: flask, asgi')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--asgi-workers', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    for kind in [s.strip() for s in args.servers.split(',') if s.strip()]:
+        with tempfile.TemporaryDirectory(prefix=f'mcp-load-{kind}-') as workdir:
+            proc, url = start_server(kind, workdir, args.asgi_workers)
+            try:
+                report(kind, run_load(url, args.requests, args.concurrency))
+            finally:
+                proc.terminate()
+                proc.wait(timeout=10)
+
+
+if __name__ == '__main__':
+    main()